@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from .models import (
     CustomUser, Role, VerifiedEmail,
@@ -27,13 +28,61 @@ class CustomUserAdmin(BaseUserAdmin):
     )
 
 
+# Larger test data is not loaded into the change form; it can only be replaced by an upload.
+INLINE_TESTCASE_DATA_LIMIT = 64 * 1024
+
+
+class TestCaseForm(forms.ModelForm):
+    input_data = forms.CharField(widget=forms.Textarea(attrs={'rows': 4}), required=False, strip=False)
+    input_file = forms.FileField(required=False)
+    expected_output = forms.CharField(widget=forms.Textarea(attrs={'rows': 4}), required=False, strip=False)
+    expected_output_file = forms.FileField(required=False)
+
+    class Meta:
+        model = TestCase
+        fields = ('problem', 'is_sample')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.instance.pk:
+            return
+        for field, size in (('input_data', self.instance.input_size), ('expected_output', self.instance.output_size)):
+            if size > INLINE_TESTCASE_DATA_LIMIT:
+                self.fields[field].help_text = f'{size} bytes stored. Upload a file to replace it.'
+            else:
+                self.initial[field] = getattr(self.instance, field)
+
+    def save(self, commit=True):
+        testcase = super().save(commit=False)
+        if self.cleaned_data.get('input_file'):
+            testcase.set_input(self.cleaned_data['input_file'])
+        elif 'input_data' in self.changed_data:
+            testcase.input_data = self.cleaned_data['input_data']
+        if self.cleaned_data.get('expected_output_file'):
+            testcase.set_expected_output(self.cleaned_data['expected_output_file'])
+        elif 'expected_output' in self.changed_data:
+            testcase.expected_output = self.cleaned_data['expected_output']
+
+        if commit:
+            testcase.save()
+            self._save_m2m()
+        return testcase
+
+
 class TestCaseInline(admin.TabularInline):
     model = TestCase
+    form = TestCaseForm
     extra = 1
 
 
+class TestCaseAdmin(admin.ModelAdmin):
+    form = TestCaseForm
+    list_display = ('problem', 'is_sample', 'input_size', 'output_size', 'updated_at')
+    list_filter = ('is_sample',)
+
+
 class ProblemAdmin(admin.ModelAdmin):
-    list_display = ('title', 'difficulty', 'slug', 'time_limit', 'memory_limit')
+    list_display = ('title', 'difficulty', 'slug', 'time_limit', 'memory_limit', 'total_submissions', 'accepted_submissions')
     search_fields = ('title', 'slug')
     prepopulated_fields = {'slug': ('title',)}
     inlines = [TestCaseInline]
@@ -67,6 +116,6 @@ admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Role, RoleAdmin)
 admin.site.register(VerifiedEmail, VerifiedEmailAdmin)
 admin.site.register(Problem, ProblemAdmin)
-admin.site.register(TestCase)  
+admin.site.register(TestCase, TestCaseAdmin)
 admin.site.register(Submission, SubmissionAdmin)
 admin.site.register(SubmissionTestCaseResult, SubmissionTestCaseResultAdmin)
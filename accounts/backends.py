@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from . import judge0
+from .sandbox import ACCEPTED, INTERNAL_ERROR, build, check_result, init_worker, prune_builds, run_payload
+
+
+# Backends take Judge0-style payloads (see judge0.build_payload) and return Judge0-style result dicts.
+class JudgeBackend:
+    # Whether the code runs in the calling process's own pool rather than on a remote judge.
+    runs_in_process = False
+
+    def compile(self, language_id, source_code):
+        # Backends that cannot build ahead of the runs return None and compile per run.
+        return None
+
+    def submit_batch(self, payloads):
+        raise NotImplementedError
+
+    def fetch_results(self, tokens):
+        # One non-blocking round: {token: result} for the tokens that have finished.
+        raise NotImplementedError
+
+    def wait(self, tokens, timeout):
+        # Block until some token may have finished or timeout passes.
+        time.sleep(timeout)
+
+    def cancel(self, tokens):
+        pass
+
+
+class Judge0Backend(JudgeBackend):
+
+    def __init__(self):
+        # token -> when it was last polled, for tokens whose result Judge0 will PUT back.
+        self._callbacks = {}
+        # token -> payload, for runs whose output is still to be checked locally.
+        self._checks = {}
+
+    def submit_batch(self, payloads):
+        tokens = judge0.submit_batch_to_judge0(payloads)
+        now = time.monotonic()
+        expected = {}
+        for payload, token in zip(payloads, tokens):
+            if token and payload.get("callback_url"):
+                self._callbacks[token] = now
+                expected[token] = payload["callback_url"]
+            if token and payload.get("checker"):
+                self._checks[token] = payload
+        # A callback that beats this registration is refused and picked up by the polling sweep instead.
+        judge0.expect_callbacks(expected)
+        return tokens
+
+    def check(self, token, result):
+        payload = self._checks.pop(token, None)
+        if payload is None or result is None or result.get("status", {}).get("id") != ACCEPTED["id"]:
+            return result
+        return check_result(result, payload, settings.JUDGE_BUILD_DIR, settings.TESTCASE_BLOB_DIR)
+
+    def fetch_results(self, tokens):
+        finished = judge0.pop_callback_results([token for token in tokens if token in self._callbacks])
+
+        # Polling is only the sweeper for callbacks that never arrived.
+        now = time.monotonic()
+        to_poll = []
+        for token in tokens:
+            if token in finished:
+                continue
+            polled_at = self._callbacks.get(token)
+            if polled_at is None or now - polled_at >= settings.JUDGE0_CALLBACK_SWEEP_INTERVAL:
+                to_poll.append(token)
+                if polled_at is not None:
+                    self._callbacks[token] = now
+
+        if to_poll:
+            for token, result in judge0.fetch_batch_results(to_poll).items():
+                if judge0.is_finished(result):
+                    finished[token] = result
+
+        for token in finished:
+            self._callbacks.pop(token, None)
+        return {token: self.check(token, result) for token, result in finished.items()}
+
+    def wait(self, tokens, timeout):
+        # Checking the callback inbox is a cache read, so it can afford a short interval.
+        if any(token in self._callbacks for token in tokens):
+            timeout = min(timeout, settings.JUDGE0_MIN_POLL_INTERVAL)
+        judge0.sleep(timeout)
+
+    def cancel(self, tokens):
+        for token in tokens:
+            self._callbacks.pop(token, None)
+            self._checks.pop(token, None)
+
+
+class LocalBackend(JudgeBackend):
+    runs_in_process = True
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self):
+        # Without a sandbox uid, submitted code runs as the app user, with its network and files.
+        if settings.JUDGE_SANDBOX_UID is None and not settings.DEBUG:
+            raise ImproperlyConfigured("LocalBackend runs untrusted code and needs JUDGE_SANDBOX_UID outside DEBUG.")
+        self._futures = {}
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    context = multiprocessing.get_context("spawn")
+                    sandbox = {}
+                    if settings.JUDGE_SANDBOX_UID is not None:
+                        sandbox = {
+                            "initializer": init_worker,
+                            "initargs": (settings.JUDGE_SANDBOX_UID, settings.JUDGE_SANDBOX_GID, context.Value("i", 0)),
+                        }
+                    # Spawned workers do not carry a copy of the Django process into every run.
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=settings.JUDGE_LOCAL_WORKERS or os.cpu_count(),
+                        mp_context=context,
+                        **sandbox,
+                    )
+        return cls._executor
+
+    def compile(self, language_id, source_code):
+        build_root = settings.JUDGE_BUILD_DIR
+        built = self.get_executor().submit(build, language_id, source_code, build_root).result()
+        prune_builds(build_root, settings.JUDGE_BUILD_CACHE_SIZE)
+        return built
+
+    def submit_batch(self, payloads):
+        executor = self.get_executor()
+        tokens = []
+        for payload in payloads:
+            token = uuid.uuid4().hex
+            self._futures[token] = executor.submit(run_payload, payload, settings.JUDGE_BUILD_DIR, settings.TESTCASE_BLOB_DIR)
+            tokens.append(token)
+        return tokens
+
+    def fetch_results(self, tokens):
+        finished = {}
+        for token in tokens:
+            future = self._futures.get(token)
+            if future is None or not future.done():
+                continue
+            del self._futures[token]
+            try:
+                finished[token] = future.result()
+            except Exception as exc:
+                finished[token] = {"status": INTERNAL_ERROR, "stdout": None, "stderr": str(exc), "time": None, "memory": None}
+        return finished
+
+    def wait(self, tokens, timeout):
+        futures = [self._futures[token] for token in tokens if token in self._futures]
+        if futures:
+            wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+    def cancel(self, tokens):
+        for token in tokens:
+            future = self._futures.pop(token, None)
+            if future is not None:
+                future.cancel()
+
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.JUDGE_BACKEND)()
+    return _backend
@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+# Content-addressed, gzip-compressed storage for test-case data: <root>/<ab>/<sha256>.gz,
+# keyed by the digest of the uncompressed bytes. Kept free of Django imports so the
+# local sandbox workers can read blobs directly.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def blob_path(root, digest):
+    return os.path.join(root, digest[:2], f"{digest}.gz")
+
+
+def store_blob(root, source):
+    # Streams `source` (a binary file object) through the hash and the compressor in chunks.
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, staging = tempfile.mkstemp(prefix=".storing-", dir=root)
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as compressed:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                compressed.write(chunk)
+                size += len(chunk)
+
+        path = blob_path(root, digest.hexdigest())
+        if os.path.exists(path):
+            os.unlink(staging)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staging, path)
+    except BaseException:
+        if os.path.exists(staging):
+            os.unlink(staging)
+        raise
+
+    return digest.hexdigest(), size
+
+
+def store_text(root, text):
+    return store_blob(root, io.BytesIO((text or "").encode("utf-8")))
+
+
+def open_blob(root, digest):
+    return gzip.open(blob_path(root, digest), "rb")
+
+
+def read_text(root, digest):
+    with open_blob(root, digest) as f:
+        return f.read().decode("utf-8", errors="replace")
+
+
+def copy_blob(root, digest, destination_path):
+    with open_blob(root, digest) as source, open(destination_path, "wb") as destination:
+        shutil.copyfileobj(source, destination, CHUNK_SIZE)
+
+
+def iter_digests(root):
+    for prefix in os.listdir(root) if os.path.isdir(root) else []:
+        directory = os.path.join(root, prefix)
+        if prefix.startswith(".") or not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if name.endswith(".gz"):
+                yield name[:-3]
@@ -0,0 +1,80 @@
+import math
+from itertools import zip_longest
+
+# Built-in output comparisons. Each takes two file objects (program output, expected output)
+# and reads them incrementally, so neither side is held in memory. Kept free of Django imports
+# so the local sandbox workers can use them.
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_EPSILON = 1e-6
+
+
+def significant_lines(stream):
+    # Trailing whitespace on each line and trailing blank lines are not significant.
+    blank_lines = 0
+    for line in stream:
+        line = line.rstrip()
+        if not line:
+            blank_lines += 1
+            continue
+        for _ in range(blank_lines):
+            yield line[:0]
+        blank_lines = 0
+        yield line
+
+
+def tokens(stream):
+    pending = None
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if pending:
+            chunk = pending + chunk
+        parts = chunk.split()
+        # A token cut off by the chunk boundary is finished by the next read.
+        pending = None if chunk[-1:].isspace() or not parts else parts.pop()
+        yield from parts
+    if pending:
+        yield pending
+
+
+def _sequences_match(output, expected_output, equal):
+    missing = object()
+    for item, expected_item in zip_longest(output, expected_output, fillvalue=missing):
+        if item is missing or expected_item is missing or not equal(item, expected_item):
+            return False
+    return True
+
+
+def lines_match(output, expected_output, epsilon = None):
+    return _sequences_match(significant_lines(output), significant_lines(expected_output), lambda a, b: a == b)
+
+
+def tokens_match(output, expected_output, epsilon = None):
+    return _sequences_match(tokens(output), tokens(expected_output), lambda a, b: a == b)
+
+
+def _floats_equal(token, expected_token, epsilon):
+    if token == expected_token:
+        return True
+    try:
+        value, expected_value = float(token), float(expected_token)
+    except ValueError:
+        return False
+    if math.isnan(value) or math.isnan(expected_value):
+        return False
+    # Absolute error for small answers, relative error for large ones.
+    return abs(value - expected_value) <= epsilon * max(1.0, abs(expected_value))
+
+
+def floats_match(output, expected_output, epsilon = None):
+    epsilon = DEFAULT_EPSILON if epsilon is None else epsilon
+    return _sequences_match(tokens(output), tokens(expected_output), lambda a, b: _floats_equal(a, b, epsilon))
+
+
+COMPARATORS = {
+    "lines": lines_match,
+    "tokens": tokens_match,
+    "float": floats_match,
+}
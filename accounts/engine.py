@@ -0,0 +1,111 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .judge0 import poll_delays
+
+ACCEPTED_STATUS_ID = 3
+
+_global_slots = None
+_global_slots_lock = threading.Lock()
+
+
+def get_global_slots():
+    # Caps the test cases in flight across every submission judged by this process.
+    global _global_slots
+    if _global_slots is None:
+        with _global_slots_lock:
+            if _global_slots is None:
+                _global_slots = threading.BoundedSemaphore(settings.JUDGE_GLOBAL_CONCURRENCY)
+    return _global_slots
+
+
+def is_accepted(result):
+    return result is not None and result.get("status", {}).get("id") == ACCEPTED_STATUS_ID
+
+
+# Runs payloads with at most `concurrency` in flight (a sliding window polled in one batch
+# per round) and stops dispatching once a case fails. Results are aligned with payloads;
+# cases behind the first failure that never ran or were cancelled come back as None.
+# on_result(index, result) is called as each case finishes, in completion order.
+def run_testcases(backend, payloads, time_limit = 2, concurrency = None, timeout = None, on_result = None):
+    concurrency = concurrency or settings.JUDGE_SUBMISSION_CONCURRENCY
+    deadline = time.monotonic() + (timeout or settings.JUDGE0_POLL_TIMEOUT)
+    slots = get_global_slots()
+    delays = poll_delays(time_limit)
+
+    results = [None] * len(payloads)
+    finished = [False] * len(payloads)
+    in_flight = {}
+    next_index = 0
+    first_failure = len(payloads)
+    held = 0
+
+    def release(tokens):
+        nonlocal held
+        for token in tokens:
+            in_flight.pop(token)
+            slots.release()
+            held -= 1
+
+    try:
+        while True:
+            dispatch = []
+            while next_index < first_failure and len(in_flight) + len(dispatch) < concurrency:
+                # Block for a slot only when nothing of ours is running, otherwise keep polling.
+                blocking = not in_flight and not dispatch
+                if not slots.acquire(blocking=blocking, timeout=max(deadline - time.monotonic(), 0) if blocking else None):
+                    break
+                held += 1
+                dispatch.append(next_index)
+                next_index += 1
+
+            if dispatch:
+                tokens = backend.submit_batch([payloads[index] for index in dispatch])
+                for index, token in zip(dispatch, tokens):
+                    if token is None:
+                        slots.release()
+                        held -= 1
+                        finished[index] = True
+                        first_failure = min(first_failure, index)
+                    else:
+                        in_flight[token] = index
+
+            if not in_flight:
+                if next_index >= first_failure or time.monotonic() > deadline:
+                    break
+                continue
+
+            done = backend.fetch_results(list(in_flight))
+            for token, result in done.items():
+                index = in_flight[token]
+                results[index] = result
+                finished[index] = True
+                if not is_accepted(result):
+                    first_failure = min(first_failure, index)
+                if on_result is not None:
+                    on_result(index, result)
+            release(done)
+
+            # Cases behind the first failure can never change the verdict.
+            abandoned = [token for token, index in in_flight.items() if index > first_failure]
+            if abandoned:
+                backend.cancel(abandoned)
+                release(abandoned)
+
+            if all(finished[:first_failure + 1]) and next_index >= first_failure:
+                break
+            if time.monotonic() > deadline:
+                break
+            if done:
+                delays = poll_delays(time_limit)
+            else:
+                backend.wait(list(in_flight), next(delays))
+    finally:
+        if in_flight:
+            backend.cancel(list(in_flight))
+        for _ in range(held):
+            slots.release()
+
+    return results
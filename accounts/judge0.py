@@ -1,17 +1,213 @@
-import requests
+import base64
+import binascii
+import random
+import threading
 import time
+from email.utils import parsedate_to_datetime
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
 
-HEADERS = {
-    "X-RapidAPI-Host": settings.JUDGE0_API_HOST,
-    "X-RapidAPI-Key": settings.JUDGE0_API_KEY,
-    "Content-Type": "application/json",
-}
+from .blobs import read_text
+from django.utils.crypto import constant_time_compare, salted_hmac
 
-API_URL = settings.JUDGE0_API_URL
+RESULT_FIELDS = "token,stdout,stderr,compile_output,status,time,memory"
 
-def submit_code_to_judge0(sourcecode, language_id, stdin = "", expected_output = "", time_limit = 2, memory_limit = 141000 ):
-    payload ={
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# A POST that reached Judge0 may have created submissions even if the answer never came back, so
+# it is only resent when the connection was never made or Judge0 turned it away unprocessed.
+POST_RETRY_STATUS_CODES = (429,)
+
+# Judge0 PUTs callbacks base64-encoded whatever the submission asked for.
+CALLBACK_ENCODED_FIELDS = ("stdout", "stderr", "compile_output", "message")
+
+
+class Judge0Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.retries = 0
+        self.wait_time = 0.0
+
+    def record_round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_time += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "round_trips": self.round_trips,
+                "retries": self.retries,
+                "wait_time": round(self.wait_time, 3),
+            }
+
+
+metrics = Judge0Metrics()
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_headers():
+    return {
+        "X-RapidAPI-Host": settings.JUDGE0_API_HOST,
+        "X-RapidAPI-Key": settings.JUDGE0_API_KEY,
+        "Content-Type": "application/json",
+    }
+
+def get_session():
+    # One pooled keep-alive session per process, so polling reuses the same TCP/TLS connections.
+    # Built on first use: requests is only imported by processes that talk to Judge0.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                if not settings.JUDGE0_API_URL:
+                    raise ImproperlyConfigured("JUDGE0_API_URL must be set to use the Judge0 backend.")
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.JUDGE0_POOL_CONNECTIONS,
+                    pool_maxsize=settings.JUDGE0_POOL_MAXSIZE,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(get_headers())
+                _session = session
+    return _session
+
+def sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+        metrics.record_wait(seconds)
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delays(base, factor = 2, max_delay = None):
+    # Exponential backoff with full jitter, capped at max_delay.
+    max_delay = max_delay or settings.JUDGE0_MAX_BACKOFF
+    delay = base
+    while True:
+        yield random.uniform(delay / 2, delay)
+        delay = min(delay * factor, max_delay)
+
+def poll_delays(time_limit):
+    # Nothing finishes much faster than its own run time, so the first wait scales with time_limit.
+    base = min(max(float(time_limit or 0) / 4, settings.JUDGE0_MIN_POLL_INTERVAL), settings.JUDGE0_MAX_BACKOFF)
+    return backoff_delays(base, factor = 1.5)
+
+def _never_sent(exc):
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    # requests wraps a refused connection as ConnectionError(MaxRetryError(reason=NewConnectionError)).
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+def judge0_request(method, path, **kwargs):
+    import requests
+
+    kwargs.setdefault("timeout", (settings.JUDGE0_CONNECT_TIMEOUT, settings.JUDGE0_READ_TIMEOUT))
+    delays = backoff_delays(settings.JUDGE0_RETRY_BACKOFF)
+    idempotent = method.upper() != "POST"
+    retry_status_codes = RETRY_STATUS_CODES if idempotent else POST_RETRY_STATUS_CODES
+
+    for attempt in range(settings.JUDGE0_MAX_RETRIES + 1):
+        last_attempt = attempt == settings.JUDGE0_MAX_RETRIES
+        metrics.record_round_trip()
+        try:
+            response = get_session().request(method, f"{settings.JUDGE0_API_URL}{path}", **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            if last_attempt or not (idempotent or _never_sent(exc)):
+                raise
+            metrics.record_retry()
+            sleep(next(delays))
+            continue
+
+        if response.status_code in retry_status_codes and not last_attempt:
+            metrics.record_retry()
+            wait = _retry_after(response)
+            sleep(wait if wait is not None else next(delays))
+            continue
+
+        response.raise_for_status()
+        return response.json()
+
+def callback_signature(submission_id):
+    return salted_hmac("judge0-callback", str(submission_id), algorithm="sha256").hexdigest()
+
+def verify_callback_signature(submission_id, signature):
+    return constant_time_compare(callback_signature(submission_id), signature)
+
+def callback_url(submission_id):
+    if not settings.JUDGE0_CALLBACK_BASE_URL:
+        return None
+    path = reverse("judge0_callback", args=[submission_id, callback_signature(submission_id)])
+    return settings.JUDGE0_CALLBACK_BASE_URL.rstrip("/") + path
+
+def callback_key(token):
+    return f"judge0:callback:{token}"
+
+def callback_owner_key(token):
+    return f"judge0:callback-owner:{token}"
+
+def expect_callbacks(urls):
+    # {token: callback_url} as submitted. The URL carries the signed submission id, so a callback
+    # is only accepted for a token that was sent with that same submission's URL.
+    cache.set_many({callback_owner_key(token): url for token, url in urls.items()}, settings.JUDGE0_CALLBACK_TIMEOUT)
+
+def callback_expected(submission_id, token):
+    url = cache.get(callback_owner_key(token))
+    return url is not None and constant_time_compare(url, callback_url(submission_id) or "")
+
+def decode_callback_result(result):
+    result = dict(result)
+    for field in CALLBACK_ENCODED_FIELDS:
+        value = result.get(field)
+        if value is None:
+            continue
+        try:
+            result[field] = base64.b64decode(value).decode("utf-8", errors="replace")
+        except (binascii.Error, TypeError):
+            raise ValueError(f"{field} is not valid base64")
+    return result
+
+def store_callback_result(result):
+    cache.set(callback_key(result["token"]), result, settings.JUDGE0_CALLBACK_TIMEOUT)
+    cache.delete(callback_owner_key(result["token"]))
+
+def pop_callback_results(tokens):
+    found = cache.get_many([callback_key(token) for token in tokens])
+    if found:
+        cache.delete_many(list(found))
+    return {result["token"]: result for result in found.values()}
+
+def build_payload(sourcecode, language_id, stdin = "", expected_output = "", time_limit = 2, memory_limit = 141000, callback_url = None,
+                  stdin_blob = None, expected_output_blob = None, checker = None ):
+    payload = {
         "source_code": sourcecode,
         "language_id" : language_id,
         "stdin": stdin,
@@ -19,29 +215,63 @@ def submit_code_to_judge0(sourcecode, language_id, stdin = "", expected_output =
         "cpu_time_limit": time_limit,
         "memory_limit": memory_limit,
     }
+    if callback_url:
+        # Judge0 PUTs the finished result here, so the worker only polls tokens whose callback got lost.
+        payload["callback_url"] = callback_url
+    if stdin_blob:
+        payload["stdin_blob"] = stdin_blob
+    if expected_output_blob:
+        payload["expected_output_blob"] = expected_output_blob
+    if checker:
+        payload["checker"] = checker
+    return payload
 
-    response = requests.post(
-         f"{API_URL}/submissions?base64_encoded=false&wait=false",
-         json = payload,
-         headers= HEADERS,
-    )
+def materialize_payload(payload):
+    # Test data referenced by digest is only read from its blob when the case is actually sent.
+    payload = dict(payload)
+    if payload.pop("checker", None):
+        # The output is compared locally (sandbox.check_result), so the expected output is never sent.
+        payload.pop("expected_output", None)
+        payload.pop("expected_output_blob", None)
+    for field in ("stdin", "expected_output"):
+        digest = payload.pop(f"{field}_blob", None)
+        if digest:
+            payload[field] = read_text(settings.TESTCASE_BLOB_DIR, digest)
+    return payload
 
-    response.raise_for_status()
-    return response.json()["token"]
+def is_finished(result):
+    return result.get("status", {}).get("id", 0) not in [1,2]
 
-def get_submission_result(token, retries = 20, wait_time = 0.5):
-    for _ in range(retries):
-        response = requests.get(
-            f"{API_URL}/submissions/{token}?base64_encoded=false",
-            headers=HEADERS
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def submit_batch_to_judge0(payloads):
+    # Judge0 caps the number of submissions per batch request, so large problems take a few POSTs.
+    tokens = []
+    for chunk in _chunks(payloads, settings.JUDGE0_BATCH_SIZE):
+        created = judge0_request(
+            "POST",
+            "/submissions/batch",
+            params = {"base64_encoded": "false"},
+            json = {"submissions": [materialize_payload(payload) for payload in chunk]},
         )
 
-        response.raise_for_status()
-        result = response.json()
-        status_id = result.get("status", {}).get("id",0)
+        for item in created:
+            # Rejected entries come back as a dict of validation errors instead of a token.
+            tokens.append(item.get("token"))
+    return tokens
 
-        if status_id in [1,2]:
-            time.sleep(wait_time)
-            continue
-        return result
-    return None
\ No newline at end of file
+def fetch_batch_results(tokens):
+    results = {}
+    for chunk in _chunks([token for token in tokens if token], settings.JUDGE0_BATCH_SIZE):
+        fetched = judge0_request(
+            "GET",
+            "/submissions/batch",
+            params = {"tokens": ",".join(chunk), "base64_encoded": "false", "fields": RESULT_FIELDS},
+        )
+
+        for result in fetched.get("submissions", []):
+            if result:
+                results[result["token"]] = result
+    return results
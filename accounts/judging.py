@@ -0,0 +1,251 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import leaderboard
+from .models import CustomUser, Problem, Submission, SubmissionTestCaseResult
+from .backends import get_backend
+from .engine import is_accepted, run_testcases
+from .judge0 import build_payload, callback_url
+from .progress import publish_done, publish_testcase
+from .scheduler import next_submission_id, record_claim
+from .sandbox import source_digest
+from .verdict_cache import get_cached_verdicts, store_verdicts, verdict_keys
+
+
+LANGUAGE_MAP = {
+    71: 'Python 3',
+    54: 'C++',
+    62: 'Java',
+}
+
+# Judge0 status ids -> Submission.status choices
+JUDGE0_STATUS_MAP = {
+    3: "ACCEPTED",
+    4: "WRONG_ANSWER",
+    5: "TLE",
+    6: "CE",
+    7: "RE",
+    8: "RE",
+    9: "RE",
+    10: "RE",
+    11: "RE",
+    12: "RE",
+}
+
+FINISHED_STATUSES = ("ACCEPTED", "WRONG_ANSWER", "TLE", "RE", "CE", "ERROR")
+
+
+def enqueue_submission(user, problem, code, language_id):
+    return Submission.objects.create(
+        user=user,
+        problem=problem,
+        code=code,
+        language_id=language_id,
+        language_name=LANGUAGE_MAP.get(language_id, 'Unknown'),
+        status="PENDING"
+    )
+
+
+def requeue_stale_submissions():
+    # Rows left RUNNING by a worker that crashed or was redeployed; NULL claims predate the lease.
+    expired = timezone.now() - timedelta(seconds=settings.JUDGE_SUBMISSION_LEASE)
+    return (
+        Submission.objects.filter(status="RUNNING")
+        .filter(Q(claimed_at__lt=expired) | Q(claimed_at__isnull=True))
+        .update(status="PENDING", claimed_at=None)
+    )
+
+
+def claim_next_submission():
+    requeue_stale_submissions()
+    while True:
+        submission_id = next_submission_id()
+        if submission_id is None:
+            return None
+
+        # Only one worker can flip PENDING -> RUNNING, the others retry with the next row.
+        claimed = Submission.objects.filter(id=submission_id, status="PENDING").update(status="RUNNING", claimed_at=timezone.now())
+        if claimed:
+            submission = Submission.objects.select_related("user", "problem").get(id=submission_id)
+            record_claim(submission)
+            return submission
+
+
+def submission_status_from_result(result):
+    if result is None:
+        return "ERROR"
+    status_id = result.get("status", {}).get("id", 0)
+    return JUDGE0_STATUS_MAP.get(status_id, "ERROR")
+
+
+def result_description(result):
+    if result is None:
+        return 'System Error'
+    return result.get("status", {}).get('description', 'Unknown')
+
+
+def compile_cache_key(language_id, source_code):
+    return f"judge:compile-error:{source_digest(language_id, source_code)}"
+
+
+def get_compile_error(backend, language_id, source_code):
+    # Only failed builds are cached here; successful artifacts are reused by the backend itself.
+    # A compile that timed out or was killed is reported but not cached.
+    compile_error = cache.get(compile_cache_key(language_id, source_code))
+    if compile_error is None:
+        compiled = backend.compile(language_id, source_code)
+        if compiled is not None and not compiled["ok"]:
+            compile_error = compiled["compile_output"]
+            if compiled["final"]:
+                remember_compile_error(language_id, source_code, compile_error)
+    return compile_error
+
+
+def remember_compile_error(language_id, source_code, compile_output):
+    cache.set(compile_cache_key(language_id, source_code), compile_output or "", settings.JUDGE_COMPILE_CACHE_TIMEOUT)
+
+
+def finalize_submission(submission, status, max_time, max_memory, output, already_solved, testcase_results = ()):
+    # Everything a finished submission writes goes out in one transaction with a fixed number of statements.
+    award = submission.problem.points if status == "ACCEPTED" and not already_solved else 0
+
+    with transaction.atomic():
+        # A worker whose lease ran out has lost the job to the requeue and writes nothing.
+        finished = Submission.objects.filter(id=submission.id, claimed_at=submission.claimed_at).update(
+            status=status, time=max_time or None, memory=max_memory or None, output=output,
+        )
+        if not finished:
+            return submission
+
+        SubmissionTestCaseResult.objects.bulk_create(testcase_results)
+        submission.status = status
+        submission.time = max_time or None
+        submission.memory = max_memory or None
+        submission.output = output
+
+        Problem.objects.filter(id=submission.problem_id).update(
+            total_submissions=F('total_submissions') + 1,
+            accepted_submissions=F('accepted_submissions') + (1 if status == "ACCEPTED" else 0),
+        )
+
+        if award:
+            CustomUser.objects.filter(id=submission.user_id).update(points=F('points') + award)
+            user = submission.user
+            user.points = CustomUser.objects.values_list('points', flat=True).get(id=user.id)
+            transaction.on_commit(lambda: leaderboard.record_points(user.id, user.username, user.points, user.points - award),
+                                  robust=True)
+
+        # Robust, so a cache failure after the commit cannot make the worker fail the submission a second time.
+        transaction.on_commit(lambda: publish_done(submission), robust=True)
+
+    return submission
+
+
+def fail_submission(submission):
+    # Judging blew up: count the attempt and close the live progress stream like any other verdict.
+    return finalize_submission(submission, "ERROR", 0, 0, "", already_solved=True)
+
+
+def judge_submission(submission):
+    problem = submission.problem
+    backend = get_backend()
+
+    already_solved = Submission.objects.filter(
+        user=submission.user,
+        problem=problem,
+        status="ACCEPTED"
+    ).exclude(id=submission.id).exists()
+
+    try:
+        compile_error = get_compile_error(backend, submission.language_id, submission.code)
+    except Exception:
+        compile_error = None
+
+    if compile_error is not None:
+        return finalize_submission(submission, "CE", 0, 0, compile_error, already_solved)
+
+    final_status = "ACCEPTED"
+    max_time = 0
+    max_memory = 0
+    last_output = ""
+    testcase_results = []
+
+    testcases = list(problem.testcases.all())
+    judge0_callback_url = callback_url(submission.id)
+    checker = problem.checker_config()
+    payloads = [
+        build_payload(
+            sourcecode=submission.code,
+            language_id=submission.language_id,
+            time_limit=problem.time_limit,
+            memory_limit=problem.memory_limit,
+            callback_url=judge0_callback_url,
+            stdin_blob=testcase.input_digest,
+            expected_output_blob=testcase.output_digest,
+            checker=checker
+        )
+        for testcase in testcases
+    ]
+
+    keys = verdict_keys(submission.code, submission.language_id, testcases, problem.time_limit, problem.memory_limit, checker)
+    results = get_cached_verdicts(keys)
+
+    # A cached failure already fixes the verdict, so only earlier cases still need to run.
+    cutoff = next((index for index, result in enumerate(results) if result is not None and not is_accepted(result)), len(results))
+    missing = [index for index in range(cutoff) if results[index] is None]
+
+    for index, result in enumerate(results[:cutoff + 1]):
+        if result is not None:
+            publish_testcase(submission.id, index, result, result_description(result))
+
+    def on_result(position, result):
+        publish_testcase(submission.id, missing[position], result, result_description(result))
+
+    if missing:
+        try:
+            fresh = run_testcases(backend, [payloads[index] for index in missing], time_limit=problem.time_limit, on_result=on_result)
+        except Exception:
+            fresh = [None] * len(missing)
+
+        for index, result in zip(missing, fresh):
+            results[index] = result
+        store_verdicts([keys[index] for index in missing], fresh)
+
+    for testcase, result in zip(testcases, results):
+        status_desc = result_description(result)
+        if result is None:
+            output = ''
+            time_used = 0
+            memory_used = 0
+        else:
+            output = result.get('stdout', "")
+            time_used = float(result.get('time') or 0)
+            memory_used = int(result.get('memory') or 0)
+
+        final_status = submission_status_from_result(result)
+        if final_status == "CE":
+            remember_compile_error(submission.language_id, submission.code, result.get("compile_output"))
+            return finalize_submission(submission, "CE", 0, 0, result.get("compile_output"), already_solved)
+
+        testcase_results.append(SubmissionTestCaseResult(
+            submission=submission,
+            testcase=testcase,
+            output=output,
+            status=status_desc,
+            time=time_used,
+            memory=memory_used
+        ))
+
+        max_time = max(max_time, time_used)
+        max_memory = max(max_memory, memory_used)
+        last_output = output
+
+        if final_status != "ACCEPTED":
+            break
+
+    return finalize_submission(submission, final_status, max_time, max_memory, last_output, already_solved, testcase_results)
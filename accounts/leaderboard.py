@@ -0,0 +1,150 @@
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count
+
+from .models import CustomUser
+
+SNAPSHOT_KEY = "leaderboard:top"
+SNAPSHOT_LOCK_KEY = "leaderboard:top:lock"
+SNAPSHOT_LOCK_TIMEOUT = 5
+HISTOGRAM_KEY = "leaderboard:histogram"
+
+# Same ordering everywhere so ranks agree between the snapshot, pages and rank lookups.
+ORDERING = ("-points", "username")
+
+
+def _with_ranks(rows, start = 1):
+    for offset, row in enumerate(rows):
+        row["rank"] = start + offset
+    return rows
+
+
+def build_snapshot():
+    rows = list(
+        CustomUser.objects.order_by(*ORDERING)
+        .values("id", "username", "points")[:settings.LEADERBOARD_SIZE]
+    )
+    snapshot = _with_ranks(rows)
+    cache.set(SNAPSHOT_KEY, snapshot, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_top_users():
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = build_snapshot()
+    return snapshot
+
+
+def _lock_snapshot():
+    # Leased like the scheduler's slots, so a process dying mid-update cannot wedge the leaderboard.
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + 1
+    while not cache.add(SNAPSHOT_LOCK_KEY, token, SNAPSHOT_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(0.01)
+    return token
+
+
+def _unlock_snapshot(token):
+    if cache.get(SNAPSHOT_LOCK_KEY) == token:
+        cache.delete(SNAPSHOT_LOCK_KEY)
+
+
+def record_points(user_id, username, points, previous = None):
+    # Patch the cached top-N and points histogram in place instead of re-sorting the user table. The
+    # read-modify-write runs under a cache lock, so two awards finishing together cannot drop each
+    # other's update. Without the user's previous points the histogram cannot be patched and is dropped.
+    token = _lock_snapshot()
+    if token is None:
+        # Could not get the lock in time: drop the cached copies and let the next read rebuild them.
+        cache.delete_many([SNAPSHOT_KEY, HISTOGRAM_KEY])
+        return
+    try:
+        _patch_snapshot(user_id, username, points)
+        if previous is None:
+            cache.delete(HISTOGRAM_KEY)
+        else:
+            _patch_histogram(previous, points)
+    finally:
+        _unlock_snapshot(token)
+
+
+def _patch_snapshot(user_id, username, points):
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return
+
+    rows = [row for row in snapshot if row["id"] != user_id]
+    is_listed = len(rows) != len(snapshot)
+    full = len(snapshot) >= settings.LEADERBOARD_SIZE
+    if not is_listed and full and (-points, username) > (-snapshot[-1]["points"], snapshot[-1]["username"]):
+        return
+
+    rows.append({"id": user_id, "username": username, "points": points})
+    rows.sort(key=lambda row: (-row["points"], row["username"]))
+    cache.set(SNAPSHOT_KEY, _with_ranks(rows[:settings.LEADERBOARD_SIZE]), settings.LEADERBOARD_CACHE_TIMEOUT)
+
+
+def _histogram(counts):
+    # keys holds every distinct points value negated, so it sorts ascending for bisect;
+    # ahead[i] is how many users have more points than -keys[i].
+    keys = sorted(counts)
+    ahead = [0]
+    for key in keys:
+        ahead.append(ahead[-1] + counts[key])
+    return {"counts": counts, "keys": keys, "ahead": ahead}
+
+
+def build_histogram():
+    # One GROUP BY over the points index; the result has one entry per distinct score, not per user.
+    rows = CustomUser.objects.values("points").annotate(users=Count("id")).order_by()
+    histogram = _histogram({-row["points"]: row["users"] for row in rows})
+    cache.set(HISTOGRAM_KEY, histogram, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return histogram
+
+
+def _patch_histogram(previous, points):
+    histogram = cache.get(HISTOGRAM_KEY)
+    if histogram is None:
+        return
+
+    counts = dict(histogram["counts"])
+    if counts.get(-previous, 0) <= 1:
+        counts.pop(-previous, None)
+    else:
+        counts[-previous] -= 1
+    counts[-points] = counts.get(-points, 0) + 1
+    cache.set(HISTOGRAM_KEY, _histogram(counts), settings.LEADERBOARD_CACHE_TIMEOUT)
+
+
+def users_ahead(points):
+    histogram = cache.get(HISTOGRAM_KEY)
+    if histogram is None:
+        histogram = build_histogram()
+    return histogram["ahead"][bisect_left(histogram["keys"], -points)]
+
+
+def get_rank(user):
+    # Users with more points come from a binary search of the cached histogram. Ties are broken by
+    # username like everywhere else, which takes one count over the tied users' slice of the
+    # (-points, username) index; that part is cached per (user, points) for LEADERBOARD_CACHE_TIMEOUT.
+    key = f"leaderboard:tied:{user.pk}:{user.points}"
+    tied_ahead = cache.get(key)
+    if tied_ahead is None:
+        tied_ahead = CustomUser.objects.filter(points=user.points, username__lt=user.username).count()
+        cache.set(key, tied_ahead, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return users_ahead(user.points) + tied_ahead + 1
+
+
+def get_page(number):
+    users = CustomUser.objects.order_by(*ORDERING).values("id", "username", "points")
+    page = Paginator(users, settings.LEADERBOARD_PAGE_SIZE).get_page(number)
+    page.object_list = _with_ranks(list(page.object_list), page.start_index())
+    return page
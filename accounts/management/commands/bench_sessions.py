@@ -0,0 +1,104 @@
+import re
+import statistics
+import time
+import uuid
+
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+CODE_PATTERN = re.compile(r"(\d{6})")
+
+
+def session_queries(queries):
+    reads = writes = 0
+    for query in queries:
+        sql = query["sql"]
+        if "django_session" not in sql:
+            continue
+        if sql.lstrip().upper().startswith("SELECT"):
+            reads += 1
+        else:
+            writes += 1
+    return reads, writes
+
+
+class Command(BaseCommand):
+    help = "Run a burst of signups through each session engine and report session table growth and writes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--signups", type=int, default=200)
+        parser.add_argument("--verified", type=float, default=0.5,
+                            help="Share of signups that go on to enter their code and log in.")
+        parser.add_argument("--requests", type=int, default=5, help="Page views by each verified user.")
+        parser.add_argument("--engines", default=",".join(ENGINES), help="Comma-separated: " + ", ".join(ENGINES))
+        parser.add_argument("--real-hasher", action="store_true",
+                            help="Keep the configured password hasher instead of a fast one.")
+
+    def handle(self, *args, **options):
+        overrides = {
+            "ALLOWED_HOSTS": ["testserver"],
+            "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+        }
+        if not options["real_hasher"]:
+            # The deliberately slow hasher would otherwise dominate the timings.
+            overrides["PASSWORD_HASHERS"] = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+        self.stdout.write(f"{'engine':<16}{'signup ms':>11}{'rows added':>12}{'writes':>8}{'reads':>8}"
+                          f"{'writes/view':>13}")
+        for name in options["engines"].split(","):
+            with override_settings(SESSION_ENGINE=ENGINES[name], **overrides):
+                row = self.run_engine(options["signups"], options["verified"], options["requests"])
+            self.stdout.write(f"{name:<16}{row['signup_ms']:>11.2f}{row['rows_added']:>12}{row['writes']:>8}"
+                              f"{row['reads']:>8}{row['writes_per_view']:>13.2f}")
+
+    def run_engine(self, signups, verified, requests):
+        prefix = f"bs{uuid.uuid4().hex[:6]}_"
+        existing = set(Session.objects.values_list("session_key", flat=True))
+        verify_every = round(1 / verified) if verified > 0 else 0
+        timings, view_writes, views = [], 0, 0
+        mail.outbox = []
+
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                for i in range(signups):
+                    client = Client()
+                    username = f"{prefix}{i}"
+                    started = time.perf_counter()
+                    client.post("/signup/", {"username": username, "email": f"{username}@example.com",
+                                             "password": "benchmark-pass", "confirm_password": "benchmark-pass"})
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                    if not verify_every or i % verify_every:
+                        continue
+                    code = CODE_PATTERN.search(mail.outbox[-1].body).group(1)
+                    client.post("/verifyemail/", {"code": code})
+                    for _ in range(requests):
+                        before = len(queries.captured_queries)
+                        client.get("/problems/")
+                        view_writes += session_queries(queries.captured_queries[before:])[1]
+                        views += 1
+            reads, writes = session_queries(queries.captured_queries)
+            rows_added = Session.objects.exclude(session_key__in=existing).count()
+        finally:
+            Session.objects.exclude(session_key__in=existing).delete()
+            CustomUser.objects.filter(username__startswith=prefix).delete()
+
+        return {
+            "signup_ms": statistics.mean(timings) if timings else 0,
+            "rows_added": rows_added,
+            "writes": writes,
+            "reads": reads,
+            "writes_per_view": view_writes / views if views else 0,
+        }
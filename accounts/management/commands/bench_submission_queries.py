@@ -0,0 +1,165 @@
+import os
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounts.models import CustomUser, Problem, Submission
+
+BENCH_PREFIX = "bench_"
+STATUSES = ["ACCEPTED", "WRONG_ANSWER", "TLE", "RE", "CE"]
+
+
+def is_scratch_database(name):
+    # Test databases (test_*), in-memory SQLite and anything named for benchmarking.
+    name = str(name)
+    base = os.path.basename(name)
+    return name == ":memory:" or "mode=memory" in name or base.startswith("test") or "bench" in base
+
+
+class Command(BaseCommand):
+    help = ("Seed a large Submission table and compare hot query plans/latencies with and without the composite indexes. "
+            "Only for a scratch database: it drops the live Submission indexes while measuring.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Submissions to seed.")
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--problems", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query.")
+        parser.add_argument("--skip-seed", action="store_true", help="Reuse rows seeded by an earlier run.")
+        parser.add_argument("--keep", action="store_true", help="Leave the seeded rows in place.")
+        parser.add_argument("--i-know", action="store_true",
+                            help="Run against a database that does not look like a scratch one.")
+
+    def handle(self, *args, **options):
+        name = connection.settings_dict["NAME"]
+        if not options["i_know"] and not is_scratch_database(name):
+            raise CommandError(
+                f"Refusing to seed {options['rows']} submissions into {name!r} and drop its indexes while it runs. "
+                "Point DB_NAME at a scratch database (named test* or *bench*) or pass --i-know."
+            )
+
+        if not options["skip_seed"]:
+            self.seed(options["rows"], options["users"], options["problems"])
+
+        users = list(CustomUser.objects.filter(username__startswith=BENCH_PREFIX).values_list("id", flat=True)[:100])
+        problems = list(Problem.objects.filter(slug__startswith=BENCH_PREFIX).values_list("id", flat=True))
+        if not users or not problems:
+            self.stderr.write("No benchmark rows found; run without --skip-seed first.")
+            return
+
+        try:
+            self.set_indexes(enabled=False)
+            before = self.measure(users, problems, options["repeat"])
+        finally:
+            self.set_indexes(enabled=True)
+        after = self.measure(users, problems, options["repeat"])
+
+        self.stdout.write("")
+        self.stdout.write(f"{'query':<16}{'before p50 ms':>16}{'after p50 ms':>16}{'speedup':>10}")
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            self.stdout.write(f"{name:<16}{before[name]:>16.3f}{after[name]:>16.3f}{speedup:>9.1f}x")
+
+        if not options["keep"]:
+            self.cleanup()
+
+    def seed(self, rows, user_count, problem_count):
+        self.stdout.write(f"Seeding {rows} submissions over {user_count} users and {problem_count} problems...")
+        self.cleanup()
+
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"{BENCH_PREFIX}{i}", email=f"{BENCH_PREFIX}{i}@example.com") for i in range(user_count)],
+            batch_size=1000,
+        )
+        Problem.objects.bulk_create(
+            [Problem(title=f"Bench {i}", slug=f"{BENCH_PREFIX}{i}", description="", input_format="",
+                     output_format="", constraints="", sample_input="", sample_output="") for i in range(problem_count)],
+            batch_size=1000,
+        )
+        users = list(CustomUser.objects.filter(username__startswith=BENCH_PREFIX).values_list("id", flat=True))
+        problems = list(Problem.objects.filter(slug__startswith=BENCH_PREFIX).values_list("id", flat=True))
+
+        batch = []
+        for i in range(rows):
+            batch.append(Submission(
+                user_id=random.choice(users),
+                problem_id=random.choice(problems),
+                code="",
+                language_id=71,
+                status=random.choice(STATUSES),
+            ))
+            if len(batch) == 5000 or i == rows - 1:
+                with transaction.atomic():
+                    Submission.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"  {i + 1} rows", ending="\r")
+        self.stdout.write("")
+
+        # auto_now_add ignores explicit values: age everything, then put roughly 1 in 90 rows on today.
+        now = timezone.now()
+        Submission.objects.filter(problem_id__in=problems).update(submitted_at=now - timedelta(days=45))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Submission._meta.db_table} SET submitted_at = %s WHERE id %% 90 = 0 AND problem_id >= %s",
+                [now, min(problems)],
+            )
+
+    def queries(self, users, problems):
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        user_id = random.choice(users)
+        problem_id = random.choice(problems)
+        return {
+            "daily_count": Submission.objects.filter(user_id=user_id, problem_id=problem_id, submitted_at__gte=today_start),
+            "already_solved": Submission.objects.filter(user_id=user_id, problem_id=problem_id, status="ACCEPTED"),
+            "problem_stats": Submission.objects.filter(problem_id=problem_id).values("problem").annotate(
+                total=Count("id"), accepted=Count("id", filter=Q(status="ACCEPTED"))).order_by(),
+            "queue_head": Submission.objects.filter(status="PENDING").order_by("submitted_at", "id").values_list("id", flat=True)[:1],
+        }
+
+    def measure(self, users, problems, repeat):
+        with_indexes = "with" if self.indexes_present() else "without"
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nQuery plans {with_indexes} composite indexes"))
+        for name, queryset in self.queries(users, problems).items():
+            self.stdout.write(f"-- {name}\n{queryset.explain()}")
+
+        timings = {}
+        for name in self.queries(users, problems):
+            samples = []
+            for _ in range(repeat):
+                queryset = self.queries(users, problems)[name]
+                start = time.perf_counter()
+                if name == "daily_count":
+                    queryset.count()
+                elif name == "already_solved":
+                    queryset.exists()
+                else:
+                    list(queryset)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = statistics.median(samples)
+        return timings
+
+    def indexes_present(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Submission._meta.db_table)
+        return all(index.name in constraints for index in Submission._meta.indexes)
+
+    def set_indexes(self, enabled):
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(cursor, Submission._meta.db_table)
+        with connection.schema_editor() as editor:
+            for index in Submission._meta.indexes:
+                if enabled and index.name not in existing:
+                    editor.add_index(Submission, index)
+                elif not enabled and index.name in existing:
+                    editor.remove_index(Submission, index)
+
+    def cleanup(self):
+        Submission.objects.filter(problem__slug__startswith=BENCH_PREFIX).delete()
+        Problem.objects.filter(slug__startswith=BENCH_PREFIX).delete()
+        CustomUser.objects.filter(username__startswith=BENCH_PREFIX).delete()
@@ -0,0 +1,101 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from accounts.models import Problem, Submission
+
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+
+def build_engine(cached, debug):
+    # A private engine per mode, built from the project's TEMPLATES so context processors match.
+    params = copy.deepcopy(settings.TEMPLATES[0])
+    params.pop("BACKEND")
+    params["NAME"] = f"bench-{'cached' if cached else 'uncached'}"
+    params["APP_DIRS"] = False
+    params["OPTIONS"]["debug"] = debug
+    params["OPTIONS"]["loaders"] = [("django.template.loaders.cached.Loader", LOADERS)] if cached else LOADERS
+    return DjangoTemplates(params)
+
+
+def question_context(problem_count):
+    problems = [
+        Problem(id=i, title=f"Problem {i}", slug=f"problem-{i}", difficulty=("Easy", "Medium", "Hard")[i % 3],
+                points=10 + i % 50, total_submissions=100 + i, accepted_submissions=i % 100)
+        for i in range(1, problem_count + 1)
+    ]
+    top_users = [{"username": f"user{i}", "points": 1000 - i, "rank": i} for i in range(1, 11)]
+    return {"problems": problems, "page": None, "next_cursor": "cursor", "difficulty": "", "query": "",
+            "title": "Problems", "top_users": top_users, "leaderboard_page": None, "my_rank": None}
+
+
+def submit_context(result_count):
+    problem = Problem(id=1, title="Bench problem", slug="bench-problem", description="Description\n" * 20,
+                      input_format="Input\n" * 5, output_format="Output\n" * 5, constraints="1 <= n <= 10^5",
+                      sample_input="1 2\n", sample_output="3\n")
+    results = [
+        {"status": "Accepted" if i % 7 else "Wrong Answer", "time": 0.012 * i, "memory": 2048 + i}
+        for i in range(result_count)
+    ]
+    return {"title": "CodeSubmit", "problem": problem, "submission": Submission(id=1, problem=problem, status="RUNNING"),
+            "test_case_results": results, "submissions_remaining": 2}
+
+
+class Command(BaseCommand):
+    help = "Time question.html and submit_solution.html renders with and without the cached template loader."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--problems", type=int, default=1000, help="Problems listed on question.html.")
+        parser.add_argument("--results", type=int, default=50, help="Test-case results on submit_solution.html.")
+        parser.add_argument("--repeat", type=int, default=50, help="Timed renders per template and mode.")
+        parser.add_argument("--debug", action="store_true", help="Render with template debug on, as in development.")
+        parser.add_argument("--budget-ms", type=float, default=None,
+                            help="Fail if any cached p50 render time exceeds this many milliseconds.")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        cases = [
+            ("question.html", question_context(options["problems"])),
+            ("submit_solution.html", submit_context(options["results"])),
+        ]
+
+        rows = []
+        for template_name, context in cases:
+            row = {"template": template_name}
+            for cached in (False, True):
+                engine = build_engine(cached, options["debug"])
+                started = time.perf_counter()
+                engine.get_template(template_name).render(context, request)
+                first = (time.perf_counter() - started) * 1000
+
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    engine.get_template(template_name).render(context, request)
+                    timings.append((time.perf_counter() - started) * 1000)
+                mode = "cached" if cached else "uncached"
+                row[f"{mode}_first"] = first
+                row[f"{mode}_p50"] = statistics.median(timings)
+            rows.append(row)
+
+        self.stdout.write(f"{'template':<24}{'uncached p50 ms':>17}{'cached first ms':>17}{'cached p50 ms':>15}{'speedup':>9}")
+        for row in rows:
+            speedup = row["uncached_p50"] / row["cached_p50"] if row["cached_p50"] else float("inf")
+            self.stdout.write(f"{row['template']:<24}{row['uncached_p50']:>17.3f}{row['cached_first']:>17.3f}"
+                              f"{row['cached_p50']:>15.3f}{speedup:>8.2f}x")
+
+        budget = options["budget_ms"]
+        if budget is not None:
+            over = [row["template"] for row in rows if row["cached_p50"] > budget]
+            if over:
+                raise CommandError(f"Render time over {budget} ms: {', '.join(over)}")
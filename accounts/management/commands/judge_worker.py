@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.judge0 import metrics
+from accounts.judging import claim_next_submission, fail_submission, judge_submission
+from accounts.scheduler import acquire_slot, metrics as scheduler_metrics, release_slot
+from accounts.verdict_cache import verdict_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Judge pending submissions from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--sleep", type=float, default=settings.JUDGE_WORKER_POLL_INTERVAL,
+                            help="Seconds to wait between queue checks when idle.")
+        parser.add_argument("--threads", type=int, default=1,
+                            help="Submissions judged concurrently by this process.")
+
+    def handle(self, *args, **options):
+        if options["threads"] <= 1:
+            self.work(options)
+            return
+
+        threads = [threading.Thread(target=self.work_in_thread, args=(options,)) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def work_in_thread(self, options):
+        try:
+            self.work(options)
+        finally:
+            connection.close()
+
+    def work(self, options):
+        while True:
+            # Every worker process shares the scheduler's slots, which cap the jobs judged at once.
+            slot = acquire_slot()
+            if slot is None:
+                time.sleep(options["sleep"])
+                continue
+
+            try:
+                submission = claim_next_submission()
+                if submission is not None:
+                    self.judge(submission, options)
+            finally:
+                release_slot(slot)
+
+            if submission is None:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
+
+    def judge(self, submission, options):
+        try:
+            judge_submission(submission)
+        except Exception as exc:
+            self.stderr.write(f"Submission {submission.id} failed: {exc}")
+            try:
+                fail_submission(submission)
+            except Exception as exc:
+                # Left RUNNING; another worker picks it up once its lease runs out.
+                self.stderr.write(f"Submission {submission.id} could not be marked failed: {exc}")
+            return
+
+        self.stdout.write(f"Submission {submission.id}: {submission.status}")
+        if options["verbosity"] > 1:
+            self.stdout.write(f"Judge0 {metrics.snapshot()}")
+            self.stdout.write(f"Verdict cache {verdict_cache_stats()}")
+            self.stdout.write(f"Scheduler {scheduler_metrics()}")
@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.blobs import blob_path, iter_digests
+from accounts.models import TestCase
+
+
+class Command(BaseCommand):
+    help = "Delete test-case blobs that no test case references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=60 * 60,
+                            help="Keep unreferenced blobs younger than this many seconds (they may belong to a save in progress).")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        referenced = set(TestCase.objects.values_list("input_digest", flat=True))
+        referenced.update(TestCase.objects.values_list("output_digest", flat=True))
+        cutoff = time.time() - options["min_age"]
+
+        removed = 0
+        for digest in list(iter_digests(settings.TESTCASE_BLOB_DIR)):
+            path = blob_path(settings.TESTCASE_BLOB_DIR, digest)
+            if digest in referenced or os.path.getmtime(path) > cutoff:
+                continue
+            if not options["dry_run"]:
+                os.unlink(path)
+            removed += 1
+
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} unreferenced blobs."))
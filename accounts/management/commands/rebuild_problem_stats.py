@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from accounts.models import Problem, Submission
+
+
+def rebuild_problem_stats():
+    counts = (
+        Submission.objects.exclude(status__in=("PENDING", "RUNNING"))
+        .values("problem")
+        .annotate(total=Count("id"), accepted=Count("id", filter=Q(status="ACCEPTED")))
+        .order_by()
+    )
+    stats = {row["problem"]: row for row in counts}
+
+    problems = list(Problem.objects.only("id"))
+    for problem in problems:
+        row = stats.get(problem.id, {})
+        problem.total_submissions = row.get("total", 0)
+        problem.accepted_submissions = row.get("accepted", 0)
+
+    with transaction.atomic():
+        Problem.objects.bulk_update(problems, ["total_submissions", "accepted_submissions"], batch_size=1000)
+    return len(problems)
+
+
+class Command(BaseCommand):
+    help = "Recompute Problem.total_submissions / accepted_submissions from the Submission table."
+
+    def handle(self, *args, **options):
+        updated = rebuild_problem_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt submission stats for {updated} problems."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Problem
+from accounts.search import index_problem
+
+
+class Command(BaseCommand):
+    help = "Rebuild the problem search term index."
+
+    def handle(self, *args, **options):
+        count = 0
+        for problem in Problem.objects.only("id", "title", "description", "constraints").iterator():
+            index_problem(problem)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} problems."))
@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+# Runs in a fresh interpreter so nothing is imported yet; the parent process already paid for
+# everything it imported on the way to this command.
+CHILD_SCRIPT = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(json.dumps({"setup_ms": (setup_done - started) * 1000, "total_ms": (time.perf_counter() - started) * 1000}))
+"""
+
+
+def profile_imports(modules):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, *modules],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, imports
+
+
+class Command(BaseCommand):
+    help = "Report per-module import time (python -X importtime) for a cold start of this project."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25, help="Modules to list.")
+        parser.add_argument("--sort", choices=("self", "cumulative"), default="cumulative")
+        parser.add_argument("--urls", action="store_true",
+                            help="Also load the URLconf and the view modules, as the first request does.")
+        parser.add_argument("--import", dest="modules", action="append", default=[], metavar="MODULE",
+                            help="Extra module to import after setup; may be repeated.")
+        parser.add_argument("--json", action="store_true", help="Print the raw measurements as JSON.")
+
+    def handle(self, *args, **options):
+        modules = list(options["modules"])
+        if options["urls"]:
+            modules += [settings.ROOT_URLCONF, "accounts.views"]
+        timings, imports = profile_imports(modules)
+
+        if options["json"]:
+            self.stdout.write(json.dumps({**timings, "imports": imports}))
+            return
+
+        by_package = defaultdict(float)
+        for entry in imports:
+            by_package[entry["module"].split(".")[0]] += entry["self_ms"]
+
+        self.stdout.write(f"django.setup(): {timings['setup_ms']:.1f} ms, total: {timings['total_ms']:.1f} ms, "
+                          f"{len(imports)} modules imported")
+        self.stdout.write("")
+        self.stdout.write(f"{'package':<40}{'self ms':>10}")
+        for package, self_ms in sorted(by_package.items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f"{package:<40}{self_ms:>10.1f}")
+
+        key = f"{options['sort']}_ms"
+        self.stdout.write("")
+        self.stdout.write(f"{'module':<60}{'self ms':>10}{'cumulative ms':>15}")
+        for entry in sorted(imports, key=lambda entry: -entry[key])[:options["top"]]:
+            self.stdout.write(f"{entry['module']:<60}{entry['self_ms']:>10.1f}{entry['cumulative_ms']:>15.1f}")
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import TemplateDoesNotExist
+from django.test import RequestFactory
+from django.urls import reverse
+
+from accounts import views
+
+
+def cached_pages():
+    yield reverse("terms"), views.terms, {}
+    yield reverse("privacypolicy"), views.privacypolicy, {}
+    yield reverse("explore"), views.explore, {}
+    yield reverse("dsadashboard"), views.dsadashboard, {}
+    yield reverse("sqldashboard"), views.sqldashboard, {}
+    for topic_name in views.DSA_TOPICS:
+        yield reverse("dsa_topic_content", args=[topic_name]), views.dsa_topic_content, {"topic_name": topic_name}
+    for topic_name in views.SQL_TOPICS:
+        yield reverse("sql_topic_content", args=[topic_name]), views.sql_topic_content, {"topic_name": topic_name}
+
+
+def warm_page_cache():
+    # Renders every cached page once as an anonymous visitor, which fills the shared page cache
+    # and compiles the templates. Run after a deploy, before traffic arrives.
+    factory = RequestFactory()
+    warmed, missing = [], []
+    for path, view, kwargs in cached_pages():
+        request = factory.get(path)
+        request.user = AnonymousUser()
+        try:
+            view(request, **kwargs)
+        except TemplateDoesNotExist:
+            missing.append(path)
+            continue
+        warmed.append(path)
+    return warmed, missing
+
+
+class Command(BaseCommand):
+    help = "Render the cacheable static pages once so the first visitors get cached copies."
+
+    def handle(self, *args, **options):
+        warmed, missing = warm_page_cache()
+        for path in missing:
+            self.stderr.write(self.style.WARNING(f"Skipped {path}: template missing."))
+        if options["verbosity"] > 1:
+            for path in warmed:
+                self.stdout.write(path)
+        self.stdout.write(self.style.SUCCESS(f"Warmed {len(warmed)} pages."))
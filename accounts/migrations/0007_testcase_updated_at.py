@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_submission_problem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:03
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_counters(apps, schema_editor):
+    Problem = apps.get_model('accounts', 'Problem')
+    Submission = apps.get_model('accounts', 'Submission')
+
+    counts = (
+        Submission.objects.exclude(status__in=('PENDING', 'RUNNING'))
+        .values('problem')
+        .annotate(total=Count('id'), accepted=Count('id', filter=Q(status__in=('ACCEPTED', 'Accepted'))))
+        .order_by()
+    )
+    for row in counts:
+        Problem.objects.filter(id=row['problem']).update(
+            total_submissions=row['total'],
+            accepted_submissions=row['accepted'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_testcase_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='accepted_submissions',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='total_submissions',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_problem_submission_counters'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-points', 'username'], name='user_points_rank_idx'),
+        ),
+    ]
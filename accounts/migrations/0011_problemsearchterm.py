@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:07
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The tokenizer and weights of accounts/search.py as of this migration, copied so later changes
+# there cannot change what this migration indexes. Reindex with rebuild_search_index after those.
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset("""
+a an and are as at be by for from given in is it its of on or that the this to with you your
+""".split())
+FIELD_WEIGHTS = {
+    'title': 10,
+    'constraints': 2,
+    'description': 1,
+}
+MAX_OCCURRENCES = 5
+
+
+def tokenize(text):
+    return [
+        token[:64]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def problem_terms(problem):
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term, occurrences in Counter(tokenize(getattr(problem, field))).items():
+            weights[term] += field_weight * min(occurrences, MAX_OCCURRENCES)
+    return weights
+
+
+def index_existing_problems(apps, schema_editor):
+    # The problems created before the index; new saves are indexed by accounts.search.
+    Problem = apps.get_model('accounts', 'Problem')
+    ProblemSearchTerm = apps.get_model('accounts', 'ProblemSearchTerm')
+    terms = []
+    for problem in Problem.objects.only('id', 'title', 'description', 'constraints').iterator():
+        terms.extend(
+            ProblemSearchTerm(problem_id=problem.id, term=term, weight=weight)
+            for term, weight in problem_terms(problem).items()
+        )
+        if len(terms) >= 5000:
+            ProblemSearchTerm.objects.bulk_create(terms)
+            terms = []
+    ProblemSearchTerm.objects.bulk_create(terms)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_submission_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProblemSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='accounts.problem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'problem', 'weight'], name='search_term_lookup_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_problems, migrations.RunPython.noop),
+    ]
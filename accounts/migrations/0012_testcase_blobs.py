@@ -0,0 +1,101 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:10
+
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# The blob layout as of this migration (<root>/<ab>/<sha256>.gz of the UTF-8 text), copied here
+# so later changes to accounts/blobs.py cannot change what this migration writes or reads.
+def blob_path(root, digest):
+    return os.path.join(root, digest[:2], f'{digest}.gz')
+
+
+def store_text(root, text):
+    data = (text or '').encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(root, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix='.storing-', dir=root)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=6, mtime=0))
+        os.replace(staging, path)
+    return digest, len(data)
+
+
+def read_text(root, digest):
+    with gzip.open(blob_path(root, digest), 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+def move_to_blobs(apps, schema_editor):
+    TestCase = apps.get_model('accounts', 'TestCase')
+    for testcase in TestCase.objects.only('id', 'input_data', 'expected_output').iterator(chunk_size=100):
+        testcase.input_digest, testcase.input_size = store_text(settings.TESTCASE_BLOB_DIR, testcase.input_data)
+        testcase.output_digest, testcase.output_size = store_text(settings.TESTCASE_BLOB_DIR, testcase.expected_output)
+        testcase.save(update_fields=['input_digest', 'input_size', 'output_digest', 'output_size'])
+
+
+def move_from_blobs(apps, schema_editor):
+    TestCase = apps.get_model('accounts', 'TestCase')
+    for testcase in TestCase.objects.only('id', 'input_digest', 'output_digest').iterator(chunk_size=100):
+        testcase.input_data = read_text(settings.TESTCASE_BLOB_DIR, testcase.input_digest) if testcase.input_digest else ''
+        testcase.expected_output = read_text(settings.TESTCASE_BLOB_DIR, testcase.output_digest) if testcase.output_digest else ''
+        testcase.save(update_fields=['input_data', 'expected_output'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_problemsearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='input_digest',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_size',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_digest',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_size',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(move_to_blobs, move_from_blobs),
+        # A default lets the columns be re-added on the way back before the data is restored.
+        migrations.AlterField(
+            model_name='testcase',
+            name='input_data',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='expected_output',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='testcase',
+            name='input_data',
+        ),
+        migrations.RemoveField(
+            model_name='testcase',
+            name='expected_output',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_testcase_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='checker_code',
+            field=models.TextField(blank=True, help_text='Called as: checker <input> <output> <answer>; exit 0 accepts, 1 or 2 rejects.'),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_epsilon',
+            field=models.FloatField(default=1e-06),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_language_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_mode',
+            field=models.CharField(choices=[('lines', 'Exact, ignoring trailing whitespace'), ('tokens', 'Token by token'), ('float', 'Token by token, numbers within epsilon'), ('custom', 'Custom checker program')], default='lines', max_length=10),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Before the judge worker, Submission.status held Judge0's status description rather than a choice value.
+LEGACY_STATUSES = {
+    'Accepted': 'ACCEPTED',
+    'Wrong Answer': 'WRONG_ANSWER',
+    'Time Limit Exceeded': 'TLE',
+    'Compilation Error': 'CE',
+    'System Error': 'ERROR',
+    'Internal Error': 'ERROR',
+    'Exec Format Error': 'ERROR',
+    'Unknown': 'ERROR',
+}
+
+
+def normalize_statuses(apps, schema_editor):
+    Submission = apps.get_model('accounts', 'Submission')
+    for legacy, status in LEGACY_STATUSES.items():
+        Submission.objects.filter(status=legacy).update(status=status)
+    Submission.objects.filter(status__startswith='Runtime Error').update(status='RE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_problem_checker'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+    ]
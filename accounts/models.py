@@ -5,6 +5,10 @@ from django.utils import timezone
 from django.utils.text import slugify
 from datetime import timedelta
 from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from . import blobs
+from .sandbox import LANGUAGES
 
 # Create your models here.
 
@@ -43,6 +47,11 @@ class CustomUser(AbstractBaseUser,PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-points', 'username'], name='user_points_rank_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -66,6 +75,13 @@ class VerifiedEmail(models.Model):
         return f"Verification for {self.user.username} - Code : {self.code}"
 
 class Problem(models.Model):
+    CHECKER_CHOICES = [
+        ("lines", 'Exact, ignoring trailing whitespace'),
+        ("tokens", 'Token by token'),
+        ("float", 'Token by token, numbers within epsilon'),
+        ("custom", 'Custom checker program'),
+    ]
+
     title = models.CharField(max_length=300)
     slug = models.SlugField(unique=True, blank=True , null=True)
     description = models.TextField()
@@ -78,16 +94,34 @@ class Problem(models.Model):
     points = models.IntegerField(default=0)
     time_limit = models.FloatField(default=1.5)
     memory_limit = models.IntegerField(default=130000)
+    total_submissions = models.PositiveIntegerField(default=0, editable=False)
+    accepted_submissions = models.PositiveIntegerField(default=0, editable=False)
+    checker_mode = models.CharField(max_length=10, choices=CHECKER_CHOICES, default="lines")
+    checker_epsilon = models.FloatField(default=1e-6)
+    checker_language_id = models.IntegerField(null=True, blank=True)
+    checker_code = models.TextField(blank=True, help_text="Called as: checker <input> <output> <answer>; exit 0 accepts, 1 or 2 rejects.")
 
     def __str__(self):
         return self.title
+
+    def clean(self):
+        if self.checker_mode == "custom":
+            if self.checker_language_id not in LANGUAGES:
+                raise ValidationError({"checker_language_id": f"Choose one of {sorted(LANGUAGES)}."})
+            if not self.checker_code.strip():
+                raise ValidationError({"checker_code": "A custom checker needs its source code."})
+
+    def checker_config(self):
+        config = {"mode": self.checker_mode, "epsilon": self.checker_epsilon}
+        if self.checker_mode == "custom":
+            config["language_id"] = self.checker_language_id
+            config["source_code"] = self.checker_code
+        return config
     
     def success_rate(self):
-        total_submissions = self.submissions.count()
-        if total_submissions == 0:
+        if self.total_submissions == 0:
             return 0
-        accepted_submissions = self.submissions.filter(status="Accepted").count()
-        return round((accepted_submissions / total_submissions) * 100, 2)
+        return round((self.accepted_submissions / self.total_submissions) * 100, 2)
     
     def save(self, *args , **kwargs):
         if not self.slug:
@@ -100,14 +134,61 @@ class Problem(models.Model):
             self.slug = unique_slug
         super().save(*args, **kwargs)
     
+class ProblemSearchTerm(models.Model):
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # covers term lookups and the per-problem SUM(weight) without touching the table
+            models.Index(fields=['term', 'problem', 'weight'], name='search_term_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.problem_id} ({self.weight})"
+
 class TestCase(models.Model):
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='testcases')
-    input_data = models.TextField()
-    expected_output = models.TextField()
+    # The data lives in compressed content-addressed blobs (accounts/blobs.py); the row only keeps digests and sizes.
+    input_digest = models.CharField(max_length=64, editable=False)
+    input_size = models.PositiveBigIntegerField(default=0, editable=False)
+    output_digest = models.CharField(max_length=64, editable=False)
+    output_size = models.PositiveBigIntegerField(default=0, editable=False)
     is_sample = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'Test case for {self.problem.title}'
+
+    def set_input(self, source):
+        self.input_digest, self.input_size = blobs.store_blob(settings.TESTCASE_BLOB_DIR, source)
+
+    def set_expected_output(self, source):
+        self.output_digest, self.output_size = blobs.store_blob(settings.TESTCASE_BLOB_DIR, source)
+
+    @property
+    def input_data(self):
+        return blobs.read_text(settings.TESTCASE_BLOB_DIR, self.input_digest) if self.input_digest else ""
+
+    @input_data.setter
+    def input_data(self, text):
+        self.input_digest, self.input_size = blobs.store_text(settings.TESTCASE_BLOB_DIR, text)
+
+    @property
+    def expected_output(self):
+        return blobs.read_text(settings.TESTCASE_BLOB_DIR, self.output_digest) if self.output_digest else ""
+
+    @expected_output.setter
+    def expected_output(self, text):
+        self.output_digest, self.output_size = blobs.store_text(settings.TESTCASE_BLOB_DIR, text)
+
+    def save(self, *args, **kwargs):
+        if not self.input_digest:
+            self.input_data = ""
+        if not self.output_digest:
+            self.expected_output = ""
+        super().save(*args, **kwargs)
     
 
 class Submission(models.Model):
@@ -133,6 +214,20 @@ class Submission(models.Model):
     memory = models.IntegerField(null=True, blank=True)
     output = models.TextField(blank=True, null=True)
     token = models.CharField(max_length=255, blank=True, null=True)
+    # When a worker took the job; RUNNING rows older than JUDGE_SUBMISSION_LEASE go back to the queue.
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # daily submission limit: user + problem + submitted_at >= today
+            models.Index(fields=['user', 'problem', 'submitted_at'], name='sub_user_problem_time_idx'),
+            # already-solved check: user + problem + status
+            models.Index(fields=['user', 'problem', 'status'], name='sub_user_problem_status_idx'),
+            # per-problem stats: problem + status
+            models.Index(fields=['problem', 'status'], name='sub_problem_status_idx'),
+            # judge queue: oldest PENDING first
+            models.Index(fields=['status', 'submitted_at'], name='sub_status_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s Submitted to {self.problem.title}"
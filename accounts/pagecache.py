@@ -0,0 +1,116 @@
+import hashlib
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Whole-page caching for views whose output only changes when the templates do. The newest
+# template mtime is the content version: it drives Last-Modified, the ETag and the cache keys,
+# so a deploy with changed templates invalidates everything at once.
+
+_version = None
+
+
+def template_dirs():
+    dirs = list(get_app_template_dirs("templates"))
+    for engine in engines.all():
+        dirs.extend(getattr(engine, "dirs", []))
+    return dirs
+
+
+def precompile_templates():
+    # Loads every template through each engine, so the cached loader holds them all parsed
+    # before the first request. Templates of third-party features that are not installed
+    # (they load missing tag libraries) are skipped and keep failing only if used.
+    compiled, failed = 0, []
+    for engine in engines.all():
+        for directory in template_dirs():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith((".html", ".txt")):
+                        continue
+                    template_name = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+                    try:
+                        engine.get_template(template_name)
+                    except TemplateSyntaxError:
+                        failed.append(template_name)
+                        continue
+                    compiled += 1
+    return compiled, failed
+
+
+def page_version():
+    global _version
+    if _version is None or settings.DEBUG:
+        newest = 0
+        for directory in template_dirs():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+        _version = int(newest)
+    return _version
+
+
+def fragment_context():
+    # For {% cache %} blocks in pages that also show per-user markup.
+    return {"page_version": page_version(), "page_cache_timeout": settings.PAGE_CACHE_TIMEOUT}
+
+
+def _variant(request, per_user):
+    if not per_user or not request.user.is_authenticated:
+        return "public"
+    # The CSRF secret is part of the page (logout form), so it is part of the variant too.
+    return f"user:{request.user.pk}:{request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')}"
+
+
+def page_cache_key(path, variant = "public"):
+    return f"page:{page_version()}:{variant}:{path}"
+
+
+def cached_page(per_user = False):
+    # per_user: the template shows who is logged in. Anonymous visitors still share one cached
+    # copy; signed-in users get a per-user ETag (so 304s work) but no shared copy.
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+
+            version = page_version()
+            variant = _variant(request, per_user)
+            key = page_cache_key(request.path, variant)
+            etag = quote_etag(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+
+            # The date alone cannot tell one user's variant from another's, so per-user pages
+            # are revalidated by ETag only.
+            last_modified = None if per_user else version
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                shared = variant == "public"
+                cached = cache.get(key) if shared else None
+                if cached is not None:
+                    response = HttpResponse(cached["content"], content_type=cached["content_type"])
+                else:
+                    response = view_func(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    if shared:
+                        cache.set(key, {"content": response.content, "content_type": response["Content-Type"]},
+                                  settings.PAGE_CACHE_TIMEOUT)
+
+            response["ETag"] = etag
+            if per_user:
+                patch_vary_headers(response, ["Cookie"])
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                response["Last-Modified"] = http_date(version)
+                patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,25 @@
+from django.conf import settings
+
+# Columns the problem list actually renders; the large TextFields stay in the database.
+PROBLEM_LIST_FIELDS = ("id", "title", "slug", "difficulty", "points", "total_submissions", "accepted_submissions")
+
+
+def parse_cursor(cursor):
+    # No cursor is the first page; anything else has to be an id an earlier page handed out.
+    if not cursor:
+        return None
+    if not cursor.isascii() or not cursor.isdigit():
+        raise ValueError(f"Invalid cursor {cursor!r}.")
+    return int(cursor)
+
+
+def keyset_page(queryset, cursor = None, size = None):
+    # Seeks past the last id seen instead of OFFSET, so every page costs the same index range scan.
+    size = size or settings.PROBLEMS_PER_PAGE
+    last_id = parse_cursor(cursor)
+    if last_id is not None:
+        queryset = queryset.filter(id__gt=last_id)
+
+    items = list(queryset.order_by("id")[:size + 1])
+    next_cursor = items[size - 1].id if len(items) > size else None
+    return items[:size], next_cursor
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+
+# Per-submission event log in the default cache. The judge worker appends, the SSE
+# endpoint tails it; the cache must be shared between processes for live updates.
+
+
+def events_key(submission_id):
+    return f"submission:{submission_id}:events"
+
+
+def publish(submission_id, event):
+    key = events_key(submission_id)
+    events = cache.get(key, [])
+    events.append(event)
+    cache.set(key, events, settings.SUBMISSION_EVENTS_TIMEOUT)
+
+
+def publish_testcase(submission_id, index, result, status_desc):
+    publish(submission_id, {
+        "type": "testcase",
+        "index": index,
+        "status": status_desc,
+        "time": float(result.get("time") or 0) if result else 0,
+        "memory": int(result.get("memory") or 0) if result else 0,
+    })
+
+
+def publish_done(submission):
+    publish(submission.id, {
+        "type": "done",
+        "status": submission.status,
+        "status_display": submission.get_status_display(),
+    })
+
+
+async def read_events(submission_id, start = 0):
+    events = await cache.aget(events_key(submission_id), [])
+    return events[start:]
@@ -0,0 +1,129 @@
+import math
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import Submission
+
+# Counters live in the cache, never in the main tables. add() and incr() are atomic in the
+# locmem, memcached and redis backends, so concurrent requests cannot both take the last slot.
+
+RateLimitResult = namedtuple("RateLimitResult", "allowed remaining retry_after")
+
+
+def get_cache():
+    return caches[settings.RATELIMIT_CACHE_ALIAS]
+
+
+def _incr(key, timeout, initial = 0):
+    cache = get_cache()
+    cache.add(key, initial, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.add(key, initial, timeout)
+        return cache.incr(key)
+
+
+def consume(key, limit, timeout, initial = None):
+    # Fixed window: `limit` hits until the key expires. `initial` seeds a missing counter
+    # (e.g. from the database after an eviction); it is only called when the key is absent.
+    seed = 0
+    if initial is not None and get_cache().get(key) is None:
+        seed = initial()
+    count = _incr(key, timeout, seed)
+    if count > limit:
+        get_cache().decr(key)
+        return RateLimitResult(False, 0, timeout)
+    return RateLimitResult(True, limit - count, 0)
+
+
+def sliding_window(key, limit, window):
+    # Sliding-window counter: the previous window's count, weighted by how much of it still
+    # overlaps the last `window` seconds, plus the current window's count.
+    now = time.time()
+    current = int(now // window)
+    current_key = f"{key}:{current}"
+    count = _incr(current_key, window * 2)
+    previous = get_cache().get(f"{key}:{current - 1}", 0)
+    used = previous * (1 - (now % window) / window) + count
+
+    if used > limit:
+        get_cache().decr(current_key)
+        return RateLimitResult(False, 0, math.ceil(window - now % window))
+    return RateLimitResult(True, int(limit - used), 0)
+
+
+def reset_sliding_window(key, window):
+    current = int(time.time() // window)
+    get_cache().delete_many([f"{key}:{current}", f"{key}:{current - 1}"])
+
+
+def cooldown(key, seconds):
+    # One action per `seconds`; returns the seconds still to wait, or 0 if the action may go ahead.
+    now = time.time()
+    if get_cache().add(key, now + seconds, seconds):
+        return 0
+    until = get_cache().get(key)
+    return max(math.ceil(until - now), 1) if until else 0
+
+
+def _today_start():
+    return timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def submission_quota_key(user_id, problem_id, day):
+    return f"ratelimit:submit:{user_id}:{problem_id}:{day.date().isoformat()}"
+
+
+def consume_submission(user, problem):
+    today_start = _today_start()
+    seconds_left = math.ceil((today_start + timedelta(days=1) - timezone.now()).total_seconds())
+    # The database is only counted when the cache has no counter for today.
+    return consume(
+        submission_quota_key(user.id, problem.id, today_start),
+        settings.SUBMISSION_DAILY_LIMIT,
+        seconds_left,
+        initial=lambda: Submission.objects.filter(user=user, problem=problem, submitted_at__gte=today_start).count(),
+    )
+
+
+def submissions_remaining(user, problem):
+    # A missing counter means nothing was submitted today, or it was evicted; either way it is a cheap guess.
+    used = get_cache().get(submission_quota_key(user.id, problem.id, _today_start()), 0)
+    return max(settings.SUBMISSION_DAILY_LIMIT - used, 0)
+
+
+def consume_run(user):
+    return sliding_window(f"ratelimit:run:{user.id}", settings.RUN_LIMIT, settings.RUN_LIMIT_WINDOW)
+
+
+def verification_email_wait(email):
+    return cooldown(f"ratelimit:verify-email:{email.lower()}", settings.VERIFICATION_EMAIL_INTERVAL)
+
+
+def client_ip(request):
+    header = settings.RATELIMIT_IP_HEADER
+    if header:
+        hops = [hop.strip() for hop in request.META.get(header, "").split(",") if hop.strip()]
+        if hops:
+            # Each trusted proxy appends the address it saw, so the client is the outermost proxy's entry.
+            return hops[-min(settings.RATELIMIT_TRUSTED_PROXIES, len(hops))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def login_attempt(username, ip):
+    window = settings.LOGIN_ATTEMPTS_WINDOW
+    by_user = sliding_window(f"ratelimit:login:user:{username.lower()}", settings.LOGIN_ATTEMPTS_PER_USER, window)
+    if not by_user.allowed:
+        return by_user
+    return sliding_window(f"ratelimit:login:ip:{ip}", settings.LOGIN_ATTEMPTS_PER_IP, window)
+
+
+def login_succeeded(username):
+    reset_sliding_window(f"ratelimit:login:user:{username.lower()}", settings.LOGIN_ATTEMPTS_WINDOW)
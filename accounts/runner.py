@@ -0,0 +1,123 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from . import ratelimit
+from .backends import get_backend
+from .engine import run_testcases
+from .judge0 import build_payload
+from .judging import get_compile_error, result_description, submission_status_from_result
+from .models import Submission
+from .scheduler import acquire_slot, release_slot
+
+# Sample-only runs for the edit-run loop: judged synchronously on the reserved scheduler slots,
+# never queued and never written to the database. Results are cached briefly by content.
+# Runs happen inside the web request, so they are only offered on a remote judge: LocalBackend
+# would start a pool of unsandboxed processes in every web worker, outside the judge workers' limits.
+
+STATUS_DISPLAY = dict(Submission.STATUS_CHOICES)
+
+
+def runs_available():
+    return not import_string(settings.JUDGE_BACKEND).runs_in_process
+
+
+def sample_payloads(problem, code, language_id):
+    checker = problem.checker_config()
+    samples = list(problem.testcases.filter(is_sample=True).only("id", "input_digest", "output_digest"))
+    if not samples:
+        return [build_payload(code, language_id, problem.sample_input, problem.sample_output,
+                              problem.time_limit, problem.memory_limit, checker=checker)]
+    return [
+        build_payload(code, language_id, time_limit=problem.time_limit, memory_limit=problem.memory_limit,
+                      stdin_blob=testcase.input_digest, expected_output_blob=testcase.output_digest, checker=checker)
+        for testcase in samples
+    ]
+
+
+def custom_payloads(problem, code, language_id, stdin):
+    return [build_payload(code, language_id, stdin, None, problem.time_limit, problem.memory_limit)]
+
+
+def run_cache_key(payloads):
+    digest = hashlib.sha256(json.dumps(payloads, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"run:{digest}"
+
+
+def _case(index, result):
+    if result is None:
+        return {"index": index, "status": "Not run", "time": 0, "memory": 0, "stdout": "", "stderr": ""}
+    return {
+        "index": index,
+        "status": result_description(result),
+        "time": float(result.get("time") or 0),
+        "memory": int(result.get("memory") or 0),
+        "stdout": (result.get("stdout") or "")[:settings.RUN_OUTPUT_LIMIT],
+        "stderr": (result.get("stderr") or result.get("compile_output") or "")[:settings.RUN_OUTPUT_LIMIT],
+    }
+
+
+def summarize(results, custom_input):
+    status = "ACCEPTED"
+    for result in results:
+        status = submission_status_from_result(result)
+        if status != "ACCEPTED":
+            break
+
+    if custom_input and status == "ACCEPTED":
+        display = "Finished"
+    else:
+        display = STATUS_DISPLAY.get(status, status)
+    return {
+        "status": status,
+        "status_display": display,
+        "cases": [_case(index, result) for index, result in enumerate(results)],
+    }
+
+
+def run_code(user, problem, code, language_id, stdin = None):
+    # Returns (result, retry_after); result is None when the run was turned away.
+    custom_input = stdin is not None
+    if custom_input:
+        payloads = custom_payloads(problem, code, language_id, stdin)
+    else:
+        payloads = sample_payloads(problem, code, language_id)
+
+    key = run_cache_key(payloads)
+    cached = cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}, 0
+
+    allowed = ratelimit.consume_run(user)
+    if not allowed.allowed:
+        return None, allowed.retry_after
+
+    slot = acquire_slot("run")
+    if slot is None:
+        return None, settings.RUN_RETRY_AFTER
+
+    backend = get_backend()
+    try:
+        try:
+            compile_error = get_compile_error(backend, language_id, code)
+        except Exception:
+            compile_error = None
+
+        if compile_error is not None:
+            results = [{"status": {"id": 6, "description": "Compilation Error"}, "compile_output": compile_error}]
+        else:
+            try:
+                results = run_testcases(backend, payloads, time_limit=problem.time_limit, timeout=settings.RUN_TIMEOUT)
+            except Exception:
+                results = [None] * len(payloads)
+    finally:
+        release_slot(slot)
+
+    summary = summarize(results, custom_input)
+    # Time limits and backend trouble depend on load, so only stable verdicts are remembered.
+    if summary["status"] not in ("ERROR", "TLE"):
+        cache.set(key, summary, settings.RUN_CACHE_TIMEOUT)
+    return {**summary, "cached": False}, 0
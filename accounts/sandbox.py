@@ -0,0 +1,485 @@
+import ctypes
+import hashlib
+import io
+import math
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from .blobs import copy_blob, open_blob
+from .checkers import COMPARATORS, lines_match
+
+# Runs submissions in local subprocesses and reports them in Judge0's result format.
+# Kept free of Django imports so it can run inside process pool workers.
+
+LANGUAGES = {
+    71: {
+        "source": "main.py",
+        "compile": None,
+        "run": [sys.executable, "{build}/main.py"],
+        "limit_address_space": True,
+    },
+    54: {
+        "source": "main.cpp",
+        "compile": ["g++", "-O2", "-std=c++17", "-o", "main", "main.cpp"],
+        "run": ["{build}/main"],
+        "limit_address_space": True,
+    },
+    62: {
+        "source": "Main.java",
+        "compile": ["javac", "Main.java"],
+        "run": ["java", "-Xss64m", "-cp", "{build}", "Main"],
+        # The JVM reserves far more virtual memory than it uses, so Java is capped with -Xmx instead.
+        "limit_address_space": False,
+    },
+}
+
+ACCEPTED = {"id": 3, "description": "Accepted"}
+WRONG_ANSWER = {"id": 4, "description": "Wrong Answer"}
+TIME_LIMIT_EXCEEDED = {"id": 5, "description": "Time Limit Exceeded"}
+COMPILATION_ERROR = {"id": 6, "description": "Compilation Error"}
+RUNTIME_ERROR_NZEC = {"id": 11, "description": "Runtime Error (NZEC)"}
+RUNTIME_ERROR_OTHER = {"id": 12, "description": "Runtime Error (Other)"}
+INTERNAL_ERROR = {"id": 13, "description": "Internal Error"}
+
+SIGNAL_STATUSES = {
+    signal.SIGSEGV: {"id": 7, "description": "Runtime Error (SIGSEGV)"},
+    signal.SIGXFSZ: {"id": 8, "description": "Runtime Error (SIGXFSZ)"},
+    signal.SIGFPE: {"id": 9, "description": "Runtime Error (SIGFPE)"},
+    signal.SIGABRT: {"id": 10, "description": "Runtime Error (SIGABRT)"},
+}
+
+COMPILE_TIMEOUT = 30
+MAX_OUTPUT_BYTES = 64 * 1024 * 1024
+# Only the head of the program output is reported back; the checker reads the full file.
+MAX_REPORTED_OUTPUT = 64 * 1024
+
+# Custom checkers are called as `checker <input> <output> <answer>` and report through their
+# exit code, following testlib: 0 ok, 1 wrong answer, 2 presentation error; anything else is a checker failure.
+CHECKER_EXIT_STATUSES = {0: ACCEPTED, 1: WRONG_ANSWER, 2: WRONG_ANSWER}
+CHECKER_TIME_LIMIT = 10
+CHECKER_MEMORY_LIMIT = 512 * 1024
+
+# Processes and threads per sandbox uid. Each pool worker has a uid of its own (see init_worker),
+# so this is the budget of a single run; the JVM alone starts a couple of dozen threads.
+MAX_PROCESSES = 64
+CLONE_NEWNET = 0x40000000
+CLONE_NEWIPC = 0x08000000
+
+# Programs are started through this launcher so the reported memory is the program's own peak:
+# ru_maxrss of a process forked from Python keeps the Python worker's high-water mark across exec.
+LAUNCHER_SOURCE = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+// launcher <report fd> <program> [args...]: runs the program and writes its wait status and rusage to the fd.
+int main(int argc, char **argv) {
+    if (argc < 3) return 127;
+    int report = atoi(argv[1]);
+    pid_t pid = fork();
+    if (pid < 0) return 127;
+    if (pid == 0) {
+        close(report);
+        execvp(argv[2], argv + 2);
+        _exit(127);
+    }
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0) {}
+    dprintf(report, "%d %ld.%06ld %ld.%06ld %ld\n", status,
+            (long) usage.ru_utime.tv_sec, (long) usage.ru_utime.tv_usec,
+            (long) usage.ru_stime.tv_sec, (long) usage.ru_stime.tv_usec, usage.ru_maxrss);
+    return 0;
+}
+"""
+
+# (uid, gid) the programs of this process run as, set by init_worker; None runs them as ourselves.
+_sandbox = None
+_libc = None
+
+
+def init_worker(base_uid, gid, counter):
+    # ProcessPoolExecutor initializer: worker n runs everything it compiles or executes as base_uid + n.
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    configure_sandbox(base_uid + index, gid)
+
+
+def configure_sandbox(uid, gid):
+    global _sandbox, _libc
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _sandbox = (uid, gid) if uid is not None else None
+
+
+def _enter_sandbox():
+    # Runs in the forked child before exec: no network and no shared IPC, then drop to the sandbox uid
+    # for good, which cannot read anything only the app's own user can (test data, .env, the database).
+    if _sandbox is None:
+        return
+    uid, gid = _sandbox
+    if _libc.unshare(CLONE_NEWNET | CLONE_NEWIPC) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"unshare: {os.strerror(errno)}")
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+    # Limits processes of the sandbox uid; for our own uid it would count the app's processes too.
+    resource.setrlimit(resource.RLIMIT_NPROC, (MAX_PROCESSES, MAX_PROCESSES))
+
+
+def _rlimits(time_limit, memory_limit, limit_address_space):
+    cpu_seconds = max(int(math.ceil(time_limit)), 1)
+
+    def apply():
+        os.setsid()
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_OUTPUT_BYTES, MAX_OUTPUT_BYTES))
+        if memory_limit and limit_address_space:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit * 1024, memory_limit * 1024))
+        _enter_sandbox()
+
+    return apply
+
+
+def _hand_over(path, uid, gid):
+    for root, dirs, files in os.walk(path):
+        os.chown(root, uid, gid)
+        for name in files:
+            os.chown(os.path.join(root, name), uid, gid)
+
+
+def get_launcher(build_root):
+    # Cached like any C++ build, and touched on every run so prune_builds keeps it.
+    # None when it cannot be built (no compiler); programs are then started directly.
+    built = build(54, LAUNCHER_SOURCE, build_root)
+    return os.path.join(built["artifact"], "main") if built["ok"] else None
+
+
+def _read_report(report):
+    fields = report.split()
+    if len(fields) != 4:
+        return None
+    status, utime, stime, maxrss = fields
+    return int(status), float(utime) + float(stime), int(maxrss)
+
+
+def execute(command, workdir, stdin_path, time_limit, memory_limit, limit_address_space = True, launcher = None):
+    stdout_path = os.path.join(workdir, "stdout.txt")
+    stderr_path = os.path.join(workdir, "stderr.txt")
+    wall_limit = time_limit * 2 + 1
+
+    report_read, report_write = os.pipe()
+    if launcher:
+        command = [launcher, str(report_write)] + command
+    try:
+        with open(stdin_path, "rb") as stdin, open(stdout_path, "wb") as stdout, open(stderr_path, "wb") as stderr:
+            process = subprocess.Popen(
+                command,
+                cwd=workdir,
+                stdin=stdin,
+                stdout=stdout,
+                stderr=stderr,
+                pass_fds=(report_write,) if launcher else (),
+                preexec_fn=_rlimits(time_limit, memory_limit, limit_address_space),
+            )
+            os.close(report_write)
+            report_write = None
+
+            # wait4 gives us the child's own rusage, which Popen.wait() throws away.
+            deadline = time.monotonic() + wall_limit
+            timed_out = False
+            while True:
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid:
+                    break
+                if time.monotonic() > deadline:
+                    timed_out = True
+                    os.killpg(process.pid, signal.SIGKILL)
+                    pid, status, usage = os.wait4(process.pid, 0)
+                    break
+                time.sleep(0.005)
+            # Whatever the program left running in its process group goes with it.
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_time, memory = usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+        with os.fdopen(report_read, "r") as f:
+            report_read = None
+            reported = _read_report(f.read()) if launcher and not timed_out else None
+    finally:
+        for fd in (report_read, report_write):
+            if fd is not None:
+                os.close(fd)
+
+    if reported is not None:
+        status, cpu_time, memory = reported
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    with open(stdout_path, "rb") as f:
+        output = f.read(MAX_REPORTED_OUTPUT).decode("utf-8", errors="replace")
+    with open(stderr_path, "rb") as f:
+        errors = f.read(MAX_REPORTED_OUTPUT).decode("utf-8", errors="replace")
+
+    return {
+        "returncode": process.returncode,
+        "timed_out": timed_out,
+        "cpu_time": cpu_time,
+        "memory": memory,
+        "stdout": output,
+        "stderr": errors,
+        "stdout_path": stdout_path,
+    }
+
+
+def open_expected_output(payload, blob_root):
+    if payload.get("expected_output_blob"):
+        return open_blob(blob_root, payload["expected_output_blob"])
+    return io.BytesIO((payload.get("expected_output") or "").encode("utf-8"))
+
+
+def source_digest(language_id, source_code):
+    return hashlib.sha256(f"{language_id}\0{source_code}".encode("utf-8")).hexdigest()
+
+
+def compile_source(language, workdir):
+    # (returncode, output); the returncode is None when the compiler ran out of time.
+    if not language["compile"]:
+        return 0, ""
+    try:
+        completed = subprocess.run(
+            language["compile"],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+            timeout=COMPILE_TIMEOUT,
+            preexec_fn=_enter_sandbox if _sandbox else None,
+        )
+    except subprocess.TimeoutExpired:
+        return None, "Compilation timed out"
+    compile_output = completed.stdout + completed.stderr
+    if completed.returncode < 0:
+        compile_output += f"\nCompiler killed by signal {-completed.returncode}"
+    return completed.returncode, compile_output
+
+
+def _read_build(build_dir):
+    with open(os.path.join(build_dir, "compile_output.txt"), encoding="utf-8") as f:
+        compile_output = f.read()
+    return {
+        "ok": not os.path.exists(os.path.join(build_dir, "FAILED")),
+        "final": True,
+        "compile_output": compile_output,
+        "artifact": build_dir,
+    }
+
+
+def build(language_id, source_code, build_root):
+    # Builds are content-addressed by (language_id, source), so identical code is only compiled once.
+    language = LANGUAGES[language_id]
+    build_dir = os.path.join(build_root, f"{language_id}-{source_digest(language_id, source_code)}")
+
+    if os.path.isdir(build_dir):
+        os.utime(build_dir)
+        return _read_build(build_dir)
+
+    # The sandbox uids may enter the build root but not list it, so a build is only found by its digest.
+    os.makedirs(build_root, mode=0o711, exist_ok=True)
+    if _sandbox:
+        os.chmod(build_root, 0o711)
+    staging = tempfile.mkdtemp(prefix=".building-", dir=build_root)
+    try:
+        with open(os.path.join(staging, language["source"]), "w", encoding="utf-8") as f:
+            f.write(source_code or "")
+
+        if _sandbox:
+            # The compiler runs sandboxed too, and the finished build is taken back so runs cannot change it.
+            os.chown(staging, *_sandbox)
+        returncode, compile_output = compile_source(language, staging)
+        if returncode is None or returncode < 0:
+            # A compiler that ran out of time or was killed says nothing about the source, so the
+            # failure is not kept and the next attempt compiles again.
+            return {"ok": False, "final": False, "compile_output": compile_output, "artifact": None}
+        if _sandbox:
+            _hand_over(staging, os.getuid(), os.getgid())
+        os.chmod(staging, 0o755)
+        with open(os.path.join(staging, "compile_output.txt"), "w", encoding="utf-8") as f:
+            f.write(compile_output)
+        if returncode != 0:
+            open(os.path.join(staging, "FAILED"), "w").close()
+
+        try:
+            os.rename(staging, build_dir)
+        except OSError:
+            # Another worker finished the same build first; keep theirs.
+            pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return _read_build(build_dir)
+
+
+def prune_builds(build_root, max_entries):
+    try:
+        entries = [os.path.join(build_root, name) for name in os.listdir(build_root) if not name.startswith(".")]
+    except FileNotFoundError:
+        return
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:max(len(entries) - max_entries, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run_command(language, build_dir, memory_limit):
+    command = [part.replace("{build}", build_dir) for part in language["run"]]
+    if not language["limit_address_space"] and memory_limit:
+        command.insert(1, f"-Xmx{memory_limit}k")
+    return command
+
+
+def run_checker(checker, stdin_path, stdout_path, payload, workdir, build_root, blob_root):
+    language = LANGUAGES.get(checker.get("language_id"))
+    if language is None:
+        return INTERNAL_ERROR, "Unsupported checker language"
+
+    # Same content-addressed build cache as submissions, so a checker is compiled once per source.
+    built = build(checker["language_id"], checker.get("source_code") or "", build_root)
+    if not built["ok"]:
+        return INTERNAL_ERROR, f"Checker failed to compile:\n{built['compile_output']}"
+
+    checker_dir = os.path.join(workdir, "checker")
+    os.makedirs(checker_dir, exist_ok=True)
+    answer_path = os.path.join(checker_dir, "answer.txt")
+    with open_expected_output(payload, blob_root) as source, open(answer_path, "wb") as destination:
+        shutil.copyfileobj(source, destination)
+
+    command = run_command(language, built["artifact"], CHECKER_MEMORY_LIMIT) + [stdin_path, stdout_path, answer_path]
+    run = execute(command, checker_dir, os.devnull, CHECKER_TIME_LIMIT, CHECKER_MEMORY_LIMIT, language["limit_address_space"],
+                  get_launcher(build_root))
+    message = (run["stdout"] + run["stderr"]).strip()
+    if run["timed_out"] or run["returncode"] not in CHECKER_EXIT_STATUSES:
+        return INTERNAL_ERROR, message or "Checker failed"
+    return CHECKER_EXIT_STATUSES[run["returncode"]], message
+
+
+def check_output(stdout_path, stdin_path, payload, workdir, build_root, blob_root):
+    checker = payload.get("checker") or {}
+    mode = checker.get("mode", "lines")
+    if mode == "custom":
+        return run_checker(checker, stdin_path, stdout_path, payload, workdir, build_root, blob_root)
+
+    compare = COMPARATORS.get(mode, lines_match)
+    with open(stdout_path, "rb") as output, open_expected_output(payload, blob_root) as expected_output:
+        return (ACCEPTED if compare(output, expected_output, checker.get("epsilon")) else WRONG_ANSWER), None
+
+
+def check_result(result, payload, build_root, blob_root):
+    # The comparison stage for output produced elsewhere (Judge0 only runs the program).
+    workdir = tempfile.mkdtemp(prefix="codehub-check-")
+    try:
+        stdout_path = os.path.join(workdir, "stdout.txt")
+        with open(stdout_path, "w", encoding="utf-8") as f:
+            f.write(result.get("stdout") or "")
+
+        stdin_path = os.path.join(workdir, "stdin.txt")
+        if (payload.get("checker") or {}).get("mode") == "custom":
+            if payload.get("stdin_blob"):
+                copy_blob(blob_root, payload["stdin_blob"], stdin_path)
+            else:
+                with open(stdin_path, "w", encoding="utf-8") as f:
+                    f.write(payload.get("stdin") or "")
+
+        status, message = check_output(stdout_path, stdin_path, payload, workdir, build_root, blob_root)
+    except OSError as exc:
+        status, message = INTERNAL_ERROR, str(exc)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {**result, "status": status, "message": message}
+
+
+def has_expected_output(payload):
+    return payload.get("expected_output") is not None or bool(payload.get("expected_output_blob"))
+
+
+def run_compiled(language, build_dir, workdir, payload, build_root = None, blob_root = None):
+    time_limit = float(payload.get("cpu_time_limit") or 2)
+    memory_limit = int(payload.get("memory_limit") or 0)
+
+    stdin_path = os.path.join(workdir, "stdin.txt")
+    if payload.get("stdin_blob"):
+        copy_blob(blob_root, payload["stdin_blob"], stdin_path)
+    else:
+        with open(stdin_path, "w", encoding="utf-8") as f:
+            f.write(payload.get("stdin") or "")
+
+    run = execute(
+        run_command(language, build_dir, memory_limit),
+        workdir,
+        stdin_path,
+        time_limit,
+        memory_limit,
+        language["limit_address_space"],
+        get_launcher(build_root) if build_root else None,
+    )
+
+    message = None
+    if run["timed_out"] or run["cpu_time"] > time_limit:
+        status = TIME_LIMIT_EXCEEDED
+    elif run["returncode"] < 0:
+        killed_by = -run["returncode"]
+        if killed_by in (signal.SIGXCPU, signal.SIGKILL):
+            status = TIME_LIMIT_EXCEEDED
+        else:
+            status = SIGNAL_STATUSES.get(killed_by, RUNTIME_ERROR_OTHER)
+    elif run["returncode"] != 0:
+        status = RUNTIME_ERROR_NZEC
+    elif has_expected_output(payload):
+        status, message = check_output(run["stdout_path"], stdin_path, payload, workdir, build_root, blob_root)
+    else:
+        status = ACCEPTED
+
+    return {
+        "status": status,
+        "stdout": run["stdout"],
+        "stderr": run["stderr"],
+        "compile_output": None,
+        "message": message,
+        "time": f"{run['cpu_time']:.3f}",
+        "memory": run["memory"],
+    }
+
+
+def run_payload(payload, build_root, blob_root = None):
+    language_id = payload.get("language_id")
+    language = LANGUAGES.get(language_id)
+    if language is None:
+        return {"status": INTERNAL_ERROR, "stdout": None, "stderr": "Unsupported language", "time": None, "memory": None}
+
+    workdir = tempfile.mkdtemp(prefix="codehub-judge-")
+    try:
+        if _sandbox:
+            # Custom checkers open their files by path, so the sandbox uid may enter (not list) the workdir.
+            os.chmod(workdir, 0o711)
+        built = build(language_id, payload.get("source_code") or "", build_root)
+        if not built["ok"]:
+            # An unfinished compile is reported as an internal error, which is never cached as a verdict.
+            return {"status": COMPILATION_ERROR if built["final"] else INTERNAL_ERROR, "stdout": None, "stderr": None,
+                    "compile_output": built["compile_output"], "time": None, "memory": None}
+
+        return run_compiled(language, built["artifact"], workdir, payload, build_root, blob_root)
+    except OSError as exc:
+        return {"status": INTERNAL_ERROR, "stdout": None, "stderr": str(exc), "time": None, "memory": None}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
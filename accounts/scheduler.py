@@ -0,0 +1,154 @@
+import heapq
+import time
+import uuid
+from collections import defaultdict, deque, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import Submission
+
+# Admission control and fair ordering in front of the judge backend. Slots and metrics live in
+# the default cache, so every web process and judge worker must share it for the caps to hold.
+
+Slot = namedtuple("Slot", "key token")
+Admission = namedtuple("Admission", "allowed position reason")
+
+SERVED_KEY = "scheduler:served:{}"
+WAIT_COUNT_KEY = "scheduler:wait:count"
+WAIT_TOTAL_KEY = "scheduler:wait:total_ms"
+WAIT_MAX_KEY = "scheduler:wait:max_ms"
+REJECTED_KEY = "scheduler:rejected"
+
+
+def slot_key(index):
+    return f"scheduler:slot:{index}"
+
+
+def acquire_slot(kind = "submission"):
+    # A slot is a leased cache key, so a crashed worker's slot frees itself when the lease runs out.
+    # The top JUDGE_SCHEDULER_RUN_SLOTS slots belong to sample runs and the rest to submissions, so
+    # a burst of runs in the web processes can never hold up the judge workers, nor the other way round.
+    total = settings.JUDGE_SCHEDULER_SLOTS
+    boundary = total - settings.JUDGE_SCHEDULER_RUN_SLOTS
+    indexes = range(boundary, total) if kind == "run" else range(boundary)
+
+    token = uuid.uuid4().hex
+    for index in indexes:
+        if cache.add(slot_key(index), token, settings.JUDGE_SCHEDULER_SLOT_LEASE):
+            return Slot(slot_key(index), token)
+    return None
+
+
+def release_slot(slot):
+    if slot is not None and cache.get(slot.key) == slot.token:
+        cache.delete(slot.key)
+
+
+def check_admission(user):
+    pending = Submission.objects.filter(status="PENDING")
+    depth = pending.count()
+    if depth >= settings.JUDGE_QUEUE_MAX:
+        _incr(REJECTED_KEY)
+        return Admission(False, depth + 1, "The judge queue is full")
+    if pending.filter(user=user).count() >= settings.JUDGE_QUEUE_MAX_PER_USER:
+        _incr(REJECTED_KEY)
+        return Admission(False, depth + 1, "You already have the maximum number of submissions waiting")
+    return Admission(True, depth + 1, None)
+
+
+def queue_position(submission):
+    # Replays the fair ordering of next_submission_id over the whole queue: every claim adds a
+    # running job to its user and makes them the most recently served.
+    if submission.status != "PENDING":
+        return None
+    queues = defaultdict(deque)
+    for submission_id, user in Submission.objects.filter(status="PENDING").order_by("id").values_list("id", "user"):
+        queues[user].append(submission_id)
+    if submission.id not in queues.get(submission.user_id, ()):
+        return None
+
+    running, served = _standing(queues)
+    heap = [(_priority(user, running, served, queue[0]), user) for user, queue in queues.items()]
+    heapq.heapify(heap)
+    position = 0
+    while heap:
+        (count, _, _, _), user = heapq.heappop(heap)
+        position += 1
+        queue = queues[user]
+        if queue.popleft() == submission.id:
+            return position
+        if queue:
+            heapq.heappush(heap, ((count + 1, 1, position, queue[0]), user))
+    return None
+
+
+def next_submission_id():
+    # Fair queuing: the next job goes to the user with the fewest running jobs, then the one
+    # served longest ago, so one user's burst cannot hold everyone else back.
+    heads = list(
+        Submission.objects.filter(status="PENDING")
+        .values("user").annotate(first=Min("id")).order_by()
+    )
+    if not heads:
+        return None
+
+    running, served = _standing([head["user"] for head in heads])
+    head = min(heads, key=lambda head: _priority(head["user"], running, served, head["first"]))
+    return head["first"]
+
+
+def _standing(users):
+    running = dict(
+        Submission.objects.filter(status="RUNNING", user__in=users)
+        .values("user").annotate(count=Count("id")).order_by()
+        .values_list("user", "count")
+    )
+    served = cache.get_many([SERVED_KEY.format(user) for user in users])
+    return running, {user: served.get(SERVED_KEY.format(user), 0) for user in users}
+
+
+def _priority(user, running, served, first):
+    # The middle 0 ranks users by their last claim time; queue_position ranks claims it only
+    # projects after every real one.
+    return running.get(user, 0), 0, served[user], first
+
+
+def record_claim(submission):
+    cache.set(SERVED_KEY.format(submission.user_id), time.time(), 60 * 60 * 24)
+
+    wait_ms = max(int((timezone.now() - submission.submitted_at).total_seconds() * 1000), 0)
+    _incr(WAIT_COUNT_KEY)
+    _incr(WAIT_TOTAL_KEY, wait_ms)
+    if wait_ms > cache.get(WAIT_MAX_KEY, 0):
+        cache.set(WAIT_MAX_KEY, wait_ms, None)
+
+
+def _incr(key, delta = 1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def metrics():
+    pending = Submission.objects.filter(status="PENDING")
+    oldest = pending.aggregate(oldest=Min("submitted_at"))["oldest"]
+    stats = cache.get_many([WAIT_COUNT_KEY, WAIT_TOTAL_KEY, WAIT_MAX_KEY, REJECTED_KEY])
+    slots = cache.get_many([slot_key(index) for index in range(settings.JUDGE_SCHEDULER_SLOTS)])
+    claimed = stats.get(WAIT_COUNT_KEY, 0)
+
+    return {
+        "queue_depth": pending.count(),
+        "running": Submission.objects.filter(status="RUNNING").count(),
+        "slots_in_use": len(slots),
+        "slots_total": settings.JUDGE_SCHEDULER_SLOTS,
+        "oldest_wait_seconds": round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0,
+        "claimed": claimed,
+        "avg_wait_ms": round(stats.get(WAIT_TOTAL_KEY, 0) / claimed, 1) if claimed else 0,
+        "max_wait_ms": stats.get(WAIT_MAX_KEY, 0),
+        "rejected": stats.get(REJECTED_KEY, 0),
+    }
@@ -0,0 +1,95 @@
+import operator
+import re
+from collections import Counter
+from functools import reduce
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Problem, ProblemSearchTerm
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from given in is it its of on or that the this to with you your
+""".split())
+
+# Per-occurrence weight of each indexed field, and the cap on occurrences that count.
+FIELD_WEIGHTS = {
+    "title": 10,
+    "constraints": 2,
+    "description": 1,
+}
+MAX_OCCURRENCES = 5
+MAX_QUERY_TERMS = 8
+
+
+def tokenize(text):
+    return [
+        token[:64]
+        for token in TOKEN_RE.findall((text or "").lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def problem_terms(problem):
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term, occurrences in Counter(tokenize(getattr(problem, field))).items():
+            weights[term] += field_weight * min(occurrences, MAX_OCCURRENCES)
+    return weights
+
+
+def index_problem(problem):
+    with transaction.atomic():
+        ProblemSearchTerm.objects.filter(problem=problem).delete()
+        ProblemSearchTerm.objects.bulk_create([
+            ProblemSearchTerm(problem=problem, term=term, weight=weight)
+            for term, weight in problem_terms(problem).items()
+        ])
+
+
+@receiver(post_save, sender=Problem)
+def reindex_problem(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Counter bumps and other partial saves never touch the indexed text.
+    if update_fields is not None and not set(update_fields) & set(FIELD_WEIGHTS):
+        return
+    index_problem(instance)
+
+
+def search_problems(query, difficulty = None, page = 1, per_page = None):
+    # Problems matching more query terms rank first, then by summed term weight.
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return Paginator(Problem.objects.none(), per_page or settings.PROBLEMS_PER_PAGE).get_page(page)
+
+    # Prefix matching keeps partial words working ("arr" finds "array"), and stays an index range scan.
+    matches = Q()
+    for term in terms:
+        matches |= Q(term__startswith=term)
+
+    ranked = ProblemSearchTerm.objects.filter(matches)
+    if difficulty:
+        ranked = ranked.filter(problem__difficulty=difficulty)
+    # One prefix can hit several indexed words ("arr": array, arrays), so count query terms, not rows.
+    matched = reduce(operator.add, [
+        Max(Case(When(term__startswith=term, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for term in terms
+    ])
+    ranked = (
+        ranked.values("problem")
+        .annotate(matched=matched, score=Sum("weight"))
+        .order_by("-matched", "-score", "problem")
+    )
+
+    result_page = Paginator(ranked, per_page or settings.PROBLEMS_PER_PAGE).get_page(page)
+    ids = [row["problem"] for row in result_page.object_list]
+    problems = Problem.objects.in_bulk(ids)
+    result_page.object_list = [problems[problem_id] for problem_id in ids if problem_id in problems]
+    return result_page
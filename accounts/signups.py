@@ -0,0 +1,69 @@
+import secrets
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+# A signup waiting for its emailed code lives in the cache for SIGNUP_TIMEOUT seconds. The
+# browser only holds a signed cookie naming the record, so unverified signups never create
+# session rows, and the record keeps a password hash, never the password itself.
+
+COOKIE_NAME = "pending_signup"
+COOKIE_SALT = "accounts.signups"
+
+
+def _key(token):
+    return f"signup:{token}"
+
+
+def _new_code():
+    return f"{secrets.randbelow(900000) + 100000}"
+
+
+def start(username, email, password):
+    token = secrets.token_urlsafe(24)
+    record = {
+        "username": username,
+        "email": email,
+        "password_hash": make_password(password),
+        "code": _new_code(),
+    }
+    cache.set(_key(token), record, settings.SIGNUP_TIMEOUT)
+    return token, record
+
+
+def get_pending(request):
+    # Returns (token, record); both are None when the cookie is missing, tampered with or expired.
+    token = request.get_signed_cookie(COOKIE_NAME, default=None, salt=COOKIE_SALT, max_age=settings.SIGNUP_TIMEOUT)
+    if token is None:
+        return None, None
+    record = cache.get(_key(token))
+    return (token, record) if record is not None else (None, None)
+
+
+def renew_code(token, record):
+    record["code"] = _new_code()
+    cache.set(_key(token), record, settings.SIGNUP_TIMEOUT)
+    return record["code"]
+
+
+def code_matches(record, code):
+    return constant_time_compare(record["code"], code)
+
+
+def discard(token):
+    cache.delete(_key(token))
+
+
+def set_cookie(response, token):
+    response.set_signed_cookie(
+        COOKIE_NAME, token, salt=COOKIE_SALT, max_age=settings.SIGNUP_TIMEOUT,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+    )
+    return response
+
+
+def clear_cookie(response):
+    response.delete_cookie(COOKIE_NAME, samesite="Lax")
+    return response
@@ -0,0 +1,49 @@
+document.addEventListener("DOMContentLoaded", () => {
+  const loadMore = document.getElementById("loadMoreProblems");
+  const cards = document.getElementById("problemCards");
+
+  if (!loadMore || !cards) {
+    return;
+  }
+
+  function createCard(problem) {
+    const card = document.createElement("div");
+    card.className = "card-question";
+    card.innerHTML =
+      `<h3></h3>` +
+      `<div class="card-footer">` +
+      `<div class="card-meta"></div>` +
+      `<a target="_blank" rel="noopener noreferrer"><button>Solve Challenge</button></a>` +
+      `</div>`;
+
+    card.querySelector("h3").textContent = problem.title;
+    card.querySelector(".card-meta").textContent =
+      `${problem.difficulty} • Score: ${problem.points} • Success Rate: ${problem.success_rate}%`;
+    card.querySelector("a").href = problem.url;
+    return card;
+  }
+
+  loadMore.addEventListener("click", () => {
+    const params = new URLSearchParams({
+      cursor: loadMore.dataset.cursor,
+      difficulty: loadMore.dataset.difficulty,
+    });
+
+    loadMore.disabled = true;
+    fetch(`${loadMore.dataset.apiUrl}?${params}`, { credentials: "same-origin" })
+      .then((response) => response.json())
+      .then((data) => {
+        data.results.forEach((problem) => cards.appendChild(createCard(problem)));
+
+        if (data.next_cursor) {
+          loadMore.dataset.cursor = data.next_cursor;
+          loadMore.disabled = false;
+        } else {
+          loadMore.remove();
+        }
+      })
+      .catch(() => {
+        loadMore.disabled = false;
+      });
+  });
+});
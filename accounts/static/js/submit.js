@@ -59,3 +59,138 @@ textarea.addEventListener('input', updateLineNumbers);
 textarea.addEventListener('scroll', () => {
   lineNumbers.scrollTop = textarea.scrollTop;
 });
+
+// Poll the judge queue until the submission is finished
+const submissionStatus = document.getElementById("submissionStatus");
+
+function renderTestcaseResults(results) {
+  const list = submissionStatus.querySelector(".testcase-list");
+  list.innerHTML = "";
+
+  results.forEach((tc, index) => {
+    const row = document.createElement("div");
+    row.className = "testcase-result";
+
+    const passed = tc.status === "Accepted";
+    row.innerHTML =
+      `<span class="testcase-number">Test Case ${index + 1}:</span> ` +
+      `<span class="status ${passed ? "passed" : "failed"}"></span>` +
+      `<span class="testcase-time"> | Time: ${tc.time}s</span>` +
+      `<span class="testcase-memory"> | Memory: ${tc.memory} KB</span>`;
+    row.querySelector(".status").textContent = passed ? "Passed" : `Failed (${tc.status})`;
+
+    list.appendChild(row);
+  });
+}
+
+function pollSubmission() {
+  fetch(submissionStatus.dataset.statusUrl, { credentials: "same-origin" })
+    .then((response) => response.json())
+    .then((data) => {
+      const state = submissionStatus.querySelector(".submission-state");
+
+      if (!data.done) {
+        state.textContent = data.queue_position
+          ? `${data.status_display} (position ${data.queue_position} in queue)...`
+          : `${data.status_display}...`;
+        setTimeout(pollSubmission, 1000);
+        return;
+      }
+
+      state.textContent = data.status_display;
+      renderTestcaseResults(data.results);
+    })
+    .catch(() => setTimeout(pollSubmission, 3000));
+}
+
+// Live per-test-case verdicts over server-sent events; polling stays as the fallback
+function streamSubmission() {
+  const source = new EventSource(submissionStatus.dataset.eventsUrl);
+  const live = [];
+
+  source.addEventListener("testcase", (event) => {
+    const tc = JSON.parse(event.data);
+    live[tc.index] = tc;
+    submissionStatus.querySelector(".submission-state").textContent = "Running...";
+    renderTestcaseResults(live.filter(Boolean));
+  });
+
+  source.addEventListener("done", () => {
+    source.close();
+    pollSubmission();
+  });
+
+  source.onerror = () => {
+    source.close();
+    pollSubmission();
+  };
+}
+
+if (submissionStatus) {
+  if (window.EventSource && submissionStatus.dataset.eventsUrl) {
+    streamSubmission();
+  } else {
+    pollSubmission();
+  }
+}
+
+// Run against the samples (or custom input) without using up a submission
+const runButton = document.getElementById("runButton");
+const runResults = document.getElementById("runResults");
+const customInputToggle = document.getElementById("customInputToggle");
+
+customInputToggle.addEventListener("change", () => {
+  document.getElementById("customInput").hidden = !customInputToggle.checked;
+});
+
+function renderRunResults(data) {
+  const list = runResults.querySelector(".run-list");
+  list.innerHTML = "";
+  runResults.querySelector(".run-state").textContent =
+    data.cached ? `${data.status_display} (cached)` : data.status_display;
+
+  data.cases.forEach((tc) => {
+    const row = document.createElement("div");
+    row.className = "testcase-result";
+    const passed = tc.status === "Accepted";
+    row.innerHTML =
+      `<span class="testcase-number">Sample ${tc.index + 1}:</span> ` +
+      `<span class="status ${passed ? "passed" : "failed"}"></span>` +
+      `<span class="testcase-time"> | Time: ${tc.time}s</span>` +
+      `<span class="testcase-memory"> | Memory: ${tc.memory} KB</span>`;
+    row.querySelector(".status").textContent = passed ? "Passed" : tc.status;
+    list.appendChild(row);
+
+    const output = tc.stdout || tc.stderr;
+    if (output) {
+      const pre = document.createElement("pre");
+      pre.className = "run-output";
+      pre.textContent = output;
+      list.appendChild(pre);
+    }
+  });
+}
+
+runButton.addEventListener("click", () => {
+  const form = runButton.closest("form");
+  runResults.hidden = false;
+  runResults.querySelector(".run-state").textContent = "Running...";
+  runResults.querySelector(".run-list").innerHTML = "";
+  runButton.disabled = true;
+
+  fetch(form.dataset.runUrl, { method: "POST", body: new FormData(form), credentials: "same-origin" })
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.error) {
+        runResults.querySelector(".run-state").textContent = data.error;
+        return;
+      }
+      renderRunResults(data);
+    })
+    .catch(() => {
+      runResults.querySelector(".run-state").textContent = "Could not run the code, please try again.";
+    })
+    .finally(() => {
+      runButton.disabled = false;
+    });
+});
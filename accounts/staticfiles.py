@@ -0,0 +1,173 @@
+import gzip
+import io
+import mimetypes
+import os
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# collectstatic builds the static tree once per deploy: content-hashed names from the manifest
+# storage, smaller images with .webp siblings, and .br/.gz files next to every text asset.
+# The middleware serves that tree without touching sessions or the database.
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".html", ".txt", ".json", ".xml", ".map")
+IMAGE_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG"}
+JPEG_QUALITY = 85
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# (Content-Encoding, file suffix) in order of preference.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+WEBP_SUFFIX = ".webp"
+
+
+def optimize_image(path):
+    # Re-saves PNG losslessly and JPEG at JPEG_QUALITY, and writes a lossless .webp sibling.
+    # Each result is kept only when smaller. Returns the paths written.
+    image_format = IMAGE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if Image is None or image_format is None:
+        return []
+    with Image.open(path) as image:
+        image.load()
+
+    written = []
+    size = os.path.getsize(path)
+    out = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(out, format="PNG", optimize=True)
+    if out.tell() < size:
+        with open(path, "wb") as optimized:
+            optimized.write(out.getvalue())
+        written.append(path)
+        size = out.tell()
+
+    out = io.BytesIO()
+    image.save(out, format="WEBP", lossless=image_format == "PNG", quality=JPEG_QUALITY, method=6)
+    if out.tell() < size:
+        with open(path + WEBP_SUFFIX, "wb") as webp:
+            webp.write(out.getvalue())
+        written.append(path + WEBP_SUFFIX)
+    return written
+
+
+def compress_file(path):
+    # Writes the pre-compressed variants worth keeping and returns their paths.
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return []
+    with open(path, "rb") as source:
+        data = source.read()
+
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as out:
+                out.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run = False, **options):
+        if dry_run:
+            return
+
+        names = set(paths)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name:
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        # Hashes are taken from the source files, so optimizing the copies keeps the names stable.
+        for name in sorted(names):
+            path = self.path(name)
+            for variant in optimize_image(path) + compress_file(path):
+                yield name, name + variant[len(path):], True
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if coding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    # Serves STATIC_ROOT ahead of the rest of the stack. Hashed names never change content, so
+    # they are cached for a year; anything else is revalidated after STATIC_MAX_AGE.
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.root = settings.STATIC_ROOT
+        self.immutable = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self.serve(request, unquote(request.path[len(self.prefix):]))
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        vary = []
+        if os.path.isfile(path + WEBP_SUFFIX):
+            vary.append("Accept")
+            if "image/webp" in request.headers.get("Accept", ""):
+                path, content_type = path + WEBP_SUFFIX, "image/webp"
+
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+        if variants:
+            vary.append("Accept-Encoding")
+        encoding, served_path = next(((e, p) for e, p in variants if e in accepted), (None, path))
+
+        stat = os.stat(served_path)
+        etag = quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            response = FileResponse(open(served_path, "rb"), content_type=content_type or "application/octet-stream")
+            response.headers.pop("Content-Disposition", None)
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if vary:
+            patch_vary_headers(response, vary)
+        if name in self.immutable:
+            response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={settings.STATIC_MAX_AGE}"
+        return response
@@ -1,3 +1,1485 @@
-from django.test import TestCase
+import base64
+import copy
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+from requests import ConnectionError as RequestsConnectionError, HTTPError, ReadTimeout
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    Client, LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from codehub.lazyurls import lazy_path
+
+from . import (
+    backends, blobs, checkers, judge0, leaderboard, progress, ratelimit, runner, sandbox, scheduler, signups, staticfiles,
+    verdict_cache,
+)
+from .engine import get_global_slots, is_accepted, run_testcases
+from .judging import (
+    claim_next_submission, compile_cache_key, enqueue_submission, finalize_submission, get_compile_error, judge_submission,
+)
+from .management.commands.bench_submission_queries import is_scratch_database
+from .management.commands.bench_templates import LOADERS
+from .management.commands.judge_worker import Command as JudgeWorkerCommand
+from .models import CustomUser, Problem, ProblemSearchTerm, Submission, SubmissionTestCaseResult, TestCase as ProblemTestCase
+from .pagecache import page_cache_key, precompile_templates
+from .search import search_problems
+
+ACCEPTED = {"id": 3, "description": "Accepted"}
+
+
+class FakeJudge0:
+    # A local stand-in for the Judge0 API. The "program" `echo` prints its input, anything else
+    # prints "wrong". Results are served plain on GET and PUT base64-encoded to callback_url.
+    # Status codes queued in `failures` are answered first, with Retry-After: 0; `delay` stalls
+    # every answer that many seconds.
+    def __init__(self, send_callbacks = True):
+        self.send_callbacks = send_callbacks
+        self.failures = []
+        self.delay = 0
+        self.results = {}
+        self.requests = []
+        self.callbacks = []
+        self.timers = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        # A client that gave up waiting leaves the handler writing to a closed socket.
+        self.server.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for timer in self.timers:
+            timer.join()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run(self, payload):
+        token = str(uuid.uuid4())
+        stdout = payload.get("stdin", "") if payload["source_code"] == "echo" else "wrong\n"
+        result = {"token": token, "status": ACCEPTED, "stdout": stdout, "stderr": None,
+                  "compile_output": None, "message": None, "time": "0.01", "memory": 1024}
+        self.results[token] = result
+        return token, result
+
+    def callback(self, url, result):
+        encoded = {field: base64.b64encode(value.encode()).decode() if field in judge0.CALLBACK_ENCODED_FIELDS and value else value
+                   for field, value in result.items()}
+        request = urllib.request.Request(url, data=json.dumps(encoded).encode(), method="PUT",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            self.callbacks.append(response.status)
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def fail(self):
+                time.sleep(fake.delay)
+                if not fake.failures:
+                    return False
+                self.send_response(fake.failures.pop(0))
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return True
+
+            def do_POST(self):
+                fake.requests.append(("POST", self.path))
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.fail():
+                    return
+                created = []
+                for payload in body["submissions"]:
+                    if payload["language_id"] not in (54, 62, 71):
+                        created.append({"language_id": ["language with id is not found"]})
+                        continue
+                    token, result = fake.run(payload)
+                    created.append({"token": token})
+                    if fake.send_callbacks and payload.get("callback_url"):
+                        timer = threading.Timer(0.05, fake.callback, (payload["callback_url"], result))
+                        fake.timers.append(timer)
+                        timer.start()
+                self.send_json(201, created)
+
+            def do_GET(self):
+                fake.requests.append(("GET", self.path))
+                if self.fail():
+                    return
+                tokens = parse_qs(urlsplit(self.path).query)["tokens"][0].split(",")
+                self.send_json(200, {"submissions": [fake.results.get(token) for token in tokens]})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class BlobDirMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_dir, ignore_errors=True)
+        blob_settings = override_settings(TESTCASE_BLOB_DIR=self.blob_dir, JUDGE_BUILD_DIR=self.blob_dir + "/builds")
+        blob_settings.enable()
+        self.addCleanup(blob_settings.disable)
+
+    def make_problem(self, cases = ("1", "2", "3")):
+        problem = Problem.objects.create(title="Echo", description="d", input_format="i", output_format="o",
+                                         constraints="c", sample_input="1", sample_output="1", points=10)
+        for case in cases:
+            ProblemTestCase.objects.create(problem=problem, input_data=case, expected_output=case)
+        return problem
+
+    def make_user(self, username = "alice"):
+        return CustomUser.objects.create_user(username, f"{username}@example.com", "pw123456")
+
+
+class Judge0CallbackTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.problem = self.make_problem()
+        self.submission = enqueue_submission(self.user, self.problem, "echo", 71)
+        self.other = enqueue_submission(self.user, self.problem, "echo", 71)
+
+    def put(self, submission_id, result):
+        url = reverse("judge0_callback", args=[submission_id, judge0.callback_signature(submission_id)])
+        return Client().put(url, json.dumps(result), content_type="application/json")
+
+    def encoded_result(self, token, stdout):
+        return {"token": token, "status": ACCEPTED, "stdout": base64.b64encode(stdout.encode()).decode(),
+                "stderr": None, "compile_output": None, "message": base64.b64encode(b"fine").decode()}
+
+    @override_settings(JUDGE0_CALLBACK_BASE_URL="http://testserver")
+    def test_callback_is_decoded_before_storing(self):
+        judge0.expect_callbacks({"tok": judge0.callback_url(self.submission.id)})
+        self.assertEqual(self.put(self.submission.id, self.encoded_result("tok", "42\n")).status_code, 204)
+        stored = judge0.pop_callback_results(["tok"])["tok"]
+        self.assertEqual(stored["stdout"], "42\n")
+        self.assertEqual(stored["message"], "fine")
+
+    @override_settings(JUDGE0_CALLBACK_BASE_URL="http://testserver")
+    def test_callback_for_another_submissions_token_is_refused(self):
+        judge0.expect_callbacks({"tok": judge0.callback_url(self.other.id)})
+        self.assertEqual(self.put(self.submission.id, self.encoded_result("tok", "42\n")).status_code, 403)
+        self.assertEqual(self.put(self.submission.id, self.encoded_result("unknown", "42\n")).status_code, 403)
+        self.assertEqual(judge0.pop_callback_results(["tok", "unknown"]), {})
+
+    @override_settings(JUDGE0_CALLBACK_BASE_URL="http://testserver")
+    def test_callback_with_bad_base64_is_rejected(self):
+        judge0.expect_callbacks({"tok": judge0.callback_url(self.submission.id)})
+        result = {**self.encoded_result("tok", ""), "stdout": "not base64!"}
+        self.assertEqual(self.put(self.submission.id, result).status_code, 400)
+
+
+class Judge0CallbackFlowTests(BlobDirMixin, LiveServerTestCase):
+
+    def test_submission_is_judged_from_callbacks(self):
+        problem = self.make_problem()
+        submission = enqueue_submission(self.make_user(), problem, "echo", 71)
+
+        with FakeJudge0() as fake, override_settings(JUDGE0_API_URL=fake.url, JUDGE0_CALLBACK_BASE_URL=self.live_server_url,
+                                                     JUDGE0_CALLBACK_SWEEP_INTERVAL=60, JUDGE0_MAX_RETRIES=0):
+            judge_submission(submission)
+
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, "ACCEPTED")
+        self.assertEqual(fake.callbacks, [204, 204, 204])
+        # Every result came from a callback, so the fake was never polled.
+        self.assertEqual([method for method, _ in fake.requests], ["POST"])
+        self.assertEqual(list(submission.testcase_results.values_list("output", flat=True)), ["1", "2", "3"])
+
+
+@override_settings(JUDGE0_MIN_POLL_INTERVAL=0.01, JUDGE0_RETRY_BACKOFF=0.01)
+class Judge0ClientTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fake = FakeJudge0(send_callbacks=False).__enter__()
+        self.addCleanup(self.fake.__exit__, None, None, None)
+        fake_settings = override_settings(JUDGE0_API_URL=self.fake.url)
+        fake_settings.enable()
+        self.addCleanup(fake_settings.disable)
+
+    def payload(self, stdin, language_id = 71):
+        return judge0.build_payload("echo", language_id, stdin=stdin, expected_output=stdin)
+
+    @override_settings(JUDGE0_BATCH_SIZE=2)
+    def test_batches_are_split_and_rejected_entries_have_no_token(self):
+        tokens = judge0.submit_batch_to_judge0([self.payload("1"), self.payload("2", language_id=999), self.payload("3"),
+                                                self.payload("4"), self.payload("5")])
+        self.assertEqual(len(tokens), 5)
+        self.assertIsNone(tokens[1])
+        self.assertEqual([method for method, _ in self.fake.requests], ["POST", "POST", "POST"])
+
+        results = judge0.fetch_batch_results(tokens)
+        self.assertEqual(sorted(result["stdout"] for result in results.values()), ["1", "3", "4", "5"])
+
+    def test_polls_are_retried_after_server_errors(self):
+        tokens = judge0.submit_batch_to_judge0([self.payload("1")])
+        retries = judge0.metrics.snapshot()["retries"]
+        self.fake.failures = [503, 502]
+        self.assertEqual(list(judge0.fetch_batch_results(tokens)), tokens)
+        self.assertEqual(judge0.metrics.snapshot()["retries"], retries + 2)
+
+    @override_settings(JUDGE0_MAX_RETRIES=1)
+    def test_polls_give_up_after_the_last_retry(self):
+        self.fake.failures = [500, 500]
+        with self.assertRaises(HTTPError):
+            judge0.fetch_batch_results(["token"])
+
+    def test_submissions_are_resent_only_when_turned_away(self):
+        self.fake.failures = [429]
+        tokens = judge0.submit_batch_to_judge0([self.payload("1")])
+        self.assertEqual(tokens, list(self.fake.results))
+
+        # A 5xx may come after Judge0 created the submissions, so the POST is not repeated.
+        self.fake.failures = [503]
+        with self.assertRaises(HTTPError):
+            judge0.submit_batch_to_judge0([self.payload("2")])
+        self.assertEqual([method for method, _ in self.fake.requests], ["POST"] * 3)
+
+    @override_settings(JUDGE0_READ_TIMEOUT=0.2)
+    def test_submissions_are_not_resent_after_a_read_timeout(self):
+        self.fake.delay = 0.5
+        with self.assertRaises(ReadTimeout):
+            judge0.submit_batch_to_judge0([self.payload("1")])
+        self.assertEqual(len(self.fake.requests), 1)
+
+    @override_settings(JUDGE0_MAX_RETRIES=2)
+    def test_submissions_are_resent_when_the_connection_fails(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+        retries = judge0.metrics.snapshot()["retries"]
+        with override_settings(JUDGE0_API_URL=f"http://127.0.0.1:{port}"):
+            with self.assertRaises(RequestsConnectionError):
+                judge0.submit_batch_to_judge0([self.payload("1")])
+        self.assertEqual(judge0.metrics.snapshot()["retries"], retries + 2)
+
+    def test_polled_submission_gets_its_verdict(self):
+        problem = self.make_problem()
+        user = self.make_user()
+        accepted = enqueue_submission(user, problem, "echo", 71)
+        wrong = enqueue_submission(user, problem, "print('nope')", 71)
+        judge_submission(accepted)
+        judge_submission(wrong)
+
+        self.assertEqual(Submission.objects.get(id=accepted.id).status, "ACCEPTED")
+        self.assertEqual(Submission.objects.get(id=wrong.id).status, "WRONG_ANSWER")
+        self.assertTrue(any(method == "GET" for method, _ in self.fake.requests))
+
+
+@override_settings(JUDGE_BACKEND="accounts.backends.LocalBackend", DEBUG=True)
+class LocalJudgeTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        # get_backend() keeps the first backend it built.
+        patcher = mock.patch.object(backends, "_backend", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def judge(self, code, language_id = 71):
+        problem = self.make_problem()
+        enqueue_submission(self.make_user(f"user{Submission.objects.count()}"), problem, code, language_id)
+        judge_submission(claim_next_submission())
+        return Submission.objects.get(problem=problem)
+
+    def test_python_submission_is_judged_end_to_end(self):
+        submission = self.judge("print(input())")
+        self.assertEqual(submission.status, "ACCEPTED")
+        self.assertEqual(submission.testcase_results.count(), 3)
+
+        self.assertEqual(self.judge("print(1)").status, "WRONG_ANSWER")
+        self.assertIsNone(cache.get(compile_cache_key(71, "print(input())")))
+
+    @override_settings(DEBUG=False)
+    def test_refuses_to_run_code_unsandboxed_outside_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            backends.get_backend()
+        with override_settings(JUDGE_SANDBOX_UID=65534):
+            self.assertIsInstance(backends.get_backend(), backends.LocalBackend)
+
+    def test_cpp_compile_error_is_cached(self):
+        submission = self.judge("int main() {", 54)
+        self.assertEqual(submission.status, "CE")
+        self.assertIsNotNone(cache.get(compile_cache_key(54, "int main() {")))
+
+
+class VerdictCacheTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        verdict_cache.get_verdict_cache().clear()
+        self.testcase = self.make_problem(cases=("1",)).testcases.get()
+
+    def key(self, code = "print(input())", checker = None):
+        return verdict_cache.verdict_key(code, 71, self.testcase, 2, 128000, checker)
+
+    def test_key_changes_with_everything_the_verdict_depends_on(self):
+        original = self.key()
+        self.assertEqual(self.key(), original)
+        self.assertNotEqual(self.key("print(1)"), original)
+        self.assertNotEqual(self.key(checker={"mode": "floats"}), original)
+        self.assertNotEqual(verdict_cache.verdict_key("print(input())", 71, self.testcase, 3, 128000), original)
+
+        keys = {original}
+        self.testcase.updated_at += timedelta(seconds=1)
+        keys.add(self.key())
+        self.testcase.input_data = "2"
+        keys.add(self.key())
+        self.testcase.expected_output = "2"
+        keys.add(self.key())
+        self.assertEqual(len(keys), 4)
+
+    def test_only_load_independent_verdicts_are_stored(self):
+        keys = [f"verdict:{status_id}" for status_id in (3, 4, 5, 6, 13)] + ["verdict:none"]
+        results = [{"status": {"id": status_id}, "stdout": "1", "time": "0.01"} for status_id in (3, 4, 5, 6, 13)] + [None]
+        verdict_cache.store_verdicts(keys, results)
+
+        stored = verdict_cache.get_verdict_cache().get_many(keys)
+        self.assertEqual(sorted(stored), ["verdict:3", "verdict:4", "verdict:6"])
+        self.assertEqual(stored["verdict:3"]["stdout"], "1")
+
+    def test_lookups_count_hits_and_misses(self):
+        keys = [self.key(), self.key("print(1)"), self.key("print(2)")]
+        verdict_cache.store_verdicts(keys[:1], [{"status": {"id": 3}}])
+
+        self.assertEqual([result is not None for result in verdict_cache.get_cached_verdicts(keys)], [True, False, False])
+        verdict_cache.get_cached_verdicts(keys[:1])
+        self.assertEqual(verdict_cache.verdict_cache_stats(), {"hits": 2, "misses": 2, "hit_rate": 50.0})
+
+
+class LegacyStatusTests(BlobDirMixin, TestCase):
+
+    def test_legacy_statuses_are_normalized_and_count_as_solved(self):
+        user = self.make_user()
+        problem = self.make_problem()
+        legacy = ["Accepted", "Wrong Answer", "Runtime Error (NZEC)", "Compilation Error", "Internal Error"]
+        for status in legacy:
+            Submission.objects.create(user=user, problem=problem, code="echo", language_id=71, status=status)
+
+        import_module("accounts.migrations.0014_normalize_submission_status").normalize_statuses(apps, None)
+        self.assertEqual(sorted(Submission.objects.values_list("status", flat=True)),
+                         ["ACCEPTED", "CE", "ERROR", "RE", "WRONG_ANSWER"])
+
+        submission = enqueue_submission(user, problem, "echo", 71)
+        with FakeJudge0(send_callbacks=False) as fake, override_settings(JUDGE0_API_URL=fake.url, JUDGE0_MIN_POLL_INTERVAL=0.01):
+            judge_submission(submission)
+
+        user.refresh_from_db()
+        self.assertEqual(Submission.objects.get(id=submission.id).status, "ACCEPTED")
+        self.assertEqual(user.points, 0)
+
+
+@override_settings(SUBMISSION_EVENTS_POLL_INTERVAL=0.01)
+class SubmissionEventsTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.submission = enqueue_submission(self.user, self.make_problem(), "echo", 71)
+
+    def test_judging_publishes_each_case_then_the_verdict(self):
+        with FakeJudge0(send_callbacks=False) as fake, override_settings(JUDGE0_API_URL=fake.url, JUDGE0_MIN_POLL_INTERVAL=0.01):
+            with self.captureOnCommitCallbacks(execute=True):
+                judge_submission(claim_next_submission())
+
+        events = cache.get(progress.events_key(self.submission.id))
+        self.assertEqual(sorted(event["index"] for event in events[:-1]), [0, 1, 2])
+        self.assertEqual({event["status"] for event in events[:-1]}, {"Accepted"})
+        self.assertEqual(events[-1], {"type": "done", "status": "ACCEPTED", "status_display": "Accepted"})
+
+    async def test_stream_replays_the_log_and_ends_with_the_verdict(self):
+        progress.publish(self.submission.id, {"type": "testcase", "index": 0, "status": "Accepted", "time": 0.1, "memory": 10})
+        progress.publish(self.submission.id, {"type": "done", "status": "ACCEPTED", "status_display": "Accepted"})
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse("submission_events", args=[self.submission.id]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(chunks[0], "retry: 3000\n\n")
+        self.assertEqual([chunk.split("\n")[0] for chunk in chunks[1:]], ["event: testcase", "event: done"])
+        self.assertEqual(json.loads(chunks[-1].split("data: ")[1])["status"], "ACCEPTED")
+
+    async def test_stream_is_private_to_the_submitter(self):
+        other = await CustomUser.objects.acreate(username="mallory", email="mallory@example.com")
+        await self.async_client.aforce_login(other)
+        response = await self.async_client.get(reverse("submission_events", args=[self.submission.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(JUDGE_SUBMISSION_LEASE=60)
+class SubmissionLeaseTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.problem = self.make_problem()
+
+    def test_stale_running_submission_is_claimed_again(self):
+        stale = enqueue_submission(self.user, self.problem, "echo", 71)
+        fresh = enqueue_submission(self.make_user("bob"), self.problem, "echo", 71)
+        Submission.objects.filter(id=stale.id).update(status="RUNNING", claimed_at=timezone.now() - timedelta(seconds=120))
+        Submission.objects.filter(id=fresh.id).update(status="RUNNING", claimed_at=timezone.now())
+
+        claimed = claim_next_submission()
+        self.assertEqual(claimed.id, stale.id)
+        self.assertEqual(claimed.status, "RUNNING")
+        self.assertGreater(claimed.claimed_at, timezone.now() - timedelta(seconds=5))
+        self.assertIsNone(claim_next_submission())
+
+    def test_worker_that_lost_its_lease_writes_nothing(self):
+        enqueue_submission(self.user, self.problem, "echo", 71)
+        claimed = claim_next_submission()
+        Submission.objects.filter(id=claimed.id).update(claimed_at=timezone.now() - timedelta(seconds=120))
+        again = claim_next_submission()
+
+        finalize_submission(claimed, "ACCEPTED", 0.1, 100, "1", already_solved=False)
+        self.assertEqual(Submission.objects.get(id=claimed.id).status, "RUNNING")
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.total_submissions, 0)
+
+        finalize_submission(again, "WRONG_ANSWER", 0.1, 100, "2", already_solved=False)
+        self.assertEqual(Submission.objects.get(id=claimed.id).status, "WRONG_ANSWER")
+
+    def test_worker_failure_counts_the_attempt_and_closes_the_stream(self):
+        enqueue_submission(self.user, self.problem, "echo", 71)
+        submission = claim_next_submission()
+        command = JudgeWorkerCommand(stdout=StringIO(), stderr=StringIO())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch("accounts.management.commands.judge_worker.judge_submission", side_effect=RuntimeError("boom")):
+                command.judge(submission, {"verbosity": 1})
+
+        self.assertEqual(Submission.objects.get(id=submission.id).status, "ERROR")
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.total_submissions, 1)
+        self.assertEqual(cache.get(progress.events_key(submission.id))[-1]["type"], "done")
+
+
+
+class ProblemStatsTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.problem = self.make_problem()
+        self.other = self.make_problem()
+
+    def finish(self, username, problem, status):
+        enqueue_submission(self.make_user(username), problem, "echo", 71)
+        finalize_submission(claim_next_submission(), status, 0.1, 100, "", already_solved=False)
+
+    def assert_stats_match_submissions(self):
+        for problem in Problem.objects.all():
+            finished = Submission.objects.filter(problem=problem).exclude(status__in=("PENDING", "RUNNING"))
+            self.assertEqual(
+                (problem.total_submissions, problem.accepted_submissions),
+                (finished.count(), finished.filter(status="ACCEPTED").count()),
+            )
+
+    def test_counters_follow_finished_submissions(self):
+        self.finish("ann", self.problem, "ACCEPTED")
+        self.finish("bob", self.problem, "WRONG_ANSWER")
+        self.finish("cid", self.problem, "ACCEPTED")
+        self.finish("dan", self.other, "CE")
+        enqueue_submission(self.make_user("eve"), self.problem, "echo", 71)
+
+        self.problem.refresh_from_db()
+        self.assertEqual((self.problem.total_submissions, self.problem.accepted_submissions), (3, 2))
+        self.assert_stats_match_submissions()
+
+    def test_rebuild_repairs_drifted_counters(self):
+        self.finish("ann", self.problem, "ACCEPTED")
+        self.finish("bob", self.problem, "RE")
+        Problem.objects.update(total_submissions=40, accepted_submissions=7)
+
+        out = StringIO()
+        call_command("rebuild_problem_stats", stdout=out)
+        self.assertIn("2 problems", out.getvalue())
+        self.assert_stats_match_submissions()
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.total_submissions, 0)
+
+    def test_finalizing_writes_the_same_statements_for_any_number_of_cases(self):
+        for username, cases in [("ann", ("1",)), ("bob", [str(case) for case in range(20)])]:
+            problem = self.make_problem(cases)
+            enqueue_submission(self.make_user(username), problem, "echo", 71)
+            submission = claim_next_submission()
+            results = [SubmissionTestCaseResult(submission=submission, testcase=testcase, output="", status="Accepted")
+                       for testcase in problem.testcases.all()]
+
+            # Finish the submission, record the per-case results, bump the problem counters, award the points.
+            with self.assertNumQueries(7):
+                finalize_submission(submission, "ACCEPTED", 0.1, 100, "", already_solved=False, testcase_results=results)
+            self.assertEqual(submission.testcase_results.count(), len(cases))
+
+
+@override_settings(JUDGE_SCHEDULER_SLOTS=3, JUDGE_SCHEDULER_RUN_SLOTS=1)
+class SchedulerTests(BlobDirMixin, TestCase):
+
+    def test_runs_and_submissions_keep_to_their_own_slots(self):
+        run = scheduler.acquire_slot("run")
+        self.assertEqual(run.key, scheduler.slot_key(2))
+        self.assertIsNone(scheduler.acquire_slot("run"))
+
+        submissions = [scheduler.acquire_slot(), scheduler.acquire_slot()]
+        self.assertEqual([slot.key for slot in submissions], [scheduler.slot_key(0), scheduler.slot_key(1)])
+        self.assertIsNone(scheduler.acquire_slot())
+
+        scheduler.release_slot(run)
+        self.assertIsNone(scheduler.acquire_slot())
+        self.assertEqual(scheduler.acquire_slot("run").key, scheduler.slot_key(2))
+
+    def test_queue_position_follows_the_claim_order(self):
+        problem = self.make_problem()
+        alice, bob, carol = self.make_user("alice"), self.make_user("bob"), self.make_user("carol")
+        enqueue_submission(carol, problem, "echo", 71)
+        claim_next_submission()
+        queued = [enqueue_submission(user, problem, "echo", 71) for user in (alice, alice, carol, alice, bob)]
+
+        positions = {submission.id: scheduler.queue_position(submission) for submission in queued}
+        self.assertEqual(sorted(positions.values()), [1, 2, 3, 4, 5])
+        self.assertEqual(positions[queued[-1].id], 2)
+
+        claimed = [claim_next_submission().id for _ in queued]
+        self.assertEqual(claimed, sorted(positions, key=positions.get))
+        self.assertIsNone(scheduler.queue_position(Submission.objects.get(id=claimed[0])))
+
+    @override_settings(JUDGE_QUEUE_MAX=4, JUDGE_QUEUE_MAX_PER_USER=2)
+    def test_admission_caps_the_queue_and_each_user(self):
+        problem = self.make_problem()
+        alice, bob, carol = self.make_user("alice"), self.make_user("bob"), self.make_user("carol")
+        for user in (alice, alice, bob):
+            enqueue_submission(user, problem, "echo", 71)
+
+        self.assertEqual(scheduler.check_admission(bob), (True, 4, None))
+        refused = scheduler.check_admission(alice)
+        self.assertFalse(refused.allowed)
+        self.assertIn("maximum number", refused.reason)
+
+        enqueue_submission(bob, problem, "echo", 71)
+        self.assertEqual(scheduler.check_admission(carol), (False, 5, "The judge queue is full"))
+        self.assertEqual(scheduler.metrics()["rejected"], 2)
+
+        claim_next_submission()
+        self.assertTrue(scheduler.check_admission(carol).allowed)
+
+@override_settings(LEADERBOARD_SIZE=50)
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_awards_all_reach_the_snapshot(self):
+        leaderboard.build_snapshot()
+        threads = [threading.Thread(target=leaderboard.record_points, args=(f"id{i}", f"user{i:02d}", 100 + i))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = leaderboard.get_top_users()
+        self.assertEqual([row["username"] for row in snapshot], [f"user{i:02d}" for i in range(19, -1, -1)])
+        self.assertEqual([row["rank"] for row in snapshot], list(range(1, 21)))
+
+    def test_award_without_the_lock_drops_the_snapshot(self):
+        leaderboard.build_snapshot()
+        cache.add(leaderboard.SNAPSHOT_LOCK_KEY, "someone else", 5)
+        leaderboard.record_points("id", "late", 10)
+        self.assertIsNone(cache.get(leaderboard.SNAPSHOT_KEY))
+
+    def test_rank_breaks_ties_by_username_and_follows_own_points(self):
+        users = {name: CustomUser.objects.create_user(name, f"{name}@example.com", "pw") for name in ("ann", "bob", "cid")}
+        CustomUser.objects.filter(username__in=["ann", "bob"]).update(points=5)
+        for user in users.values():
+            user.refresh_from_db()
+
+        self.assertEqual([leaderboard.get_rank(users[name]) for name in ("ann", "bob", "cid")], [1, 2, 3])
+        users["cid"].points = 9
+        self.assertEqual(leaderboard.get_rank(users["cid"]), 1)
+
+    def test_tied_users_after_a_page_boundary_get_the_same_ranks_as_the_pages(self):
+        for name, points in [("ann", 7), ("bob", 3), ("cid", 3), ("dan", 3), ("eve", 0)]:
+            CustomUser.objects.create_user(name, f"{name}@example.com", "pw")
+            CustomUser.objects.filter(username=name).update(points=points)
+
+        with self.settings(LEADERBOARD_PAGE_SIZE=2):
+            ranks = {row["username"]: row["rank"] for number in (1, 2, 3) for row in leaderboard.get_page(number).object_list}
+        self.assertEqual(ranks, {"ann": 1, "bob": 2, "cid": 3, "dan": 4, "eve": 5})
+        self.assertEqual({user.username: leaderboard.get_rank(user) for user in CustomUser.objects.all()}, ranks)
+
+    def test_rank_lookup_reads_users_ahead_from_the_histogram(self):
+        for name, points in [("ann", 9), ("bob", 5), ("cid", 5)]:
+            CustomUser.objects.create_user(name, f"{name}@example.com", "pw")
+            CustomUser.objects.filter(username=name).update(points=points)
+        leaderboard.build_histogram()
+
+        cid = CustomUser.objects.get(username="cid")
+        with self.assertNumQueries(1):
+            self.assertEqual(leaderboard.get_rank(cid), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.get_rank(cid), 3)
+            self.assertEqual(leaderboard.users_ahead(100), 0)
+            self.assertEqual(leaderboard.users_ahead(6), 1)
+            self.assertEqual(leaderboard.users_ahead(-1), 3)
+
+    def test_awards_patch_the_histogram_or_drop_it(self):
+        for name, points in [("ann", 9), ("bob", 5)]:
+            CustomUser.objects.create_user(name, f"{name}@example.com", "pw")
+            CustomUser.objects.filter(username=name).update(points=points)
+        leaderboard.build_histogram()
+
+        CustomUser.objects.filter(username="bob").update(points=12)
+        leaderboard.record_points("bob-id", "bob", 12, 5)
+        self.assertEqual(cache.get(leaderboard.HISTOGRAM_KEY), leaderboard.build_histogram())
+        self.assertEqual(leaderboard.users_ahead(9), 1)
+
+        leaderboard.record_points("bob-id", "bob", 12)
+        self.assertIsNone(cache.get(leaderboard.HISTOGRAM_KEY))
+
+
+class SearchTests(TestCase):
+
+    def make_problem(self, title, description = "d"):
+        return Problem.objects.create(title=title, description=description, input_format="i", output_format="o",
+                                      constraints="c", sample_input="1", sample_output="1")
+
+    def test_problems_matching_more_query_terms_rank_first(self):
+        # "arr" hits three indexed words of the first problem, but only one of the two query terms.
+        many_words = self.make_problem("Array arrays arrangement")
+        both_terms = self.make_problem("Arrow sum")
+        self.make_problem("Graph colouring")
+
+        results = list(search_problems("arr sum").object_list)
+        self.assertEqual(results, [both_terms, many_words])
+
+    def test_migration_indexes_existing_problems(self):
+        problem = self.make_problem("Longest path", "Find the longest path")
+        ProblemSearchTerm.objects.all().delete()
+
+        import_module("accounts.migrations.0011_problemsearchterm").index_existing_problems(apps, None)
+        self.assertEqual(list(search_problems("longest").object_list), [problem])
+        self.assertEqual(dict(problem.search_terms.values_list("term", "weight")), {"longest": 11, "path": 11, "find": 1})
+
+
+@override_settings(PROBLEMS_PER_PAGE=3)
+class ProblemListApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Everything the list shows is the same, so only the id can keep the pages apart.
+        self.problems = [
+            Problem.objects.create(title="Two sum", description="d", input_format="i", output_format="o", constraints="c",
+                                   sample_input="1", sample_output="1", difficulty="Hard" if index % 3 == 0 else "Easy")
+            for index in range(8)
+        ]
+
+    def pages(self, **params):
+        pages = []
+        cursor = None
+        while True:
+            response = self.client.get(reverse("problem_list_api"), {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["id"] for row in response.json()["results"]])
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_cursor_visits_every_problem_once_across_tied_pages(self):
+        ids = [problem.id for problem in self.problems]
+        self.assertEqual(self.pages(), [ids[0:3], ids[3:6], ids[6:8]])
+
+    def test_difficulty_filter_pages_through_matching_problems_only(self):
+        hard = [problem.id for problem in self.problems if problem.difficulty == "Hard"]
+        self.assertEqual(self.pages(difficulty="Hard"), [hard])
+        self.assertEqual(sum(self.pages(difficulty="Easy"), []), [problem.id for problem in self.problems if problem.id not in hard])
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in ("abc", "-1", "3 OR 1=1", "1e3", "\u0663"):
+            response = self.client.get(reverse("problem_list_api"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn("error", response.json())
+        self.assertEqual(self.client.get(reverse("problem_list"), {"cursor": "abc"}).status_code, 400)
+
+
+class BenchCommandTests(SimpleTestCase):
+
+    def test_submission_bench_refuses_a_live_database(self):
+        with mock.patch.dict(connection.settings_dict, {"NAME": "codehub"}):
+            with self.assertRaisesMessage(CommandError, "Refusing to seed"):
+                call_command("bench_submission_queries", rows=10, stdout=StringIO())
+
+    def test_scratch_databases_are_recognised(self):
+        for name in ("test_codehub", "/tmp/dev/test.sqlite3", "codehub_bench", "file:memorydb_default?mode=memory&cache=shared"):
+            self.assertTrue(is_scratch_database(name), name)
+        for name in ("codehub", "/srv/codehub/db.sqlite3"):
+            self.assertFalse(is_scratch_database(name), name)
+
+
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, forwarded = None):
+        request = RequestFactory().post("/login/", REMOTE_ADDR="10.0.0.1")
+        if forwarded:
+            request.META["HTTP_X_FORWARDED_FOR"] = forwarded
+        return request
+
+    def test_client_ip_ignores_forwarded_header_unless_configured(self):
+        self.assertEqual(ratelimit.client_ip(self.request("6.6.6.6")), "10.0.0.1")
+
+    @override_settings(RATELIMIT_IP_HEADER="HTTP_X_FORWARDED_FOR", RATELIMIT_TRUSTED_PROXIES=2)
+    def test_client_ip_is_the_entry_of_the_outermost_trusted_proxy(self):
+        # The client forged the first entry; the two trusted proxies appended the last two.
+        self.assertEqual(ratelimit.client_ip(self.request("6.6.6.6, 203.0.113.7, 10.0.0.2")), "203.0.113.7")
+        self.assertEqual(ratelimit.client_ip(self.request("203.0.113.7")), "203.0.113.7")
+        self.assertEqual(ratelimit.client_ip(self.request()), "10.0.0.1")
+
+    @override_settings(RATELIMIT_IP_HEADER="HTTP_X_FORWARDED_FOR", LOGIN_ATTEMPTS_PER_IP=2, LOGIN_ATTEMPTS_PER_USER=100)
+    def test_login_limit_is_per_client_behind_the_proxy(self):
+        for username in ("a", "b"):
+            self.assertTrue(ratelimit.login_attempt(username, ratelimit.client_ip(self.request("203.0.113.7"))).allowed)
+        self.assertFalse(ratelimit.login_attempt("c", ratelimit.client_ip(self.request("203.0.113.7"))).allowed)
+        self.assertTrue(ratelimit.login_attempt("c", ratelimit.client_ip(self.request("198.51.100.1"))).allowed)
+
+    @override_settings(LOGIN_ATTEMPTS_PER_USER=2)
+    def test_successful_login_clears_the_user_limit(self):
+        self.assertTrue(ratelimit.login_attempt("alice", "1.1.1.1").allowed)
+        self.assertTrue(ratelimit.login_attempt("alice", "1.1.1.1").allowed)
+        self.assertFalse(ratelimit.login_attempt("Alice", "1.1.1.1").allowed)
+        ratelimit.login_succeeded("alice")
+        self.assertTrue(ratelimit.login_attempt("alice", "1.1.1.1").allowed)
+
+    def test_cooldown_reports_the_wait(self):
+        self.assertEqual(ratelimit.cooldown("test:cooldown", 30), 0)
+        self.assertGreater(ratelimit.cooldown("test:cooldown", 30), 0)
+
+    def test_fixed_window_is_seeded_once_and_does_not_count_refusals(self):
+        key = f"test:window:{uuid.uuid4().hex}"
+        self.assertEqual(ratelimit.consume(key, 3, 60, initial=lambda: 2), (True, 0, 0))
+        self.assertEqual(ratelimit.consume(key, 3, 60, initial=lambda: 0), (False, 0, 60))
+        self.assertEqual(ratelimit.get_cache().get(key), 3)
+
+    @override_settings(RUN_LIMIT=2, RUN_LIMIT_WINDOW=60)
+    def test_runs_are_limited_per_user(self):
+        alice, bob = mock.Mock(id=uuid.uuid4()), mock.Mock(id=uuid.uuid4())
+        self.assertTrue(ratelimit.consume_run(alice).allowed)
+        self.assertTrue(ratelimit.consume_run(alice).allowed)
+        refused = ratelimit.consume_run(alice)
+        self.assertFalse(refused.allowed)
+        self.assertTrue(0 < refused.retry_after <= 60)
+        self.assertTrue(ratelimit.consume_run(bob).allowed)
+
+
+
+class SubmitViewTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.problem = self.make_problem()
+        self.client.force_login(self.user)
+        self.url = reverse("submit_solution", args=[self.problem.slug])
+
+    def test_invalid_submissions_cost_no_quota(self):
+        for data in ({"code": "print(1)"}, {"code": "print(1)", "language_id": "999"},
+                     {"code": "print(1)", "language_id": "python"}, {"code": " ", "language_id": "71"}):
+            self.assertEqual(self.client.post(self.url, data).status_code, 400, data)
+        self.assertFalse(Submission.objects.exists())
+        self.assertEqual(ratelimit.submissions_remaining(self.user, self.problem), settings.SUBMISSION_DAILY_LIMIT)
+
+        self.assertEqual(self.client.post(self.url, {"code": "print(1)", "language_id": "71"}).status_code, 200)
+        self.assertEqual(Submission.objects.get().language_id, 71)
+        self.assertEqual(ratelimit.submissions_remaining(self.user, self.problem), settings.SUBMISSION_DAILY_LIMIT - 1)
+
+    @override_settings(JUDGE_QUEUE_MAX=1)
+    def test_full_queue_turns_the_submission_away_without_using_quota(self):
+        enqueue_submission(self.make_user("bob"), self.problem, "echo", 71)
+
+        response = self.client.post(self.url, {"code": "print(1)", "language_id": "71"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertContains(response, "The judge queue is full (1 waiting)", status_code=429)
+        self.assertEqual(Submission.objects.count(), 1)
+        self.assertEqual(ratelimit.submissions_remaining(self.user, self.problem), settings.SUBMISSION_DAILY_LIMIT)
+
+
+@override_settings(JUDGE0_MIN_POLL_INTERVAL=0.01, JUDGE_BACKEND="accounts.backends.Judge0Backend")
+class RunViewTests(BlobDirMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(backends, "_backend", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.problem = self.make_problem()
+        self.client.force_login(self.make_user())
+        self.url = reverse("run_solution", args=[self.problem.slug])
+
+    def test_samples_run_on_the_remote_judge_and_are_cached(self):
+        with FakeJudge0(send_callbacks=False) as fake, override_settings(JUDGE0_API_URL=fake.url):
+            first = self.client.post(self.url, {"code": "echo", "language_id": "71"}).json()
+            again = self.client.post(self.url, {"code": "echo", "language_id": "71"}).json()
+
+        self.assertEqual((first["status"], first["cached"]), ("ACCEPTED", False))
+        self.assertEqual(first["cases"][0]["stdout"], "1")
+        self.assertEqual((again["status"], again["cached"]), ("ACCEPTED", True))
+        self.assertEqual([method for method, _ in fake.requests].count("POST"), 1)
+        self.assertFalse(Submission.objects.exists())
+
+    @override_settings(JUDGE_BACKEND="accounts.backends.LocalBackend", DEBUG=True)
+    def test_runs_are_refused_when_code_would_run_in_the_web_process(self):
+        with mock.patch.object(runner, "run_code") as run_code, self.assertLogs("django.request", "ERROR"):
+            response = self.client.post(self.url, {"code": "print(1)", "language_id": "71"})
+        self.assertEqual(response.status_code, 503)
+        run_code.assert_not_called()
+        self.assertIsNone(backends._backend)
+
+class SettingsProfileTests(SimpleTestCase):
+
+    def load_settings(self, code = "import codehub.settings as s; print(s.SESSION_ENGINE)", **env):
+        # A fresh interpreter, since the settings module decides all this at import time.
+        environ = {key: value for key, value in os.environ.items()
+                   if not key.startswith(("CACHE_", "SESSION_", "TEMPLATE_", "DJANGO_SETTINGS_MODULE"))}
+        environ.update({"SECRET_KEY": "test", "DB_NAME": "test", "DB_USER": "test", "DB_PASS": "test"}, **env)
+        return subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=environ,
+        )
+
+    def test_production_refuses_a_process_local_cache(self):
+        loaded = self.load_settings(SETTINGS_PROFILE="production")
+        self.assertNotEqual(loaded.returncode, 0)
+        self.assertIn("ImproperlyConfigured", loaded.stderr)
+
+    def test_sessions_stay_in_the_database_without_a_shared_cache(self):
+        self.assertEqual(self.load_settings(SETTINGS_PROFILE="development").stdout.strip(),
+                         "django.contrib.sessions.backends.db")
+        shared = self.load_settings(SETTINGS_PROFILE="production", CACHE_BACKEND="django.core.cache.backends.db.DatabaseCache",
+                                    CACHE_LOCATION="codehub_cache")
+        self.assertEqual(shared.stdout.strip(), "django.contrib.sessions.backends.cached_db", shared.stderr)
+
+    def test_production_refuses_process_local_ratelimits(self):
+        loaded = self.load_settings(SETTINGS_PROFILE="production", CACHE_BACKEND="django.core.cache.backends.db.DatabaseCache",
+                                    CACHE_LOCATION="codehub_cache", RATELIMIT_CACHE_ALIAS="verdicts")
+        self.assertNotEqual(loaded.returncode, 0)
+        self.assertIn("'verdicts' cache", loaded.stderr)
+
+    def test_production_starts_with_every_template_compiled(self):
+        code = ("import codehub.wsgi; from django.template import engines; engine = engines['django'].engine; "
+                "print(engine.debug, type(engine.template_loaders[0]).__name__, "
+                "sorted(set(engine.template_loaders[0].get_template_cache) & {'question.html', 'submit_solution.html'}))")
+        production = {"SETTINGS_PROFILE": "production", "CACHE_BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                      "CACHE_LOCATION": "codehub_cache"}
+
+        loaded = self.load_settings(code, **production)
+        self.assertEqual(loaded.stdout.strip(), "False Loader ['question.html', 'submit_solution.html']", loaded.stderr)
+        loaded = self.load_settings(code, TEMPLATE_PRECOMPILE="false", **production)
+        self.assertEqual(loaded.stdout.strip(), "False Loader []", loaded.stderr)
+
+
+class LazyURLTests(SimpleTestCase):
+
+    def test_loading_urls_and_running_checks_leaves_views_unimported(self):
+        code = ("import os, sys, django; os.environ['DJANGO_SETTINGS_MODULE'] = 'codehub.settings'; django.setup(); "
+                "from django.urls import get_resolver; get_resolver().url_patterns; "
+                "from django.core.management import call_command; call_command('check'); "
+                "print(sorted({'accounts.views', 'accounts.judging'} & set(sys.modules)))")
+        environ = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"}
+        environ.update({"SECRET_KEY": "test", "DB_NAME": "test", "DB_USER": "test", "DB_PASS": "test"})
+        loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=settings.BASE_DIR, env=environ)
+        self.assertEqual(loaded.stdout.strip().splitlines()[-1], "[]", loaded.stderr)
+        self.assertIn("no issues", loaded.stdout)
+
+    def test_lazy_routes_resolve_and_reverse(self):
+        from . import views
+
+        match = resolve("/problems/two-sum/submit/")
+        self.assertIs(match.func, views.submit_solution)
+        self.assertEqual((match.url_name, match.kwargs), ("submit_solution", {"problem_slug": "two-sum"}))
+        self.assertEqual(reverse("submit_solution", args=["two-sum"]), "/problems/two-sum/submit/")
+        self.assertEqual(reverse("judge0_callback", args=[7, "sig"]), "/judge0/callback/7/sig/")
+
+    def test_view_path_is_only_imported_on_first_use(self):
+        pattern = lazy_path("missing/", "accounts.no_such_module.view", name="missing")
+        self.assertEqual(pattern.check(), [])
+        self.assertEqual(pattern.lookup_str, "accounts.no_such_module.view")
+        with self.assertRaises(ImportError):
+            pattern.resolve("missing/")
+
+
+class TemplateTests(SimpleTestCase):
+
+    def test_precompile_loads_every_project_template(self):
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]["APP_DIRS"] = False
+        templates[0]["OPTIONS"]["loaders"] = [("django.template.loaders.cached.Loader", LOADERS)]
+        with override_settings(TEMPLATES=templates):
+            compiled, failed = precompile_templates()
+            cached = engines["django"].engine.template_loaders[0].get_template_cache
+
+        own = {name for name in os.listdir(os.path.join(settings.BASE_DIR, "accounts", "templates")) if name.endswith(".html")}
+        self.assertGreaterEqual(compiled, len(own))
+        self.assertLessEqual(own, set(cached))
+        self.assertFalse(own & set(failed))
+
+    def test_render_benchmark_reports_each_template(self):
+        out = StringIO()
+        call_command("bench_templates", problems=20, results=5, repeat=2, stdout=out)
+        self.assertIn("question.html", out.getvalue())
+        self.assertIn("submit_solution.html", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "Render time over"):
+            call_command("bench_templates", problems=20, results=5, repeat=2, budget_ms=0, stdout=StringIO())
+
+
+NETWORK_PROGRAM = r"""
+#include <arpa/inet.h>
+#include <cstdio>
+#include <netinet/in.h>
+#include <sys/socket.h>
+int main() {
+    int fd = socket(AF_INET, SOCK_STREAM, 0);
+    sockaddr_in address{};
+    address.sin_family = AF_INET;
+    address.sin_port = htons(PORT);
+    address.sin_addr.s_addr = inet_addr("127.0.0.1");
+    puts(connect(fd, (sockaddr *) &address, sizeof address) == 0 ? "connected" : "blocked");
+}
+"""
+
+READ_PROGRAM = r"""
+#include <cstdio>
+int main() { puts(fopen("PATH", "r") ? "read" : "denied"); }
+"""
+
+FORK_PROGRAM = r"""
+#include <cstdio>
+#include <unistd.h>
+int main() {
+    int started = 0;
+    for (int i = 0; i < 500; i++) {
+        pid_t pid = fork();
+        if (pid == 0) { sleep(5); _exit(0); }
+        if (pid > 0) started++;
+    }
+    printf("%d\n", started);
+}
+"""
+
+
+@skipUnless(shutil.which("g++"), "needs g++")
+class SandboxTests(SimpleTestCase):
+
+    def setUp(self):
+        self.build_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.build_root, ignore_errors=True)
+
+    def run_cpp(self, source, stdin = ""):
+        return sandbox.run_payload({"language_id": 54, "source_code": source, "stdin": stdin, "memory_limit": 256000}, self.build_root)
+
+    def test_memory_is_the_programs_own_peak(self):
+        # Forked from this (large) test process, ru_maxrss alone would report its size.
+        result = self.run_cpp('#include <cstdio>\nint main() { int x; scanf("%d", &x); printf("%d\\n", x); }', "5")
+        self.assertEqual(result["status"], sandbox.ACCEPTED)
+        self.assertEqual(result["stdout"], "5\n")
+        self.assertLess(result["memory"], 8 * 1024)
+
+    @skipUnless(os.geteuid() == 0, "needs root to switch uids")
+    def test_sandboxed_program_has_no_network_files_or_spare_processes(self):
+        sandbox.configure_sandbox(65534, 65534)
+        self.addCleanup(sandbox.configure_sandbox, None, None)
+
+        listener = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(listener.close)
+        secret_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, secret_dir, ignore_errors=True)
+        secret = os.path.join(secret_dir, "blob")
+        with open(secret, "w") as f:
+            f.write("expected output")
+
+        self.assertEqual(self.run_cpp(NETWORK_PROGRAM.replace("PORT", str(listener.getsockname()[1])))["stdout"], "blocked\n")
+        self.assertEqual(self.run_cpp(READ_PROGRAM.replace("PATH", secret))["stdout"], "denied\n")
+        self.assertLess(int(self.run_cpp(FORK_PROGRAM)["stdout"]), sandbox.MAX_PROCESSES)
+
+    def test_unfinished_compiles_are_not_kept(self):
+        source = "int main() { return 0; }"
+        for outcome in ((None, "Compilation timed out"), (-9, "\nCompiler killed by signal 9")):
+            with mock.patch.object(sandbox, "compile_source", return_value=outcome):
+                built = sandbox.build(54, source, self.build_root)
+            self.assertEqual((built["ok"], built["final"]), (False, False))
+            self.assertEqual(os.listdir(self.build_root), [])
+            with mock.patch.object(sandbox, "compile_source", return_value=outcome):
+                self.assertEqual(self.run_cpp(source)["status"], sandbox.INTERNAL_ERROR)
+
+        self.assertEqual(self.run_cpp(source)["status"], sandbox.ACCEPTED)
+        built = sandbox.build(54, "int main() {", self.build_root)
+        self.assertEqual((built["ok"], built["final"]), (False, True))
+        self.assertEqual(sandbox.build(54, "int main() {", self.build_root)["ok"], False)
+
+    def test_interpreted_programs_need_no_build(self):
+        built = sandbox.build(71, "print(1)", self.build_root)
+        self.assertEqual((built["ok"], built["final"]), (True, True))
+        result = sandbox.run_payload({"language_id": 71, "source_code": "print(int(input()) * 2)", "stdin": "21",
+                                      "expected_output": "42"}, self.build_root)
+        self.assertEqual(result["status"], sandbox.ACCEPTED)
+
+    def test_only_real_compile_errors_are_cached(self):
+        backend = mock.Mock()
+        backend.compile.return_value = {"ok": False, "final": False, "compile_output": "Compilation timed out"}
+        self.assertEqual(get_compile_error(backend, 54, "slow"), "Compilation timed out")
+        self.assertIsNone(cache.get(compile_cache_key(54, "slow")))
+
+        backend.compile.return_value = {"ok": False, "final": True, "compile_output": "error: expected '}'"}
+        self.assertEqual(get_compile_error(backend, 54, "broken"), "error: expected '}'")
+        self.assertEqual(cache.get(compile_cache_key(54, "broken")), "error: expected '}'")
+        cache.delete(compile_cache_key(54, "broken"))
+
+
+class ScriptedBackend:
+    # Each payload names its verdict and how many polling rounds it takes to finish.
+    def __init__(self):
+        self.submitted = []
+        self.cancelled = []
+        self.payloads = {}
+        self.rounds = {}
+
+    def submit_batch(self, payloads):
+        tokens = []
+        for payload in payloads:
+            token = uuid.uuid4().hex
+            self.payloads[token] = payload
+            self.rounds[token] = payload.get("rounds", 1)
+            self.submitted.append(payload["index"])
+            tokens.append(token)
+        return tokens
+
+    def fetch_results(self, tokens):
+        finished = {}
+        for token in tokens:
+            self.rounds[token] -= 1
+            if self.rounds[token] <= 0:
+                finished[token] = {"status": self.payloads[token]["status"]}
+        return finished
+
+    def wait(self, tokens, timeout):
+        pass
+
+    def cancel(self, tokens):
+        self.cancelled.extend(self.payloads[token]["index"] for token in tokens)
+
+
+class EngineTests(SimpleTestCase):
+    WRONG_ANSWER = {"id": 4, "description": "Wrong Answer"}
+
+    def payloads(self, *cases):
+        return [{"index": index, "status": status, "rounds": rounds} for index, (status, rounds) in enumerate(cases)]
+
+    def test_nothing_is_dispatched_after_a_failure(self):
+        backend = ScriptedBackend()
+        cases = self.payloads((ACCEPTED, 1), (self.WRONG_ANSWER, 1), (ACCEPTED, 1), (ACCEPTED, 1), (ACCEPTED, 1))
+        results = run_testcases(backend, cases, concurrency=2)
+
+        self.assertEqual(backend.submitted, [0, 1])
+        self.assertEqual([result and result["status"]["id"] for result in results], [3, 4, None, None, None])
+
+    def test_slower_cases_behind_a_failure_are_cancelled(self):
+        backend = ScriptedBackend()
+        finished = []
+        cases = self.payloads((ACCEPTED, 3), (self.WRONG_ANSWER, 1), (ACCEPTED, 5), (ACCEPTED, 1))
+        results = run_testcases(backend, cases, concurrency=3, on_result=lambda index, result: finished.append(index))
+
+        self.assertEqual(backend.submitted, [0, 1, 2])
+        self.assertEqual(backend.cancelled, [2])
+        self.assertEqual(finished, [1, 0])
+        # Every process-wide slot taken for the run is handed back.
+        self.assertEqual(get_global_slots()._value, settings.JUDGE_GLOBAL_CONCURRENCY)
+        self.assertEqual([result and result["status"]["id"] for result in results], [3, 4, None, None])
+
+    def test_every_case_runs_when_all_pass(self):
+        backend = ScriptedBackend()
+        results = run_testcases(backend, self.payloads(*[(ACCEPTED, 2)] * 5), concurrency=2)
+        self.assertEqual(sorted(backend.submitted), [0, 1, 2, 3, 4])
+        self.assertTrue(all(is_accepted(result) for result in results))
+
+
+# Accepts any answer with the right last digit; a non-number makes it fail with status 3.
+CUSTOM_CHECKER = r"""
+import sys
+try:
+    output = int(open(sys.argv[2]).read())
+except ValueError:
+    sys.exit(3)
+sys.exit(0 if output % 10 == int(open(sys.argv[3]).read()) % 10 else 1)
+"""
+
+
+class CheckerTests(SimpleTestCase):
+
+    def check(self, compare, output, expected, epsilon = None):
+        return compare(StringIO(output), StringIO(expected), epsilon)
+
+    def test_lines_ignore_trailing_whitespace_only(self):
+        self.assertTrue(self.check(checkers.lines_match, "1 2  \n3\n\n\n", "1 2\n3"))
+        self.assertTrue(self.check(checkers.lines_match, "1\n\n2\n", "1\n\n2"))
+        self.assertFalse(self.check(checkers.lines_match, "1  2\n3", "1 2\n3"))
+        self.assertFalse(self.check(checkers.lines_match, "1\n2", "1\n\n2"))
+        self.assertFalse(self.check(checkers.lines_match, "1\n2", "1\n2\n3"))
+
+    def test_tokens_survive_chunk_boundaries(self):
+        with mock.patch.object(checkers, "CHUNK_SIZE", 4):
+            self.assertEqual(list(checkers.tokens(StringIO("alpha  beta\ngamma d"))), ["alpha", "beta", "gamma", "d"])
+            self.assertTrue(self.check(checkers.tokens_match, "1   2\n\n3 ", "1 2 3"))
+            self.assertFalse(self.check(checkers.tokens_match, "12 3", "1 23"))
+
+    def test_floats_allow_absolute_or_relative_error(self):
+        self.assertTrue(self.check(checkers.floats_match, "0.3333334 1000000.5", "0.333333 1000000"))
+        self.assertFalse(self.check(checkers.floats_match, "0.3334", "0.3333"))
+        self.assertTrue(self.check(checkers.floats_match, "0.3334", "0.3333", epsilon=1e-3))
+        self.assertFalse(self.check(checkers.floats_match, "nan", "NaN"))
+        self.assertTrue(self.check(checkers.floats_match, "YES 1.0", "YES 1"))
+        self.assertFalse(self.check(checkers.floats_match, "1.0", "1.0 2.0"))
+
+    def test_comparisons_read_the_bytes_the_sandbox_hands_them(self):
+        self.assertTrue(checkers.floats_match(BytesIO(b"0.5000001\n"), BytesIO(b"0.5"), None))
+        self.assertFalse(checkers.lines_match(BytesIO(b"a b"), BytesIO(b"a  b"), None))
+
+    def test_custom_checker_decides_the_verdict(self):
+        build_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, build_root, ignore_errors=True)
+        checker = {"mode": "custom", "language_id": 71, "source_code": CUSTOM_CHECKER}
+        payload = {"stdin": "", "expected_output": "3", "checker": checker}
+
+        verdicts = [sandbox.check_result({"stdout": stdout}, payload, build_root, None)["status"] for stdout in ("13", "14", "x")]
+        self.assertEqual(verdicts, [sandbox.ACCEPTED, sandbox.WRONG_ANSWER, sandbox.INTERNAL_ERROR])
+
+
+class SignupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def sign_up(self, username = "newbie"):
+        return self.client.post(reverse("signup"), {"username": username, "email": f"{username}@example.com",
+                                                    "password": "long enough", "confirm_password": "long enough"})
+
+    def test_pending_signup_needs_no_session_or_user(self):
+        self.assertRedirects(self.sign_up(), reverse("verifyemail"), fetch_redirect_response=False)
+        self.assertFalse(CustomUser.objects.filter(username="newbie").exists())
+        self.assertFalse(Session.objects.exists())
+
+        request = RequestFactory().get("/")
+        request.COOKIES = {key: morsel.value for key, morsel in self.client.cookies.items()}
+        token, record = signups.get_pending(request)
+        self.assertEqual(record["username"], "newbie")
+        self.assertNotIn("long enough", json.dumps(record))
+        self.assertIn(record["code"], mail.outbox[-1].body)
+
+    def test_right_code_creates_the_user_and_logs_in(self):
+        self.sign_up()
+        code = mail.outbox[-1].body.split()[-1]
+        wrong = "100000" if code != "100000" else "100001"
+
+        response = self.client.post(reverse("verifyemail"), {"code": wrong})
+        self.assertContains(response, "Verification code does not match")
+
+        response = self.client.post(reverse("verifyemail"), {"code": code})
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        user = CustomUser.objects.get(username="newbie")
+        self.assertTrue(user.is_verified)
+        self.assertTrue(user.check_password("long enough"))
+        self.assertEqual(self.client.session["_auth_user_id"], str(user.pk))
+        self.assertEqual(self.client.cookies[signups.COOKIE_NAME].value, "")
+
+        # The pending record is gone, so the code cannot be used again.
+        self.assertRedirects(self.client.post(reverse("verifyemail"), {"code": code}), reverse("signup"),
+                             fetch_redirect_response=False)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.sign_up()
+        self.client.cookies[signups.COOKIE_NAME] = self.client.cookies[signups.COOKIE_NAME].value + "x"
+        self.assertRedirects(self.client.post(reverse("verifyemail"), {"code": "123456"}), reverse("signup"),
+                             fetch_redirect_response=False)
+
+    def test_codes_compare_exactly(self):
+        record = {"code": "123456"}
+        self.assertTrue(signups.code_matches(record, "123456"))
+        self.assertFalse(signups.code_matches(record, "12345"))
+        self.assertFalse(signups.code_matches(record, "123457"))
+
+    @override_settings(VERIFICATION_EMAIL_INTERVAL=0)
+    def test_resend_replaces_the_code(self):
+        with mock.patch.object(signups, "_new_code", side_effect=["111111", "222222"]):
+            self.sign_up()
+            self.client.get(reverse("resend_verification_email"))
+        self.assertIn("222222", mail.outbox[-1].body)
+
+        self.assertContains(self.client.post(reverse("verifyemail"), {"code": "111111"}), "does not match")
+        self.assertRedirects(self.client.post(reverse("verifyemail"), {"code": "222222"}), "/", fetch_redirect_response=False)
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_public_page_is_cached_and_revalidated(self):
+        response = self.client.get(reverse("terms"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertEqual(cache.get(page_cache_key(reverse("terms")))["content"], response.content)
+
+        self.assertEqual(self.client.get(reverse("terms"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(reverse("terms"), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304)
+
+        with mock.patch("accounts.views.render", side_effect=AssertionError("view ran")):
+            self.assertEqual(self.client.get(reverse("terms")).content, response.content)
+
+    def test_signed_in_pages_are_private_per_user(self):
+        anonymous = self.client.get(reverse("explore"))
+        self.client.force_login(CustomUser.objects.create_user("alice", "alice@example.com", "pw123456"))
+        # Logging in rotates the CSRF cookie, which is part of the variant; the first page sets the new one.
+        self.client.get(reverse("explore"))
+        signed_in = self.client.get(reverse("explore"))
+
+        self.assertNotEqual(signed_in["ETag"], anonymous["ETag"])
+        self.assertIn("private", signed_in["Cache-Control"])
+        self.assertIn("Cookie", signed_in["Vary"])
+        self.assertNotIn("Last-Modified", signed_in)
+        self.assertEqual(self.client.get(reverse("explore"), HTTP_IF_NONE_MATCH=signed_in["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(reverse("explore"), HTTP_IF_NONE_MATCH=anonymous["ETag"]).status_code, 200)
+
+    def test_warm_page_cache_fills_the_shared_copies(self):
+        call_command("warm_page_cache", stdout=StringIO(), stderr=StringIO())
+        for path in (reverse("terms"), reverse("explore"), reverse("sql_topic_content", args=["basic"])):
+            self.assertIsNotNone(cache.get(page_cache_key(path)), path)
+
+
+class BlobTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def test_identical_data_is_stored_once(self):
+        first = blobs.store_text(self.root, "1 2 3\n")
+        self.assertEqual(blobs.store_text(self.root, "1 2 3\n"), first)
+        other = blobs.store_text(self.root, "")
+        self.assertEqual(first[1], 6)
+        self.assertEqual(sorted(blobs.iter_digests(self.root)), sorted([first[0], other[0]]))
+        self.assertEqual(blobs.read_text(self.root, first[0]), "1 2 3\n")
+        self.assertEqual(blobs.read_text(self.root, other[0]), "")
+
+    def test_large_data_is_streamed_in_chunks(self):
+        data = os.urandom(1000) * 50
+        with mock.patch.object(blobs, "CHUNK_SIZE", 4096):
+            digest, size = blobs.store_blob(self.root, BytesIO(data))
+            copy = os.path.join(self.root, "copy")
+            blobs.copy_blob(self.root, digest, copy)
+        self.assertEqual(size, len(data))
+        with open(copy, "rb") as f:
+            self.assertEqual(f.read(), data)
+        # Repetitive data compresses, and no staging file is left behind.
+        self.assertLess(os.path.getsize(blobs.blob_path(self.root, digest)), len(data) // 10)
+        self.assertEqual([name for name in os.listdir(self.root) if name.startswith(".")], [])
+
+
+class TestCaseBlobMigrationTests(TransactionTestCase):
+    before = [("accounts", "0011_problemsearchterm")]
+    after = [("accounts", "0012_testcase_blobs")]
+
+    def setUp(self):
+        blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, blob_dir, ignore_errors=True)
+        blob_settings = override_settings(TESTCASE_BLOB_DIR=blob_dir)
+        blob_settings.enable()
+        self.addCleanup(blob_settings.disable)
+        self.blob_dir = blob_dir
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_data_moves_into_blobs_and_back(self):
+        old_apps = self.migrate(self.before)
+        problem = old_apps.get_model("accounts", "Problem").objects.create(
+            title="Echo", slug="echo", description="d", input_format="i", output_format="o", constraints="c",
+            sample_input="1", sample_output="1")
+        old_apps.get_model("accounts", "TestCase").objects.create(problem=problem, input_data="3 4\n", expected_output="7\n")
+
+        testcase = self.migrate(self.after).get_model("accounts", "TestCase").objects.get()
+        self.assertEqual((testcase.input_size, testcase.output_size), (4, 2))
+        self.assertEqual(blobs.read_text(self.blob_dir, testcase.input_digest), "3 4\n")
+        self.assertEqual(blobs.read_text(self.blob_dir, testcase.output_digest), "7\n")
+
+        testcase = self.migrate(self.before).get_model("accounts", "TestCase").objects.get()
+        self.assertEqual((testcase.input_data, testcase.expected_output), ("3 4\n", "7\n"))
+
+
+class TestCaseAdminTests(BlobDirMixin, TestCase):
+
+    def test_large_upload_is_stored_as_a_blob(self):
+        problem = self.make_problem(cases=())
+        admin_user = CustomUser.objects.create_superuser("admin", "admin@example.com", "pw123456")
+        self.client.force_login(admin_user)
+        data = b"1 2\n" * (1024 * 1024)
+
+        response = self.client.post(reverse("admin:accounts_testcase_add"), {
+            "problem": problem.pk,
+            "input_file": SimpleUploadedFile("input.txt", data),
+            "expected_output": "3\n",
+        })
+        self.assertEqual(response.status_code, 302)
+
+        testcase = problem.testcases.get()
+        self.assertEqual(testcase.input_size, len(data))
+        self.assertEqual(testcase.input_digest, hashlib.sha256(data).hexdigest())
+        self.assertEqual(testcase.expected_output, "3\n")
+
+        # The edit page does not inline megabytes of data.
+        page = self.client.get(reverse("admin:accounts_testcase_change", args=[testcase.pk]))
+        self.assertContains(page, f"{len(data)} bytes stored")
+        self.assertNotContains(page, "1 2\n1 2")
+
+
+@skipUnless(staticfiles.Image and staticfiles.brotli, "needs Pillow and brotli")
+class StaticFilesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.css = b"body { color: red; }\n" * 200
+        with open(os.path.join(self.source, "app.css"), "wb") as css:
+            css.write(self.css)
+        staticfiles.Image.new("RGB", (200, 200), "red").save(os.path.join(self.source, "logo.png"), compress_level=0)
+
+    def collect(self):
+        storage = staticfiles.CompressedManifestStaticFilesStorage(location=self.root, base_url="/static/")
+        paths = {}
+        for name in ("app.css", "logo.png"):
+            shutil.copy(os.path.join(self.source, name), os.path.join(self.root, name))
+            paths[name] = (FileSystemStorage(location=self.source), name)
+        processed = [hashed for _, hashed, _ in storage.post_process(paths)]
+        return storage, processed
+
+    def middleware(self, immutable = ()):
+        with override_settings(STATIC_SERVE=True, STATIC_ROOT=self.root):
+            middleware = staticfiles.StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+        middleware.immutable = set(immutable)
+        return middleware
+
+    def get(self, name, headers = None, immutable = ()):
+        with override_settings(STATIC_MAX_AGE=60):
+            return self.middleware(immutable)(RequestFactory().get(f"/static/{name}", headers=headers))
+
+    def test_post_process_writes_compressed_and_webp_variants(self):
+        storage, processed = self.collect()
+        css, logo = storage.stored_name("app.css"), storage.stored_name("logo.png")
+        self.assertNotEqual(css, "app.css")
+        for name in (css + ".br", css + ".gz", logo + ".webp", "app.css.gz"):
+            self.assertIn(name, processed)
+            self.assertTrue(os.path.isfile(storage.path(name)), name)
+
+        with open(storage.path(css + ".br"), "rb") as compressed:
+            self.assertEqual(staticfiles.brotli.decompress(compressed.read()), self.css)
+        with open(storage.path(css + ".gz"), "rb") as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), self.css)
+        with staticfiles.Image.open(storage.path(logo + ".webp")) as webp:
+            self.assertEqual((webp.format, webp.size), ("WEBP", (200, 200)))
+
+    def test_encoding_follows_accept_encoding(self):
+        self.collect()
+        cases = [("gzip, br", "br"), ("gzip, deflate", "gzip"), ("br;q=0, gzip", "gzip"), ("br; q=0.0, identity", None), ("", None)]
+        for accept_encoding, expected in cases:
+            response = self.get("app.css", {"Accept-Encoding": accept_encoding})
+            self.assertEqual(response.get("Content-Encoding"), expected, accept_encoding)
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+            self.assertTrue(response["Content-Type"].startswith("text/css"))
+
+        body = b"".join(self.get("app.css", {"Accept-Encoding": "gzip"}).streaming_content)
+        self.assertEqual(gzip.decompress(body), self.css)
+
+    def test_webp_is_served_to_browsers_that_accept_it(self):
+        self.collect()
+        webp = self.get("logo.png", {"Accept": "image/avif,image/webp,*/*"})
+        self.assertEqual(webp["Content-Type"], "image/webp")
+        png = self.get("logo.png", {"Accept": "image/png,*/*"})
+        self.assertEqual(png["Content-Type"], "image/png")
+        self.assertEqual(webp["Vary"], "Accept")
+        self.assertNotEqual(webp["ETag"], png["ETag"])
+
+    def test_unchanged_files_revalidate_with_304_and_hashed_names_are_immutable(self):
+        storage, _ = self.collect()
+        css = storage.stored_name("app.css")
+
+        hashed = self.get(css, {"Accept-Encoding": "br"}, immutable={css})
+        self.assertEqual(hashed.status_code, 200)
+        self.assertEqual(hashed["Cache-Control"], f"public, max-age={staticfiles.IMMUTABLE_MAX_AGE}, immutable")
+        self.assertEqual(self.get("app.css", immutable={css})["Cache-Control"], "public, max-age=60")
+
+        again = self.get(css, {"Accept-Encoding": "br", "If-None-Match": hashed["ETag"]}, immutable={css})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], hashed["ETag"])
+        self.assertEqual(self.get(css, {"Accept-Encoding": "gzip", "If-None-Match": hashed["ETag"]}).status_code, 200)
+
+    def test_other_paths_fall_through(self):
+        self.collect()
+        self.assertEqual(self.get("missing.css").status_code, 404)
+        self.assertEqual(self.get("../app.css").status_code, 404)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+# Judge0 status ids whose verdict only depends on (code, input, limits). TLE and internal
+# errors depend on machine load, so they are always re-run.
+CACHEABLE_STATUS_IDS = (3, 4, 6, 7, 8, 9, 10, 11, 12)
+
+HITS_KEY = "verdict:stats:hits"
+MISSES_KEY = "verdict:stats:misses"
+
+
+def get_verdict_cache():
+    return caches[settings.VERDICT_CACHE_ALIAS]
+
+
+def _incr(key, delta):
+    # Counters live in the default cache so verdict evictions never reset them.
+    if delta and not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, timeout=None)
+
+
+def verdict_key(code, language_id, testcase, time_limit, memory_limit, checker = None):
+    # TestCase.updated_at is part of the key, so editing a test case orphans its old verdicts.
+    digest = hashlib.sha256()
+    for part in (code, str(language_id), testcase.input_digest, testcase.output_digest,
+                 str(time_limit), str(memory_limit), testcase.updated_at.isoformat(),
+                 json.dumps(checker, sort_keys=True)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"verdict:{testcase.id}:{digest.hexdigest()}"
+
+
+def verdict_keys(code, language_id, testcases, time_limit, memory_limit, checker = None):
+    return [verdict_key(code, language_id, testcase, time_limit, memory_limit, checker) for testcase in testcases]
+
+
+def get_cached_verdicts(keys):
+    found = get_verdict_cache().get_many(keys)
+    _incr(HITS_KEY, len(found))
+    _incr(MISSES_KEY, len(keys) - len(found))
+    return [found.get(key) for key in keys]
+
+
+def store_verdicts(keys, results):
+    to_store = {}
+    for key, result in zip(keys, results):
+        if result and result.get("status", {}).get("id") in CACHEABLE_STATUS_IDS:
+            to_store[key] = {
+                "status": result["status"],
+                "stdout": result.get("stdout"),
+                "compile_output": result.get("compile_output"),
+                "time": result.get("time"),
+                "memory": result.get("memory"),
+            }
+    if to_store:
+        get_verdict_cache().set_many(to_store)
+
+
+def verdict_cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = stats.get(HITS_KEY, 0)
+    misses = stats.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total * 100, 2) if total else 0,
+    }
@@ -1,17 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse
 from django.contrib.auth import login as auth_login, logout as auth_logout, authenticate
-from django.db.models import Q
-from .models import CustomUser, VerifiedEmail, Problem, Submission, SubmissionTestCaseResult
-from .judge0 import submit_code_to_judge0, get_submission_result
+from .models import CustomUser, VerifiedEmail, Problem, Submission
+from .judging import enqueue_submission, FINISHED_STATUSES, LANGUAGE_MAP
+from .judge0 import callback_expected, decode_callback_result, is_finished, store_callback_result, verify_callback_signature
+from .search import search_problems
+from .pagination import PROBLEM_LIST_FIELDS, keyset_page
+from .pagecache import cached_page, fragment_context
+from . import leaderboard, progress, ratelimit, runner, scheduler, signups
 from django.core.mail import send_mail
 from functools import wraps
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.conf import settings
 from django.contrib import messages
-from django.utils import timezone
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+import asyncio
+import json
 import random
 import time
 import re
@@ -26,20 +36,25 @@ def home(request):
 def premium(request):
     return render(request, 'premium.html', {'title':"Premium"})
 
+@cached_page()
 def terms(request):
     return render(request, 'terms.html', {'title':"Terms and Conditions"})
 
+@cached_page()
 def privacypolicy(request):
     return render(request, 'privacypolicy.html', {'title':"PrivacyPolicy"})
 
+@cached_page(per_user=True)
 def explore(request):
-    return render(request, 'explore.html', {'title':"Explore"})
+    return render(request, 'explore.html', {'title':"Explore", **fragment_context()})
 
+@cached_page(per_user=True)
 def dsadashboard(request):
-    return render(request, 'dsadashboard.html', {'title':"Dsa-Dashboard"})
+    return render(request, 'dsadashboard.html', {'title':"Dsa-Dashboard", **fragment_context()})
 
+@cached_page(per_user=True)
 def sqldashboard(request):
-    return render(request, 'sqldashboard.html', {'title':"Sql-Dashboard"})
+    return render(request, 'sqldashboard.html', {'title':"Sql-Dashboard", **fragment_context()})
 
 
 def signup(request):
@@ -71,26 +86,22 @@ def signup(request):
         if password != confirm_password:
             return render(request, 'signup.html', {'error': 'Passwords do not match'})
 
-        request.session['pending_signup'] = {
-            'username': username,
-            'email': email,
-            'password': password
-        }
+        wait_time = ratelimit.verification_email_wait(email)
+        if wait_time:
+            return render(request, 'signup.html', {'error': f'Please wait {wait_time} seconds before requesting another code.'})
 
-        code = f'{random.randint(100000, 999999)}'
-        request.session['verification_code'] = code
-        request.session['last_verification_sent'] = time.time()
-        request.session.set_expiry(60 * 15)
+        # Kept out of the session: see accounts/signups.py.
+        token, pending = signups.start(username, email, password)
 
         send_mail(
             subject='Verify Your email - Codehub',
-            message=f'Use this code to verify your email: {code}',
+            message=f'Use this code to verify your email: {pending["code"]}',
             from_email='codehub@gmail.com',
             recipient_list=[email],
             fail_silently=False
         )
 
-        return redirect('verifyemail')
+        return signups.set_cookie(redirect('verifyemail'), token)
 
     return render(request, 'signup.html', {'title': 'Signup'})
 
@@ -106,9 +117,16 @@ def login(request):
                 'error': 'Invalid Username'
             })
 
+        attempt = ratelimit.login_attempt(identifier, ratelimit.client_ip(request))
+        if not attempt.allowed:
+            return render(request, 'login.html', {
+                'error': f'Too many login attempts. Try again in {attempt.retry_after} seconds.'
+            }, status=429)
+
         user = authenticate(request, username=identifier, password=password)
 
         if user and user.check_password(password):
+            ratelimit.login_succeeded(identifier)
             auth_login(request,user)
             if remember_me:
                 request.session.set_expiry(60 * 60 * 24 * 30)
@@ -143,30 +161,27 @@ def send_verification_email(user):
     
 def verifyemail(request):
     if request.method == "POST":
-        entered_code = request.POST.get('code')
-        stored_code = request.session.get('verification_code')
-        signup_data = request.session.get('pending_signup')
+        entered_code = request.POST.get('code', '')
+        token, signup_data = signups.get_pending(request)
 
-        if not signup_data or not stored_code:
+        if not signup_data:
             return redirect('signup') 
         
         if not entered_code.isdigit():
             return render(request, 'verification.html', {'error': 'Code must be numeric'})
 
-        if entered_code == stored_code:
-            user = CustomUser.objects.create_user(
+        if signups.code_matches(signup_data, entered_code):
+            user = CustomUser(
                 username=signup_data['username'],
-                email=signup_data['email'],
-                password=signup_data['password']
+                email=CustomUser.objects.normalize_email(signup_data['email']),
+                password=signup_data['password_hash'],
+                is_verified=True
             )
-            user.is_verified = True
             user.save()
+            signups.discard(token)
 
-            del request.session['pending_signup']
-            del request.session['verification_code']
-
-            auth_login(request, user)
-            return redirect('/')
+            auth_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+            return signups.clear_cookie(redirect('/'))
         else:
             return render(request, 'verification.html', {'error': 'Verification code does not match'})
 
@@ -185,21 +200,17 @@ def email_verification_required(view_func):
     return wrapper
 
 def resend_verification_email(request):
-    last_sent = request.session.get('last_verification_sent')
-    now = time.time()
-
-    if last_sent and now - last_sent < 60:
-        wait_time = int(60 - (now - last_sent))
-        return render(request, 'verification.html', {'error': f'Please wait {wait_time} seconds before resending the code.'})
-    
-    signup_data = request.session.get('pending_signup')
+    token, signup_data = signups.get_pending(request)
     if not signup_data:
         return redirect('signup')
 
+    # Throttled per address rather than per session, so a fresh session does not reset it.
     email = signup_data.get('email')
-    code = f'{random.randint(100000, 999999)}'
-    request.session['verification_code'] = code
-    request.session['last_verification_sent'] = now
+    wait_time = ratelimit.verification_email_wait(email)
+    if wait_time:
+        return render(request, 'verification.html', {'error': f'Please wait {wait_time} seconds before resending the code.'})
+
+    code = signups.renew_code(token, signup_data)
 
     send_mail(
         subject='Verify Your email - Codehub',
@@ -217,29 +228,75 @@ def resend_verification_email(request):
 def problem_list(request):
 
     query = request.GET.get('q', '').strip()
-    top_users = CustomUser.objects.order_by('-points')[:10]
+    difficulty = request.GET.get('difficulty', '').strip()
+    top_users = leaderboard.get_top_users()
+    page = None
+    next_cursor = None
 
     if query:
-        words = query.split()
-        q_objects = Q()
-
-        for word in words:
-            q_objects |= Q(title__icontains=word)
-
-        matching_problems = Problem.objects.filter(q_objects).distinct()
-        non_matching_problems = Problem.objects.exclude(id__in=matching_problems.values_list('id', flat=True))
-
-        problems = list(matching_problems) + list(non_matching_problems)
+        page = search_problems(query, difficulty=difficulty or None, page=request.GET.get('page'))
+        problems = page.object_list
     else:
-        problems = Problem.objects.all()
+        try:
+            problems, next_cursor = keyset_page(
+                problem_list_queryset(difficulty),
+                cursor=request.GET.get('cursor')
+            )
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
 
     return render(request, "question.html", {
         "problems": problems,
+        "page": page,
+        "next_cursor": next_cursor,
+        "difficulty": difficulty,
+        "query": query,
         "title": "Problems",
         "top_users": top_users
     })
 
 
+def problem_list_queryset(difficulty = None):
+    problems = Problem.objects.only(*PROBLEM_LIST_FIELDS)
+    if difficulty:
+        problems = problems.filter(difficulty=difficulty)
+    return problems
+
+
+def problem_list_api(request):
+    try:
+        problems, next_cursor = keyset_page(
+            problem_list_queryset(request.GET.get('difficulty', '').strip()),
+            cursor=request.GET.get('cursor')
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': problem.id,
+                'title': problem.title,
+                'slug': problem.slug,
+                'difficulty': problem.difficulty,
+                'points': problem.points,
+                'success_rate': problem.success_rate(),
+                'url': reverse('submit_solution', args=[problem.slug]),
+            }
+            for problem in problems
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+def submitted_language_id(request):
+    try:
+        language_id = int(request.POST.get('language_id'))
+    except (TypeError, ValueError):
+        return None
+    return language_id if language_id in LANGUAGE_MAP else None
+
+
 @login_required
 def submit_solution(request, problem_slug):
     problem = get_object_or_404(Problem, slug=problem_slug)
@@ -247,124 +304,190 @@ def submit_solution(request, problem_slug):
     submission = None
 
     if request.method == "POST":
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        submissions_today_count = Submission.objects.filter(
-            user=request.user,
-            problem=problem,
-            submitted_at__gte=today_start
-        ).count()
-
-        if submissions_today_count >= 3:
+        code = request.POST.get('code', '')
+        language_id = submitted_language_id(request)
+        if language_id is None or not code.strip():
             return render(request, 'submit_solution.html', {
                 'title': 'CodeSubmit',
                 'problem': problem,
                 'submission': submission,
                 'test_case_results': test_case_results,
-                'error': "You have reached the daily submission limit of 3 for this problem."
-            })
-
-        already_solved = Submission.objects.filter(
-            user=request.user,
-            problem=problem,
-            status="Accepted"
-        ).exists()
+                'submissions_remaining': ratelimit.submissions_remaining(request.user, problem),
+                'error': 'Please select a programming language.' if language_id is None else 'Please write your solution before submitting it.'
+            }, status=400)
+
+        # Checked before the quota, so a submission turned away by a full queue costs nothing.
+        admission = scheduler.check_admission(request.user)
+        if not admission.allowed:
+            response = render(request, 'submit_solution.html', {
+                'title': 'CodeSubmit',
+                'problem': problem,
+                'submission': submission,
+                'test_case_results': test_case_results,
+                'submissions_remaining': ratelimit.submissions_remaining(request.user, problem),
+                'error': f"{admission.reason} ({admission.position - 1} waiting). Please try again shortly."
+            }, status=429)
+            response['Retry-After'] = '30'
+            return response
 
-        code = request.POST.get('code')
-        language_id = int(request.POST.get('language_id'))
+        quota = ratelimit.consume_submission(request.user, problem)
 
-        submission = Submission.objects.create(
-            user=request.user,
-            problem=problem,
-            code=code,
-            language_id=language_id,
-            status="RUNNING"
-        )
+        if not quota.allowed:
+            return render(request, 'submit_solution.html', {
+                'title': 'CodeSubmit',
+                'problem': problem,
+                'submission': submission,
+                'test_case_results': test_case_results,
+                'submissions_remaining': 0,
+                'error': f"You have reached the daily submission limit of {settings.SUBMISSION_DAILY_LIMIT} for this problem."
+            }, status=429)
 
-        all_passed = True
-        max_time = 0
-        max_memory = 0
-        last_output = ""
-
-        for testcase in problem.testcases.all():
-            token = submit_code_to_judge0(
-                sourcecode=code,
-                language_id=language_id,
-                stdin=testcase.input_data,
-                expected_output=testcase.expected_output,
-                time_limit=problem.time_limit,
-                memory_limit=problem.memory_limit
-            )
+        submission = enqueue_submission(request.user, problem, code, language_id)
+        submissions_remaining = quota.remaining
+    else:
+        submissions_remaining = ratelimit.submissions_remaining(request.user, problem)
 
-            result = get_submission_result(token)
+    return render(request, 'submit_solution.html', {
+        'title': 'CodeSubmit',
+        'problem': problem,
+        'submission': submission,
+        'test_case_results': test_case_results,
+        'submissions_remaining': submissions_remaining
+    })
 
-            if result is None:
-                status_desc = 'System Error'
-                output = ''
-                time_used = 0
-                memory_used = 0
-                all_passed = False
-            else:
-                status_desc = result.get("status", {}).get('description', 'Unknown')
-                output = result.get('stdout', "")
-                time_used = float(result.get('time') or 0)
-                memory_used = int(result.get('memory') or 0)
-
-            if status_desc != 'Accepted':
-                all_passed = False
-
-            SubmissionTestCaseResult.objects.create(
-                submission=submission,
-                testcase=testcase,
-                output=output,
-                status=status_desc,
-                time=time_used,
-                memory=memory_used
-            )
 
-            max_time = max(max_time, time_used)
-            max_memory = max(max_memory, memory_used)
-            last_output = output
+@login_required
+@require_POST
+def run_solution(request, problem_slug):
+    problem = get_object_or_404(Problem, slug=problem_slug)
+    if not runner.runs_available():
+        return JsonResponse({'error': 'Sample runs are not available on this judge. Submit your solution instead.'}, status=503)
+    code = request.POST.get('code', '')
+    language_id = submitted_language_id(request)
+    if language_id is None:
+        return JsonResponse({'error': 'Please select a programming language.'}, status=400)
+    if not code.strip():
+        return JsonResponse({'error': 'Please write your solution before running it.'}, status=400)
+
+    stdin = request.POST.get('stdin') if request.POST.get('custom_input') else None
+    if stdin is not None and len(stdin) > settings.RUN_MAX_STDIN:
+        return JsonResponse({'error': f'Custom input is limited to {settings.RUN_MAX_STDIN} characters.'}, status=400)
+
+    result, retry_after = runner.run_code(request.user, problem, code, language_id, stdin)
+    if result is None:
+        response = JsonResponse({'error': f'Too many runs right now, try again in {retry_after} seconds.'}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+    return JsonResponse(result)
 
-            if not all_passed:
-                break
 
-        LANGUAGE_MAP = {
-            71: 'Python 3',
-            54: 'C++',
-            62: 'Java',
-        }
+@login_required
+def submission_status(request, submission_id):
+    submission = get_object_or_404(Submission, id=submission_id, user=request.user)
+    done = submission.status in FINISHED_STATUSES
+
+    results = []
+    if done:
+        results = [
+            {'status': tc.status, 'time': tc.time, 'memory': tc.memory}
+            for tc in submission.testcase_results.order_by('id')
+        ]
+
+    return JsonResponse({
+        'id': submission.id,
+        'status': submission.status,
+        'status_display': submission.get_status_display(),
+        'done': done,
+        'time': submission.time,
+        'memory': submission.memory,
+        'queue_position': scheduler.queue_position(submission),
+        'results': results,
+    })
 
-        submission.status = 'Accepted' if all_passed else status_desc
-        submission.language_name = LANGUAGE_MAP.get(language_id, 'Unknown')
-        submission.time = max_time or None
-        submission.memory = max_memory or None
-        submission.output = last_output
-        submission.save()
 
-        if all_passed and not already_solved:
-            request.user.points += problem.points
-            request.user.save()
+@staff_member_required
+def judge_metrics(request):
+    return JsonResponse(scheduler.metrics())
 
-        test_case_results = submission.testcase_results.all()
 
-    return render(request, 'submit_solution.html', {
-        'title': 'CodeSubmit',
-        'problem': problem,
-        'submission': submission,
-        'test_case_results': test_case_results
-    })
 
+@login_required
+async def submission_events(request, submission_id):
+    user = await request.auser()
+    if not await Submission.objects.filter(id=submission_id, user=user).aexists():
+        raise Http404("Submission not found")
+
+    async def stream():
+        # Runs on the event loop: waiting between checks costs no worker thread.
+        sent = 0
+        started = last_write = last_db_check = time.monotonic()
+        yield "retry: 3000\n\n"
+
+        while time.monotonic() - started < settings.SUBMISSION_EVENTS_STREAM_TIMEOUT:
+            events = await progress.read_events(submission_id, sent)
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                last_write = time.monotonic()
+            sent += len(events)
+            if any(event['type'] == 'done' for event in events):
+                return
+
+            # Fallback for a cache that is not shared with the worker or has expired.
+            if time.monotonic() - last_db_check > 5:
+                last_db_check = time.monotonic()
+                status = await Submission.objects.filter(id=submission_id).values_list('status', flat=True).afirst()
+                if status in FINISHED_STATUSES:
+                    yield f"event: done\ndata: {json.dumps({'type': 'done', 'status': status})}\n\n"
+                    return
+
+            if time.monotonic() - last_write > 15:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            await asyncio.sleep(settings.SUBMISSION_EVENTS_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["PUT", "POST"])
+def judge0_callback(request, submission_id, signature):
+    # Judge0 PUTs each finished test case here; the judge worker picks it up by token.
+    if not verify_callback_signature(submission_id, signature):
+        return HttpResponseForbidden()
+
+    try:
+        result = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON")
+    if not isinstance(result, dict) or not result.get("token") or not is_finished(result):
+        return HttpResponseBadRequest("Missing token or unfinished result")
+    if not callback_expected(submission_id, result["token"]):
+        return HttpResponseForbidden()
+
+    try:
+        result = decode_callback_result(result)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    store_callback_result(result)
+    return HttpResponse(status=204)
 
 
 def leaderboard_view(request):
-    top_users = CustomUser.objects.order_by('-points')[:10]  # Top 10 by points
+    page = leaderboard.get_page(request.GET.get('page'))
+    my_rank = leaderboard.get_rank(request.user) if request.user.is_authenticated else None
     return render(request, 'question.html', {
         'title': 'Leaderboard',
-        'top_users': top_users
+        'top_users': page.object_list,
+        'leaderboard_page': page,
+        'my_rank': my_rank
     })
 
 DSA_TOPICS = ['home', 'array', 'linkedlist', 'trees']
 
+@cached_page()
 def dsa_topic_content(request, topic_name):
     if topic_name not in DSA_TOPICS:
         raise Http404("Topic not found")
@@ -373,6 +496,7 @@ def dsa_topic_content(request, topic_name):
 
 SQL_TOPICS = ['home', 'basic', 'processing']
 
+@cached_page()
 def sql_topic_content(request, topic_name):
     if topic_name not in SQL_TOPICS:
         raise Http404("Topic not found")
@@ -0,0 +1,34 @@
+from django.urls.resolvers import RoutePattern, URLPattern
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+# URL patterns whose views are named by dotted path and imported on first use (resolving or
+# reversing a URL), so management commands and system checks do not import every view module.
+
+
+class LazyURLPattern(URLPattern):
+    def __init__(self, pattern, view_path, default_args = None, name = None):
+        # URLPattern.__init__ would assign callback; here it is a cached property instead.
+        self.pattern = pattern
+        self.view_path = view_path
+        self.default_args = default_args or {}
+        self.name = name
+
+    @cached_property
+    def callback(self):
+        return import_string(self.view_path)
+
+    @cached_property
+    def lookup_str(self):
+        return self.view_path
+
+    def _check_callback(self):
+        # Checking the view would import it; only checked once something has loaded it.
+        if "callback" not in self.__dict__:
+            return []
+        return super()._check_callback()
+
+
+def lazy_path(route, view_path, kwargs = None, name = None):
+    return LazyURLPattern(RoutePattern(route, name=name, is_endpoint=True), view_path, kwargs, name)
+
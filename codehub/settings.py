@@ -15,7 +15,8 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -23,10 +24,15 @@ from decouple import config
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = config('SECRET_KEY')
 
+# 'development' or 'production'. Production turns DEBUG off and serves templates from the
+# cached loader, compiled once when the WSGI/ASGI application starts.
+SETTINGS_PROFILE = config('SETTINGS_PROFILE', default='development')
+PRODUCTION = SETTINGS_PROFILE == 'production'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config('DEBUG', default=not PRODUCTION, cast=bool)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=Csv())
 
 
 # Application definition
@@ -44,13 +50,17 @@ INSTALLED_APPS = [
     "allauth",
     "allauth.account",
     "allauth.socialaccount",
-
-    "allauth.socialaccount.providers.google",
-    "allauth.socialaccount.providers.facebook",
-    "allauth.socialaccount.providers.twitter",
-    "allauth.socialaccount.providers.linkedin_oauth2",
 ]
 
+# Social login providers to load, e.g. "google,facebook". Each one imports its allauth views
+# and HTTP client at startup, so only list providers with credentials configured.
+SOCIAL_PROVIDERS = config(
+    'SOCIAL_PROVIDERS',
+    default='google,facebook,twitter,linkedin_oauth2' if PRODUCTION else '',
+    cast=Csv(),
+)
+INSTALLED_APPS += [f"allauth.socialaccount.providers.{provider}" for provider in SOCIAL_PROVIDERS]
+
 EXTERNAL_APPS = [
     'accounts',
 ]
@@ -69,6 +79,7 @@ LOGOUT_REDIRECT_URL = "/"
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +107,20 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # Templates are parsed once per process and never re-read; a template change needs a restart.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['debug'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Compile every template when the application starts instead of on each one's first request.
+TEMPLATE_PRECOMPILE = config('TEMPLATE_PRECOMPILE', default=PRODUCTION, cast=bool)
+
 WSGI_APPLICATION = 'codehub.wsgi.application'
 
 
@@ -158,11 +183,96 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+if PRODUCTION:
+    # collectstatic writes content-hashed names, optimized images and .br/.gz variants.
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'accounts.staticfiles.CompressedManifestStaticFilesStorage'},
+    }
+
+# Serve STATIC_ROOT from the app itself when no front-end server does it. Hashed files are
+# cached for a year; STATIC_MAX_AGE applies to files requested by their plain name.
+STATIC_SERVE = config('STATIC_SERVE', default=PRODUCTION, cast=bool)
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    # Use a shared backend (database/file/redis) in production so the web and judge
+    # worker processes see the same leaderboard snapshot and counters.
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='codehub-default'),
+    },
+    # Bounded LRU store for judged (source, test case) verdicts.
+    'verdicts': {
+        'BACKEND': config('VERDICT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('VERDICT_CACHE_LOCATION', default='codehub-verdicts'),
+        'TIMEOUT': config('VERDICT_CACHE_TIMEOUT', default=60 * 60 * 24 * 7, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('VERDICT_CACHE_MAX_ENTRIES', default=20000, cast=int),
+        },
+    },
+}
+
+VERDICT_CACHE_ALIAS = 'verdicts'
+
+# Rate-limit counters; must be a cache shared by all web processes for the limits to hold.
+RATELIMIT_CACHE_ALIAS = config('RATELIMIT_CACHE_ALIAS', default='default')
+# Behind a reverse proxy REMOTE_ADDR is the proxy. Name the header it sets (e.g. HTTP_X_FORWARDED_FOR
+# or HTTP_X_REAL_IP) and how many proxies append to it; entries before theirs are client-supplied.
+RATELIMIT_IP_HEADER = config('RATELIMIT_IP_HEADER', default='')
+RATELIMIT_TRUSTED_PROXIES = config('RATELIMIT_TRUSTED_PROXIES', default=1, cast=int)
+SUBMISSION_DAILY_LIMIT = config('SUBMISSION_DAILY_LIMIT', default=3, cast=int)
+VERIFICATION_EMAIL_INTERVAL = config('VERIFICATION_EMAIL_INTERVAL', default=60, cast=int)
+LOGIN_ATTEMPTS_WINDOW = config('LOGIN_ATTEMPTS_WINDOW', default=60 * 15, cast=int)
+LOGIN_ATTEMPTS_PER_USER = config('LOGIN_ATTEMPTS_PER_USER', default=10, cast=int)
+LOGIN_ATTEMPTS_PER_IP = config('LOGIN_ATTEMPTS_PER_IP', default=50, cast=int)
+
+# Caches that only live inside one process. Sessions, pending signups and the judge scheduler use
+# the default cache and rate limits RATELIMIT_CACHE_ALIAS, so production refuses to start on these.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+if PRODUCTION:
+    for alias in ('default', RATELIMIT_CACHE_ALIAS):
+        if CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured(
+                f'SETTINGS_PROFILE=production needs the {alias!r} cache shared by every process '
+                f'(redis, memcached, database or file based), not {CACHES[alias]["BACKEND"]}.'
+            )
+
+# Sample-only runs: synchronous, uncounted against the daily quota, never stored in the database.
+RUN_LIMIT = config('RUN_LIMIT', default=20, cast=int)
+RUN_LIMIT_WINDOW = config('RUN_LIMIT_WINDOW', default=60, cast=int)
+RUN_CACHE_TIMEOUT = config('RUN_CACHE_TIMEOUT', default=60 * 5, cast=int)
+RUN_TIMEOUT = config('RUN_TIMEOUT', default=20.0, cast=float)
+RUN_RETRY_AFTER = config('RUN_RETRY_AFTER', default=5, cast=int)
+RUN_MAX_STDIN = config('RUN_MAX_STDIN', default=64 * 1024, cast=int)
+RUN_OUTPUT_LIMIT = config('RUN_OUTPUT_LIMIT', default=4096, cast=int)
+
+# Static pages (terms, dashboards, topic partials) are cached whole and revalidated by ETag.
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+PAGE_CACHE_MAX_AGE = config('PAGE_CACHE_MAX_AGE', default=60 * 10, cast=int)
+
+# With a shared cache sessions are read from it and written through to the database; on a
+# process-local cache a logout in one process would leave the session alive in the others, so
+# they stay in the database. With a persistent cache such as redis,
+# 'django.contrib.sessions.backends.cache' drops the database writes too.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if SHARED_CACHE else 'django.contrib.sessions.backends.db',
+)
+SESSION_CACHE_ALIAS = config('SESSION_CACHE_ALIAS', default='default')
+SESSION_SAVE_EVERY_REQUEST = False
+# Unverified signups wait in the cache, not the session, for this long.
+SIGNUP_TIMEOUT = config('SIGNUP_TIMEOUT', default=60 * 15, cast=int)
+
 LOGIN_URL = 'login' 
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -170,7 +280,58 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 
-JUDGE0_API_URL = config('JUDGE0_API_URL')
-JUDGE0_API_HOST = config('JUDGE0_API_HOST')
-JUDGE0_API_KEY = config('JUDGE0_API_KEY')
-
+# Only needed with the Judge0 backend; the client is built on the first Judge0 request.
+JUDGE0_API_URL = config('JUDGE0_API_URL', default='')
+JUDGE0_API_HOST = config('JUDGE0_API_HOST', default='')
+JUDGE0_API_KEY = config('JUDGE0_API_KEY', default='')
+
+JUDGE_WORKER_POLL_INTERVAL = config('JUDGE_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+JUDGE0_BATCH_SIZE = config('JUDGE0_BATCH_SIZE', default=20, cast=int)
+JUDGE0_CONNECT_TIMEOUT = config('JUDGE0_CONNECT_TIMEOUT', default=3.05, cast=float)
+JUDGE0_READ_TIMEOUT = config('JUDGE0_READ_TIMEOUT', default=15.0, cast=float)
+JUDGE0_POOL_CONNECTIONS = config('JUDGE0_POOL_CONNECTIONS', default=4, cast=int)
+JUDGE0_POOL_MAXSIZE = config('JUDGE0_POOL_MAXSIZE', default=20, cast=int)
+JUDGE0_MAX_RETRIES = config('JUDGE0_MAX_RETRIES', default=3, cast=int)
+JUDGE0_RETRY_BACKOFF = config('JUDGE0_RETRY_BACKOFF', default=0.5, cast=float)
+JUDGE0_MIN_POLL_INTERVAL = config('JUDGE0_MIN_POLL_INTERVAL', default=0.2, cast=float)
+JUDGE0_MAX_BACKOFF = config('JUDGE0_MAX_BACKOFF', default=5.0, cast=float)
+JUDGE0_POLL_TIMEOUT = config('JUDGE0_POLL_TIMEOUT', default=60.0, cast=float)
+# Public base URL Judge0 can reach to PUT finished results back; empty keeps plain polling.
+# Callbacks land in the web process, so the default cache must be shared with the judge worker.
+JUDGE0_CALLBACK_BASE_URL = config('JUDGE0_CALLBACK_BASE_URL', default='')
+JUDGE0_CALLBACK_TIMEOUT = config('JUDGE0_CALLBACK_TIMEOUT', default=60 * 10, cast=int)
+JUDGE0_CALLBACK_SWEEP_INTERVAL = config('JUDGE0_CALLBACK_SWEEP_INTERVAL', default=10.0, cast=float)
+
+# 'accounts.backends.Judge0Backend' (remote RapidAPI) or 'accounts.backends.LocalBackend' (local sandbox)
+JUDGE_BACKEND = config('JUDGE_BACKEND', default='accounts.backends.Judge0Backend')
+JUDGE_LOCAL_WORKERS = config('JUDGE_LOCAL_WORKERS', default=0, cast=int)
+JUDGE_BUILD_DIR = config('JUDGE_BUILD_DIR', default=os.path.join(BASE_DIR, 'judge_builds'))
+JUDGE_BUILD_CACHE_SIZE = config('JUDGE_BUILD_CACHE_SIZE', default=500, cast=int)
+# LocalBackend compiles and runs code as uids JUDGE_SANDBOX_UID .. +JUDGE_LOCAL_WORKERS-1 (one per
+# worker) with no network. Needs a worker started as root; empty runs code as the worker's own user,
+# which LocalBackend only allows with DEBUG on.
+JUDGE_SANDBOX_UID = config('JUDGE_SANDBOX_UID', default='', cast=lambda value: int(value) if value else None)
+JUDGE_SANDBOX_GID = config('JUDGE_SANDBOX_GID', default=65534, cast=int)
+JUDGE_COMPILE_CACHE_TIMEOUT = config('JUDGE_COMPILE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# Compressed test-case data; must be shared by the web app and every judge worker.
+TESTCASE_BLOB_DIR = config('TESTCASE_BLOB_DIR', default=os.path.join(BASE_DIR, 'testcase_blobs'))
+JUDGE_SUBMISSION_CONCURRENCY = config('JUDGE_SUBMISSION_CONCURRENCY', default=20, cast=int)
+JUDGE_GLOBAL_CONCURRENCY = config('JUDGE_GLOBAL_CONCURRENCY', default=40, cast=int)
+# Jobs judged at once across every process. Size it to the Judge0 plan's concurrency divided by
+# JUDGE_SUBMISSION_CONCURRENCY; JUDGE_SCHEDULER_RUN_SLOTS of them are kept for sample runs.
+JUDGE_SCHEDULER_SLOTS = config('JUDGE_SCHEDULER_SLOTS', default=4, cast=int)
+JUDGE_SCHEDULER_RUN_SLOTS = config('JUDGE_SCHEDULER_RUN_SLOTS', default=1, cast=int)
+JUDGE_SCHEDULER_SLOT_LEASE = config('JUDGE_SCHEDULER_SLOT_LEASE', default=60 * 5, cast=int)
+JUDGE_QUEUE_MAX = config('JUDGE_QUEUE_MAX', default=500, cast=int)
+# A RUNNING submission whose worker has not finished it within this many seconds is judged again.
+JUDGE_SUBMISSION_LEASE = config('JUDGE_SUBMISSION_LEASE', default=60 * 10, cast=int)
+JUDGE_QUEUE_MAX_PER_USER = config('JUDGE_QUEUE_MAX_PER_USER', default=5, cast=int)
+
+LEADERBOARD_SIZE = config('LEADERBOARD_SIZE', default=10, cast=int)
+LEADERBOARD_PAGE_SIZE = config('LEADERBOARD_PAGE_SIZE', default=50, cast=int)
+LEADERBOARD_CACHE_TIMEOUT = config('LEADERBOARD_CACHE_TIMEOUT', default=60 * 5, cast=int)
+
+PROBLEMS_PER_PAGE = config('PROBLEMS_PER_PAGE', default=20, cast=int)
+SUBMISSION_EVENTS_TIMEOUT = config('SUBMISSION_EVENTS_TIMEOUT', default=60 * 10, cast=int)
+SUBMISSION_EVENTS_POLL_INTERVAL = config('SUBMISSION_EVENTS_POLL_INTERVAL', default=0.5, cast=float)
+SUBMISSION_EVENTS_STREAM_TIMEOUT = config('SUBMISSION_EVENTS_STREAM_TIMEOUT', default=300, cast=int)
@@ -16,26 +16,35 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
-from accounts.views import *
 
+from codehub.lazyurls import lazy_path
+
+# accounts views are imported on the first request rather than when the URLconf loads.
 urlpatterns = [
-    path('', home , name = "home" ),
+    lazy_path('', "accounts.views.home", name = "home" ),
     path("accounts/", include("allauth.urls")),
-    path('signup/', signup , name = "signup" ),
-    path('login/', login , name = "login" ),
-    path('logout/', logout , name = "logout" ),
-    path('premium/', premium , name = "premium" ),
-    path('forgotpassword/', forgotpassword, name='forgotpassword'),
-    path('verifyemail/', verifyemail , name = "verifyemail" ),
-    path('resend_verification_email/', resend_verification_email, name='resend_verification_email'),
-    path("problems/", problem_list, name="problem_list"),
-    path("problems/<slug:problem_slug>/submit/", submit_solution, name="submit_solution"),
-    path('terms/', terms, name='terms'),
-    path('privacy-policy/', privacypolicy, name='privacypolicy'),
-    path('explore/', explore, name='explore'),
-    path('dashboard/dsa/content/<str:topic_name>/', dsa_topic_content, name='dsa_topic_content'),
-    path('dashboard/sql/content/<str:topic_name>/', sql_topic_content, name='sql_topic_content'),
-    path('dashboard/dsa/', dsadashboard, name='dsadashboard'),
-    path('dashboard/sql/', sqldashboard, name='sqldashboard'),
+    lazy_path('signup/', "accounts.views.signup", name = "signup" ),
+    lazy_path('login/', "accounts.views.login", name = "login" ),
+    lazy_path('logout/', "accounts.views.logout", name = "logout" ),
+    lazy_path('premium/', "accounts.views.premium", name = "premium" ),
+    lazy_path('forgotpassword/', "accounts.views.forgotpassword", name='forgotpassword'),
+    lazy_path('verifyemail/', "accounts.views.verifyemail", name = "verifyemail" ),
+    lazy_path('resend_verification_email/', "accounts.views.resend_verification_email", name='resend_verification_email'),
+    lazy_path("problems/", "accounts.views.problem_list", name="problem_list"),
+    lazy_path("api/problems/", "accounts.views.problem_list_api", name="problem_list_api"),
+    lazy_path("leaderboard/", "accounts.views.leaderboard_view", name="leaderboard"),
+    lazy_path("problems/<slug:problem_slug>/submit/", "accounts.views.submit_solution", name="submit_solution"),
+    lazy_path("problems/<slug:problem_slug>/run/", "accounts.views.run_solution", name="run_solution"),
+    lazy_path("submissions/<int:submission_id>/status/", "accounts.views.submission_status", name="submission_status"),
+    lazy_path("submissions/<int:submission_id>/events/", "accounts.views.submission_events", name="submission_events"),
+    lazy_path("judge/metrics/", "accounts.views.judge_metrics", name="judge_metrics"),
+    lazy_path("judge0/callback/<int:submission_id>/<str:signature>/", "accounts.views.judge0_callback", name="judge0_callback"),
+    lazy_path('terms/', "accounts.views.terms", name='terms'),
+    lazy_path('privacy-policy/', "accounts.views.privacypolicy", name='privacypolicy'),
+    lazy_path('explore/', "accounts.views.explore", name='explore'),
+    lazy_path('dashboard/dsa/content/<str:topic_name>/', "accounts.views.dsa_topic_content", name='dsa_topic_content'),
+    lazy_path('dashboard/sql/content/<str:topic_name>/', "accounts.views.sql_topic_content", name='sql_topic_content'),
+    lazy_path('dashboard/dsa/', "accounts.views.dsadashboard", name='dsadashboard'),
+    lazy_path('dashboard/sql/', "accounts.views.sqldashboard", name='sqldashboard'),
     path('admin/', admin.site.urls),
 ]